@@ -1,3 +1,40 @@
 from django.contrib import admin
 
+from .models import AvisoAtraso, PoliticaEmprestimo, Reserva
+
 # Register your models here.
+
+@admin.register(PoliticaEmprestimo)
+class PoliticaEmprestimoAdmin(admin.ModelAdmin):
+    """
+    Cadastro dos limites de empréstimos simultâneos por grupo de usuários.
+    """
+    list_display = ('grupo', 'limite_emprestimos')
+
+
+@admin.register(AvisoAtraso)
+class AvisoAtrasoAdmin(admin.ModelAdmin):
+    """
+    Consulta dos avisos de atraso gerados pelo comando 'varrer_atrasos'.
+    """
+    list_display = ('emprestimo', 'dias_atraso', 'valor_multa', 'atualizado_em')
+    list_select_related = ('emprestimo__usuario', 'emprestimo__livro')
+    raw_id_fields = ('emprestimo',)
+
+
+@admin.register(Reserva)
+class ReservaAdmin(admin.ModelAdmin):
+    """
+    Consulta das filas de reserva. O cancelamento usa Reserva.cancelar(), que
+    repassa a cópia separada ao próximo da fila.
+    """
+    list_display = ('livro', 'usuario', 'situacao', 'criada_em', 'disponivel_em')
+    list_filter = ('situacao',)
+    list_select_related = ('livro', 'usuario')
+    raw_id_fields = ('livro', 'usuario')
+    actions = ['cancelar_reservas']
+
+    @admin.action(description="Cancelar reservas selecionadas")
+    def cancelar_reservas(self, request, queryset):
+        canceladas = sum(reserva.cancelar() for reserva in queryset)
+        self.message_user(request, f"{canceladas} reservas canceladas.")
@@ -0,0 +1,377 @@
+"""
+api.py
+Arquivo responsável pela API JSON (versão 1, em /biblioteca/api/v1/) de livros,
+categorias e empréstimos, usada pelos quiosques e pelo aplicativo.
+As listagens são paginadas por cursor (paginacao.py) e aceitam ?campos= para
+escolher os campos devolvidos. As linhas vêm de values(), sem instanciar
+modelos, e são serializadas com orjson quando o pacote está instalado (senão,
+com o módulo json). As respostas GET trazem uma ETag formada pelas versões do
+cache (cache.etag()): com If-None-Match igual, a resposta é 304 sem consultar
+o banco. Como as versões só mudam no cache em que foram incrementadas, a API
+exige o mesmo cache compartilhado das páginas quando há vários processos
+(BIBLIOTECA_CACHE 'redis' ou 'arquivo'; produção recusa 'locmem').
+A autenticação é a sessão do Django, com as mesmas regras das páginas HTML;
+sem ela, a resposta é 401.
+"""
+
+import json
+from datetime import date, time
+from decimal import Decimal
+from functools import wraps
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db.models import F
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_http_methods, require_safe
+
+from . import cache
+from .models import Categoria, Emprestimo, Livro
+from .paginacao import TAMANHO_PAGINA_PADRAO, CursorInvalido, paginar_por_cursor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CAMPOS_LIVRO = (
+    'id', 'titulo', 'autor', 'isbn', 'data_publicacao', 'copias_disponiveis', 'copias_total', 'categorias',
+)
+CAMPOS_CATEGORIA = ('id', 'nome', 'descricao')
+CAMPOS_EMPRESTIMO = (
+    'id', 'livro_id', 'livro_titulo', 'usuario_id', 'usuario_username', 'data_emprestimo',
+    'data_prevista_devolucao', 'data_devolucao', 'devolvido',
+)
+# Campos que não são colunas do modelo: {nome na API: expressão de values()}.
+EXPRESSOES_EMPRESTIMO = {'livro_titulo': F('livro__titulo'), 'usuario_username': F('usuario__username')}
+
+# Escopos do cache cujas versões formam a ETag de cada recurso. Os empréstimos
+# exibem o título do livro, que muda com o escopo 'livros'.
+ESCOPOS_LIVROS = (cache.LIVROS,)
+ESCOPOS_CATEGORIAS = (cache.CATEGORIAS,)
+ESCOPOS_EMPRESTIMOS = (cache.EMPRESTIMOS, cache.LIVROS)
+
+FILTROS_EMPRESTIMO = ('ativos', 'devolvidos', 'atrasados')
+
+
+class ParametroInvalido(ValueError):
+    """
+    Exceção levantada quando um parâmetro da requisição é inválido (resposta 400).
+    """
+
+
+# Serialização
+def _converter(valor):
+    """
+    Tipos que o json não serializa; as datas seguem o formato do orjson (isoformat()).
+    """
+    if isinstance(valor, (date, time)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    raise TypeError(f"Tipo não serializável em JSON: {type(valor).__name__}")
+
+
+def serializar(dados):
+    """
+    Serializa 'dados' em JSON (bytes UTF-8).
+    """
+    if orjson is not None:
+        return orjson.dumps(dados, default=_converter)
+    return json.dumps(dados, default=_converter, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def _resposta(dados, status=200):
+    return HttpResponse(serializar(dados), status=status, content_type='application/json')
+
+
+def _erro(mensagem, status, codigo):
+    return _resposta({'erro': mensagem, 'codigo': codigo}, status=status)
+
+
+# Decoradores
+def _api(view):
+    """
+    Exige usuário autenticado (401 em JSON, sem redirecionar para o login),
+    converte ParametroInvalido em 400 e faz os clientes revalidarem as respostas
+    GET pela ETag a cada uso (Cache-Control: private, no-cache).
+    """
+    @wraps(view)
+    def view_api(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _erro("Autenticação necessária.", 401, 'nao_autenticado')
+        try:
+            response = view(request, *args, **kwargs)
+        except ParametroInvalido as erro:
+            return _erro(str(erro), 400, 'parametro_invalido')
+        if request.method in ('GET', 'HEAD'):
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
+    return view_api
+
+
+def _condicional(*escopos):
+    """
+    Decorador condition() com a ETag dos escopos; responde 304 antes da view.
+    """
+    def etag(request, *args, **kwargs):
+        return cache.etag(request, escopos)
+    return condition(etag_func=etag)
+
+
+def _etag_emprestimos(request, *args, **kwargs):
+    # Um empréstimo passa a atrasado com o tempo, sem nenhuma gravação que mude a versão.
+    if request.method not in ('GET', 'HEAD') or request.GET.get('filtro') == 'atrasados':
+        return None
+    return cache.etag(request, ESCOPOS_EMPRESTIMOS)
+
+
+# Parâmetros
+def _inteiro(valor, nome):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ParametroInvalido(f"'{nome}' deve ser um número inteiro.")
+
+
+def _campos_pedidos(request, disponiveis):
+    """
+    Campos de ?campos=a,b (na ordem de 'disponiveis'); todos se ausente.
+    Raises:
+        ParametroInvalido: Se algum campo não existir no recurso.
+    """
+    pedidos = request.GET.get('campos')
+    if not pedidos:
+        return list(disponiveis)
+    nomes = {nome.strip() for nome in pedidos.split(',') if nome.strip()}
+    desconhecidos = nomes.difference(disponiveis)
+    if desconhecidos:
+        raise ParametroInvalido(f"Campos inexistentes: {', '.join(sorted(desconhecidos))}.")
+    return [campo for campo in disponiveis if campo in nomes]
+
+
+def _corpo(request):
+    """
+    Dados de um POST, em JSON (Content-Type application/json) ou formulário.
+    """
+    if request.content_type != 'application/json':
+        return request.POST
+    try:
+        dados = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ParametroInvalido("Corpo JSON inválido.")
+    if not isinstance(dados, dict):
+        raise ParametroInvalido("O corpo JSON deve ser um objeto.")
+    return dados
+
+
+# Consultas
+def _projetar(queryset, campos, expressoes=None):
+    expressoes = expressoes or {}
+    colunas = [campo for campo in campos if campo not in expressoes and campo != 'categorias']
+    return queryset.values(*colunas, **{campo: expressoes[campo] for campo in campos if campo in expressoes})
+
+
+def _incluir_categorias(linhas):
+    """
+    Preenche 'categorias' (ids) das linhas de livros com uma consulta à tabela da relação.
+    """
+    por_livro = {linha['id']: linha.setdefault('categorias', []) for linha in linhas}
+    relacoes = (
+        Livro.categorias.through.objects.filter(livro_id__in=list(por_livro))
+        .order_by('livro_id', 'categoria_id').values_list('livro_id', 'categoria_id')
+    )
+    for livro_id, categoria_id in relacoes:
+        por_livro[livro_id].append(categoria_id)
+
+
+def _linhas(itens, campos):
+    """
+    Aplica 'categorias' e descarta as colunas consultadas só para a paginação.
+    """
+    if 'categorias' in campos and itens:
+        _incluir_categorias(itens)
+    if itens and len(itens[0]) != len(campos):
+        return [{campo: linha[campo] for campo in campos} for linha in itens]
+    return itens
+
+
+def _link(request, cursor):
+    if cursor is None:
+        return None
+    parametros = request.GET.copy()
+    parametros['cursor'] = cursor
+    return f"{request.path}?{parametros.urlencode()}"
+
+
+def _listar(request, queryset, disponiveis, ordenacao, expressoes=None):
+    """
+    Resposta de listagem: {'resultados': [...], 'proximo': url, 'anterior': url}.
+    Os campos da ordenação (e o id, para as categorias dos livros) são sempre
+    consultados, pois o cursor é formado por eles. Um cursor inválido responde 400.
+    """
+    campos = _campos_pedidos(request, disponiveis)
+    tamanho = _inteiro(request.GET.get('tamanho', TAMANHO_PAGINA_PADRAO), 'tamanho')
+    obrigatorios = [campo.lstrip('-') for campo in ordenacao]
+    if 'categorias' in campos:
+        obrigatorios.append('id')
+    consultados = campos + [campo for campo in obrigatorios if campo not in campos]
+    try:
+        pagina = paginar_por_cursor(
+            _projetar(queryset, consultados, expressoes),
+            cursor=request.GET.get('cursor'),
+            ordenacao=ordenacao,
+            tamanho=tamanho,
+            estrito=True,
+        )
+    except CursorInvalido as erro:
+        return _erro(str(erro), 400, 'cursor_invalido')
+    return _resposta({
+        'resultados': _linhas(pagina.itens, campos),
+        'proximo': _link(request, pagina.proximo),
+        'anterior': _link(request, pagina.anterior),
+    })
+
+
+def _registro(queryset, pk, campos, expressoes=None, status=200):
+    """
+    Resposta de um único registro pelo id (404 em JSON se não existir).
+    """
+    consultados = campos if 'id' in campos or 'categorias' not in campos else campos + ['id']
+    linha = _projetar(queryset, consultados, expressoes).filter(pk=pk).first()
+    if linha is None:
+        return _erro("Registro não encontrado.", 404, 'nao_encontrado')
+    return _resposta(_linhas([linha], campos)[0], status=status)
+
+
+# Views de Livro
+@_api
+@require_safe
+@_condicional(*ESCOPOS_LIVROS)
+def listar_livros(request):
+    """
+    Lista livros em ordem de id.
+    Parâmetros GET: campos, tamanho, cursor e categoria (id da categoria).
+    """
+    livros = Livro.objects.all()
+    categoria = request.GET.get('categoria')
+    if categoria:
+        livros = livros.filter(categorias=_inteiro(categoria, 'categoria'))
+    return _listar(request, livros, CAMPOS_LIVRO, ('id',))
+
+
+@_api
+@require_safe
+@_condicional(*ESCOPOS_LIVROS)
+def detalhar_livro(request, livro_id):
+    """
+    Retorna um livro. Parâmetro GET: campos.
+    """
+    return _registro(Livro.objects.all(), livro_id, _campos_pedidos(request, CAMPOS_LIVRO))
+
+
+# Views de Categoria
+@_api
+@require_safe
+@_condicional(*ESCOPOS_CATEGORIAS)
+def listar_categorias(request):
+    """
+    Lista categorias em ordem de id. Parâmetros GET: campos, tamanho e cursor.
+    """
+    return _listar(request, Categoria.objects.all(), CAMPOS_CATEGORIA, ('id',))
+
+
+@_api
+@require_safe
+@_condicional(*ESCOPOS_CATEGORIAS)
+def detalhar_categoria(request, categoria_id):
+    """
+    Retorna uma categoria. Parâmetro GET: campos.
+    """
+    return _registro(Categoria.objects.all(), categoria_id, _campos_pedidos(request, CAMPOS_CATEGORIA))
+
+
+# Views de Empréstimo
+@_api
+@require_http_methods(['GET', 'HEAD', 'POST'])
+@condition(etag_func=_etag_emprestimos)
+def emprestimos(request):
+    """
+    GET lista empréstimos, os mais recentes primeiro (atrasados: do prazo mais
+    antigo para o mais recente). Parâmetros GET: campos, tamanho, cursor,
+    filtro (ativos, devolvidos ou atrasados), usuario e livro (ids).
+    POST registra um empréstimo com livro_id e usuario_id (padrão: o usuário
+    logado) e responde 201 com o empréstimo; 409 (com o código do erro) se não
+    houver cópias, se o usuário já tiver o livro ou atingir o limite.
+    """
+    if request.method == 'POST':
+        return _emprestar(request)
+
+    lista = Emprestimo.objects.all()
+    ordenacao = ('-id',)
+    filtro = request.GET.get('filtro')
+    if filtro and filtro not in FILTROS_EMPRESTIMO:
+        raise ParametroInvalido(f"'filtro' deve ser um de: {', '.join(FILTROS_EMPRESTIMO)}.")
+    if filtro == 'ativos':
+        lista = lista.filter(devolvido=False)
+    elif filtro == 'devolvidos':
+        lista = lista.filter(devolvido=True)
+    elif filtro == 'atrasados':
+        lista = lista.atrasados()
+        ordenacao = ('data_prevista_devolucao', 'id')
+    for parametro in ('usuario', 'livro'):
+        valor = request.GET.get(parametro)
+        if valor:
+            lista = lista.filter(**{f"{parametro}_id": _inteiro(valor, parametro)})
+    return _listar(request, lista, CAMPOS_EMPRESTIMO, ordenacao, EXPRESSOES_EMPRESTIMO)
+
+
+def _emprestar(request):
+    dados = _corpo(request)
+    livro = Livro.objects.only('id').filter(pk=_inteiro(dados.get('livro_id'), 'livro_id')).first()
+    if livro is None:
+        return _erro("Livro não encontrado.", 404, 'nao_encontrado')
+    usuario_id = dados.get('usuario_id')
+    if usuario_id in (None, ''):
+        usuario = request.user
+    else:
+        usuario = User.objects.only('id').filter(pk=_inteiro(usuario_id, 'usuario_id')).first()
+        if usuario is None:
+            return _erro("Usuário não encontrado.", 404, 'nao_encontrado')
+    try:
+        emprestimo = livro.emprestar(usuario)
+    except ValidationError as erro:
+        return _erro(erro.messages[0], 409, erro.code)
+    response = _registro(
+        Emprestimo.objects.all(), emprestimo.pk, list(CAMPOS_EMPRESTIMO), EXPRESSOES_EMPRESTIMO, status=201,
+    )
+    response['Location'] = reverse('api_emprestimo', args=[emprestimo.pk])
+    return response
+
+
+@_api
+@require_safe
+@_condicional(*ESCOPOS_EMPRESTIMOS)
+def detalhar_emprestimo(request, emprestimo_id):
+    """
+    Retorna um empréstimo. Parâmetro GET: campos.
+    """
+    return _registro(
+        Emprestimo.objects.all(), emprestimo_id, _campos_pedidos(request, CAMPOS_EMPRESTIMO), EXPRESSOES_EMPRESTIMO,
+    )
+
+
+@_api
+@require_http_methods(['POST'])
+def devolver_emprestimo(request, emprestimo_id):
+    """
+    Registra a devolução do empréstimo e responde com ele. Repetir a devolução
+    não altera o estoque e devolve o mesmo registro.
+    """
+    emprestimo = Emprestimo.objects.only('id', 'livro_id', 'usuario_id').filter(pk=emprestimo_id).first()
+    if emprestimo is None:
+        return _erro("Empréstimo não encontrado.", 404, 'nao_encontrado')
+    emprestimo.registrar_devolucao()
+    return _registro(Emprestimo.objects.all(), emprestimo.pk, list(CAMPOS_EMPRESTIMO), EXPRESSOES_EMPRESTIMO)
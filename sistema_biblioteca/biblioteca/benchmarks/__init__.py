@@ -0,0 +1,73 @@
+"""
+benchmarks
+Pacote com medições de desempenho da aplicação 'biblioteca'.
+Cada módulo pode ser executado a partir do diretório do projeto, por exemplo:
+    python -m biblioteca.benchmarks.emprestimo_ativo --tamanhos 10000 1000000
+As medições rodam em um banco de testes criado para a execução e destruído ao final.
+"""
+
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+
+def configurar_django():
+    """
+    Inicializa o Django quando o benchmark é executado como script.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sistema_biblioteca.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def banco_temporario(nome_arquivo=None):
+    """
+    Cria um banco de testes (migrado) para a duração do bloco.
+    Args:
+        nome_arquivo: Caminho opcional de um arquivo SQLite; por padrão o banco
+        de testes usa a configuração TEST do settings (memória no SQLite).
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    if nome_arquivo:
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = nome_arquivo
+    setup_test_environment()
+    nome_original = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(nome_original, verbosity=0)
+        teardown_test_environment()
+
+
+def cronometrar(funcao, repeticoes):
+    """
+    Executa 'funcao' 'repeticoes' vezes e retorna as durações em milissegundos.
+    """
+    amostras = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        amostras.append((time.perf_counter() - inicio) * 1000)
+    return amostras
+
+
+def percentis(amostras):
+    """
+    Resume as amostras (ms) em média, p50, p95 e p99.
+    """
+    ordenadas = sorted(amostras)
+
+    def posicao(p):
+        return ordenadas[min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))]
+
+    return {
+        'media': statistics.fmean(ordenadas),
+        'p50': posicao(50),
+        'p95': posicao(95),
+        'p99': posicao(99),
+    }
@@ -0,0 +1,73 @@
+"""
+api.py
+Mede a listagem de livros da API (api_livros, 25 por página) pelo cliente de
+testes do Django, com os middlewares e a autenticação da sessão: resposta
+completa com orjson e com o módulo json, e a revalidação com If-None-Match
+(304). Para comparação, mede a página HTML listar_livro com o cache de páginas
+invalidado a cada requisição. Imprime também as requisições por segundo de um
+processo (1000 / média).
+Uso:
+    python -m biblioteca.benchmarks.api --livros 100000
+"""
+
+import argparse
+import random
+from unittest import mock
+
+from . import configurar_django, banco_temporario, cronometrar, percentis
+from .busca import _popular, _vocabulario
+
+
+def executar(livros, repeticoes=1000, semente=42):
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.urls import reverse
+    from biblioteca import api, cache
+
+    aleatorio = random.Random(semente)
+    with banco_temporario() as connection:
+        palavras, pesos = _vocabulario(aleatorio)
+        _popular(connection, livros, aleatorio, palavras, pesos)
+        cliente = Client()
+        cliente.force_login(User.objects.create_user(username='leitor'))
+        url_api = reverse('api_livros')
+        url_html = reverse('listar_livro')
+        etag = cliente.get(url_api)['ETag']
+
+        def html():
+            cache.invalidar(cache.LIVROS)
+            cliente.get(url_html)
+
+        def api_orjson():
+            cliente.get(url_api)
+
+        def api_json():
+            with mock.patch.object(api, 'orjson', None):
+                cliente.get(url_api)
+
+        def api_304():
+            cliente.get(url_api, HTTP_IF_NONE_MATCH=etag)
+
+        medicoes = [('listar_livro (HTML)', html), ('api_livros json', api_json), ('api_livros 304', api_304)]
+        if api.orjson is not None:
+            medicoes.insert(1, ('api_livros orjson', api_orjson))
+        for nome, funcao in medicoes:
+            funcao()
+            resumo = percentis(cronometrar(funcao, repeticoes))
+            print(
+                f"{livros:>10,} livros  {nome:<20} media={resumo['media']:.3f}ms  p50={resumo['p50']:.3f}ms  "
+                f"p95={resumo['p95']:.3f}ms  p99={resumo['p99']:.3f}ms  {1000 / resumo['media']:,.0f} req/s"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--livros', type=int, default=100_000)
+    parser.add_argument('--repeticoes', type=int, default=1000)
+    args = parser.parse_args()
+    executar(args.livros, repeticoes=args.repeticoes)
+
+
+if __name__ == '__main__':
+    configurar_django()
+    main()
@@ -0,0 +1,86 @@
+"""
+busca.py
+Mede a latência da busca textual (biblioteca.busca) em um catálogo sintético.
+Uso:
+    python -m biblioteca.benchmarks.busca --livros 1000000
+"""
+
+import argparse
+import itertools
+import random
+
+from . import configurar_django, banco_temporario, cronometrar, percentis
+
+LOTE = 50_000
+
+SILABAS = "ba be bi bo bu ca ce ci co cu da de di do du fa fe fi fo fu la le li lo lu ma me mi mo mu na ne ni no nu ra re ri ro ru sa se si so su ta te ti to tu".split()
+SOBRENOMES = "Silva Souza Costa Santos Oliveira Pereira Lima Carvalho Ferreira Almeida".split()
+
+
+def _vocabulario(aleatorio, tamanho=30_000):
+    """
+    Gera um vocabulário sintético; as palavras são sorteadas com distribuição
+    de Zipf nos títulos, como em um catálogo real (poucas muito comuns, muitas raras).
+    """
+    palavras = set()
+    while len(palavras) < tamanho:
+        palavras.add(''.join(aleatorio.choices(SILABAS, k=aleatorio.randint(2, 4))))
+    palavras = sorted(palavras)
+    pesos = list(itertools.accumulate(1 / (posicao + 1) for posicao in range(tamanho)))
+    return palavras, pesos
+
+
+def _popular(connection, livros, aleatorio, palavras, pesos):
+    from biblioteca.models import Livro
+
+    with connection.cursor() as cursor:
+        for base in range(0, livros, LOTE):
+            cursor.executemany(
+                f"INSERT INTO {Livro._meta.db_table} (titulo, autor, data_publicacao, isbn, "
+                f"copias_disponiveis, copias_total, emprestimos_ativos, copias_reservadas, versao) "
+                f"VALUES (%s, %s, '2000-01-01', %s, 1, 1, 0, 0, 0)",
+                [
+                    (
+                        ' '.join(aleatorio.choices(palavras, cum_weights=pesos, k=3)).title(),
+                        f"{aleatorio.choice(SOBRENOMES)} {i}",
+                        f"{9780000000000 + i}",
+                    )
+                    for i in range(base, min(base + LOTE, livros))
+                ],
+            )
+
+
+def executar(livros, repeticoes=500, semente=42):
+    from biblioteca import busca
+
+    aleatorio = random.Random(semente)
+    with banco_temporario() as connection:
+        palavras, pesos = _vocabulario(aleatorio)
+        _popular(connection, livros, aleatorio, palavras, pesos)
+        busca.reconstruir_indice()
+
+        consultas = {
+            'um termo': lambda: aleatorio.choices(palavras, cum_weights=pesos)[0],
+            'dois termos': lambda: ' '.join(aleatorio.choices(palavras, cum_weights=pesos, k=2)),
+            'prefixo': lambda: aleatorio.choices(palavras, cum_weights=pesos)[0][:4],
+            'isbn': lambda: str(9780000000000 + aleatorio.randrange(livros)),
+        }
+        for nome, gerar in consultas.items():
+            resumo = percentis(cronometrar(lambda: busca.buscar_ids(gerar()), repeticoes))
+            print(
+                f"{nome:<12} media={resumo['media']:.2f}ms  p50={resumo['p50']:.2f}ms  "
+                f"p95={resumo['p95']:.2f}ms  p99={resumo['p99']:.2f}ms"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--livros', type=int, default=100_000)
+    parser.add_argument('--repeticoes', type=int, default=500)
+    args = parser.parse_args()
+    executar(args.livros, repeticoes=args.repeticoes)
+
+
+if __name__ == '__main__':
+    configurar_django()
+    main()
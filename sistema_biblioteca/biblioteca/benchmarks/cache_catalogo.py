@@ -0,0 +1,64 @@
+"""
+cache_catalogo.py
+Mede a listagem de livros (listar_livro) pelo cliente de testes do Django, com
+o cache de páginas (biblioteca.cache) frio, isto é, invalidado antes de cada
+requisição, quente, e na revalidação do navegador (If-None-Match com a ETag
+atual, respondida com 304). As medições incluem os middlewares e a autenticação da
+sessão, como em uma requisição real. Usa o backend de cache configurado em
+CACHES (variável de ambiente BIBLIOTECA_CACHE).
+Uso:
+    python -m biblioteca.benchmarks.cache_catalogo --livros 100000
+"""
+
+import argparse
+import random
+
+from . import configurar_django, banco_temporario, cronometrar, percentis
+from .busca import _popular, _vocabulario
+
+
+def executar(livros, repeticoes=1000, semente=42):
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.urls import reverse
+    from biblioteca import cache
+
+    aleatorio = random.Random(semente)
+    with banco_temporario() as connection:
+        palavras, pesos = _vocabulario(aleatorio)
+        _popular(connection, livros, aleatorio, palavras, pesos)
+        cliente = Client()
+        cliente.force_login(User.objects.create_user(username='leitor'))
+        url = reverse('listar_livro')
+
+        def frio():
+            cache.invalidar(cache.LIVROS)
+            cliente.get(url)
+
+        def quente():
+            cliente.get(url)
+
+        def revalidado():
+            cliente.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        etag = cliente.get(url)['ETag']
+        for nome, funcao in (('frio', frio), ('quente', quente), ('304', revalidado)):
+            resumo = percentis(cronometrar(funcao, repeticoes))
+            print(
+                f"{livros:>10,} livros  cache {nome:<6} media={resumo['media']:.3f}ms  "
+                f"p50={resumo['p50']:.3f}ms  p95={resumo['p95']:.3f}ms  p99={resumo['p99']:.3f}ms"
+            )
+        print(f"Métricas: {cache.metricas()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--livros', type=int, default=100_000)
+    parser.add_argument('--repeticoes', type=int, default=1000)
+    args = parser.parse_args()
+    executar(args.livros, repeticoes=args.repeticoes)
+
+
+if __name__ == '__main__':
+    configurar_django()
+    main()
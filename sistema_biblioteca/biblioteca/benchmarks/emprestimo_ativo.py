@@ -0,0 +1,100 @@
+"""
+emprestimo_ativo.py
+Mede a busca do empréstimo ativo (usuario, livro, devolvido=False) conforme a
+tabela biblioteca_emprestimo cresce. Com o índice parcial 'emprestimo_ativo_unico'
+o tempo por busca deve crescer de forma logarítmica, e não linear.
+Uso:
+    python -m biblioteca.benchmarks.emprestimo_ativo --tamanhos 10000 100000 1000000 10000000
+"""
+
+import argparse
+import random
+
+from . import configurar_django, banco_temporario, cronometrar, percentis
+
+USUARIOS = 10_000
+LIVROS = 100_000
+LOTE = 50_000
+
+
+def _popular(connection, ate, inicio=0):
+    """
+    Insere empréstimos sintéticos via SQL em lote até totalizar 'ate' linhas.
+    O par (usuario, livro) de cada linha é único; 1 em cada 20 fica ativo.
+    """
+    from biblioteca.models import Emprestimo
+
+    tabela = Emprestimo._meta.db_table
+    sql = (
+        f"INSERT INTO {tabela} (usuario_id, livro_id, data_emprestimo, devolvido) "
+        f"VALUES (%s, %s, %s, %s)"
+    )
+    with connection.cursor() as cursor:
+        for base in range(inicio, ate, LOTE):
+            cursor.executemany(sql, [
+                (i % USUARIOS + 1, (i // USUARIOS) % LIVROS + 1, '2024-01-01 00:00:00', i % 20 != 0)
+                for i in range(base, min(base + LOTE, ate))
+            ])
+
+
+def _criar_referencias(connection):
+    from django.contrib.auth.models import User
+    from biblioteca.models import Livro
+
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {User._meta.db_table} (id, username, password, is_superuser, first_name, "
+            f"last_name, email, is_staff, is_active, date_joined) "
+            f"VALUES (%s, %s, '', 0, '', '', '', 0, 1, '2024-01-01 00:00:00')",
+            [(i, f"leitor{i}") for i in range(1, USUARIOS + 1)],
+        )
+        cursor.executemany(
+            f"INSERT INTO {Livro._meta.db_table} (id, titulo, autor, data_publicacao, isbn, "
+            f"copias_disponiveis, copias_total, emprestimos_ativos, copias_reservadas) "
+            f"VALUES (%s, %s, 'Autor', '2000-01-01', %s, 1, 1, 0, 0)",
+            [(i, f"Livro {i}", f"{i:013d}") for i in range(1, LIVROS + 1)],
+        )
+
+
+def executar(tamanhos, repeticoes=2000, semente=42):
+    from biblioteca.models import Emprestimo
+
+    aleatorio = random.Random(semente)
+    resultados = []
+    with banco_temporario() as connection:
+        _criar_referencias(connection)
+        atual = 0
+        for tamanho in sorted(tamanhos):
+            _popular(connection, tamanho, inicio=atual)
+            atual = tamanho
+
+            def buscar():
+                Emprestimo.objects.filter(
+                    usuario_id=aleatorio.randint(1, USUARIOS),
+                    livro_id=aleatorio.randint(1, LIVROS),
+                    devolvido=False,
+                ).exists()
+
+            resumo = percentis(cronometrar(buscar, repeticoes))
+            resultados.append((tamanho, resumo))
+            print(
+                f"{tamanho:>12,} linhas  media={resumo['media']:.3f}ms  "
+                f"p50={resumo['p50']:.3f}ms  p95={resumo['p95']:.3f}ms  p99={resumo['p99']:.3f}ms"
+            )
+
+        plano = Emprestimo.objects.filter(usuario_id=1, livro_id=1, devolvido=False).explain()
+        print(f"Plano de execução: {plano}")
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', nargs='+', type=int, default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeticoes', type=int, default=2000)
+    args = parser.parse_args()
+    executar(args.tamanhos, repeticoes=args.repeticoes)
+
+
+if __name__ == '__main__':
+    configurar_django()
+    main()
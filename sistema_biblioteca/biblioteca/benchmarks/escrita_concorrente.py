@@ -0,0 +1,157 @@
+"""
+escrita_concorrente.py
+Teste de carga de empréstimos concorrentes em um arquivo SQLite, comparando
+os perfis de banco 'sqlite' (padrão) e 'sqlite_producao' do settings (BANCOS).
+Cada thread simula um balcão que empresta e devolve um livro, em transações
+separadas, até o fim do tempo: no modo 'unitario' com Livro.emprestar e
+Emprestimo.registrar_devolucao (que começam gravando), no modo 'lote' com
+services.emprestar_em_lote e devolver_em_lote (que leem antes de gravar, o caso
+em que BEGIN DEFERRED falha com "database is locked").
+Ao fim de cada ciclo close_old_connections() é chamado, como ao fim de uma
+requisição: sem CONN_MAX_AGE a conexão é fechada e reaberta no ciclo seguinte.
+São exibidos os ciclos por segundo, as latências e os ciclos que falharam com
+"database is locked".
+Uso:
+    python -m biblioteca.benchmarks.escrita_concorrente --threads 1 4 8 --duracao 10 --modos lote
+"""
+
+import argparse
+import random
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+from . import configurar_django, banco_temporario, percentis
+
+PERFIS = ('sqlite', 'sqlite_producao')
+MODOS = ('unitario', 'lote')
+
+
+def _aplicar_perfil(perfil):
+    """
+    Copia OPTIONS e a reutilização de conexões do perfil para o banco 'default'.
+    Os DatabaseWrapper de cada thread leem esse dicionário; o da thread principal
+    é descartado, pois guarda em cache os comandos de inicialização.
+    """
+    from django.conf import settings
+    from django.db import connections
+
+    configuracao = settings.BANCOS[perfil]
+    atual = connections.settings['default']
+    atual['OPTIONS'] = dict(configuracao.get('OPTIONS', {}))
+    atual['CONN_MAX_AGE'] = configuracao.get('CONN_MAX_AGE', 0)
+    atual['CONN_HEALTH_CHECKS'] = configuracao.get('CONN_HEALTH_CHECKS', False)
+    connections['default'].close()
+    del connections['default']
+
+
+def _preparar(threads, livros):
+    from django.contrib.auth.models import User
+    from biblioteca.models import Livro, PerfilLeitor
+
+    User.objects.bulk_create([User(username=f"balcao{i}") for i in range(threads)])
+    usuarios = list(User.objects.order_by('id'))
+    PerfilLeitor.objects.bulk_create([PerfilLeitor(usuario=usuario) for usuario in usuarios])
+    Livro.objects.bulk_create([
+        Livro(titulo=f"Livro {i}", autor="Autor", data_publicacao=date(2000, 1, 1), isbn=f"{i:010d}",
+              copias_disponiveis=threads + 1, copias_total=threads + 1)
+        for i in range(livros)
+    ])
+    return usuarios, list(Livro.objects.values_list('id', flat=True))
+
+
+def _ciclo_unitario(usuario, livro_id):
+    from biblioteca.models import Livro
+
+    livro = Livro.objects.get(pk=livro_id)
+    livro.emprestar(usuario).registrar_devolucao()
+
+
+def _ciclo_lote(usuario, livro_id):
+    from biblioteca import services
+
+    services.emprestar_em_lote(usuario, [str(livro_id)])
+    services.devolver_em_lote(usuario, [str(livro_id)])
+
+
+def _balcao(ciclo, usuario, livros, barreira, prazo, resultado, semente):
+    from django.db import OperationalError, close_old_connections, connection
+
+    aleatorio = random.Random(semente)
+    barreira.wait()
+    try:
+        while time.perf_counter() < prazo[0]:
+            inicio = time.perf_counter()
+            try:
+                ciclo(usuario, aleatorio.choice(livros))
+                resultado['latencias'].append((time.perf_counter() - inicio) * 1000)
+            except OperationalError as erro:
+                if 'locked' not in str(erro):
+                    raise
+                resultado['travados'] += 1
+            finally:
+                close_old_connections()
+    finally:
+        connection.close()
+
+
+def executar(perfil, modo, threads, duracao, livros, arquivo):
+    _aplicar_perfil(perfil)
+    with banco_temporario(arquivo) as connection:
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            diario = cursor.fetchone()[0]
+        usuarios, ids = _preparar(threads, livros)
+        connection.close()
+
+        ciclo = _ciclo_lote if modo == 'lote' else _ciclo_unitario
+        barreira = threading.Barrier(threads + 1)
+        prazo = [float('inf')]
+        resultados = [{'latencias': [], 'travados': 0} for _ in usuarios]
+        balcoes = [
+            threading.Thread(target=_balcao, args=(ciclo, usuario, ids, barreira, prazo, resultado, indice))
+            for indice, (usuario, resultado) in enumerate(zip(usuarios, resultados))
+        ]
+        for balcao in balcoes:
+            balcao.start()
+        prazo[0] = time.perf_counter() + duracao
+        barreira.wait()
+        for balcao in balcoes:
+            balcao.join()
+
+    latencias = [valor for resultado in resultados for valor in resultado['latencias']]
+    travados = sum(resultado['travados'] for resultado in resultados)
+    resumo = percentis(latencias) if latencias else {'p50': 0, 'p95': 0}
+    print(
+        f"{perfil:<16} {diario:<7} {modo:<9} {threads:>7} {len(latencias) / duracao:>10.1f} "
+        f"{resumo['p50']:>8.1f} {resumo['p95']:>8.1f} {travados:>9}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--duracao', type=float, default=10, help="Segundos por medição.")
+    parser.add_argument('--livros', type=int, default=100)
+    parser.add_argument('--perfis', nargs='+', choices=PERFIS, default=list(PERFIS))
+    parser.add_argument('--modos', nargs='+', choices=MODOS, default=list(MODOS))
+    args = parser.parse_args()
+
+    diretorio = tempfile.mkdtemp(prefix='escrita_concorrente_')
+    try:
+        print(f"{'perfil':<16} {'diário':<7} {'modo':<9} {'threads':>7} {'ciclos/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'travados':>9}")
+        for modo in args.modos:
+            for perfil in args.perfis:
+                for threads in args.threads:
+                    arquivo = str(Path(diretorio) / f"{perfil}.sqlite3")
+                    executar(perfil, modo, threads, args.duracao, args.livros, arquivo)
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    configurar_django()
+    main()
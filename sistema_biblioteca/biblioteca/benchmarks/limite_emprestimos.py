@@ -0,0 +1,102 @@
+"""
+limite_emprestimos.py
+Mede o custo que a política de limite de empréstimos acrescenta ao empréstimo:
+o UPDATE condicional do contador de PerfilLeitor, que compara com o limite
+da política do usuário na mesma instrução (PerfilLeitor.reservar_emprestimos). Para comparação, mede
+também a contagem direta dos empréstimos ativos do usuário em biblioteca_emprestimo.
+Cada medição roda em uma transação desfeita ao final; o custo de uma transação
+vazia é medido à parte e descontado no "acréscimo".
+O custo da política não deve depender do tamanho da tabela de empréstimos.
+Uso:
+    python -m biblioteca.benchmarks.limite_emprestimos --tamanhos 100000 1000000 10000000
+"""
+
+import argparse
+import random
+
+from . import configurar_django, banco_temporario, cronometrar, percentis
+from .emprestimo_ativo import USUARIOS, _criar_referencias, _popular
+
+
+def _criar_politicas(connection):
+    """
+    Cria os grupos 'Alunos' (limite 5) e 'Funcionários' (limite 20) e distribui
+    os usuários entre eles (1 em cada 10 é funcionário).
+    """
+    from django.contrib.auth.models import Group, User
+    from biblioteca.models import PoliticaEmprestimo
+
+    alunos = Group.objects.create(name="Alunos")
+    funcionarios = Group.objects.create(name="Funcionários")
+    PoliticaEmprestimo.objects.create(grupo=alunos, limite_emprestimos=5)
+    PoliticaEmprestimo.objects.create(grupo=funcionarios, limite_emprestimos=20)
+    Relacao = User.groups.through
+    Relacao.objects.bulk_create(
+        [
+            Relacao(user_id=i, group_id=(funcionarios if i % 10 == 0 else alunos).pk)
+            for i in range(1, USUARIOS + 1)
+        ],
+        batch_size=5000,
+    )
+
+
+def executar(tamanhos, repeticoes=2000, semente=42):
+    from django.core.management import call_command
+    from django.db import transaction
+    from biblioteca.models import Emprestimo, PerfilLeitor
+
+    aleatorio = random.Random(semente)
+    resultados = []
+    with banco_temporario() as connection:
+        _criar_referencias(connection)
+        _criar_politicas(connection)
+        atual = 0
+        for tamanho in sorted(tamanhos):
+            _popular(connection, tamanho, inicio=atual)
+            atual = tamanho
+            call_command('recalcular_contadores', verbosity=0)
+            # Todo leitor que já fez um empréstimo tem perfil; aqui, todos os usuários.
+            PerfilLeitor.objects.bulk_create(
+                [PerfilLeitor(usuario_id=i) for i in range(1, USUARIOS + 1)], batch_size=5000, ignore_conflicts=True
+            )
+
+            def transacao():
+                aleatorio.randint(1, USUARIOS)
+                with transaction.atomic():
+                    transaction.set_rollback(True)
+
+            def politica():
+                usuario_id = aleatorio.randint(1, USUARIOS)
+                with transaction.atomic():
+                    PerfilLeitor.reservar_emprestimos(usuario_id)
+                    transaction.set_rollback(True)
+
+            def contagem():
+                usuario_id = aleatorio.randint(1, USUARIOS)
+                with transaction.atomic():
+                    Emprestimo.objects.filter(usuario_id=usuario_id, devolvido=False).count()
+                    transaction.set_rollback(True)
+
+            base = percentis(cronometrar(transacao, repeticoes))
+            for nome, funcao in (('politica', politica), ('count(*)', contagem)):
+                resumo = percentis(cronometrar(funcao, repeticoes))
+                resultados.append((tamanho, nome, resumo))
+                print(
+                    f"{tamanho:>12,} linhas  {nome:<9} media={resumo['media']:.3f}ms  "
+                    f"p50={resumo['p50']:.3f}ms  p95={resumo['p95']:.3f}ms  p99={resumo['p99']:.3f}ms  "
+                    f"acréscimo p50={resumo['p50'] - base['p50']:.3f}ms"
+                )
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanhos', nargs='+', type=int, default=[100_000, 1_000_000])
+    parser.add_argument('--repeticoes', type=int, default=2000)
+    args = parser.parse_args()
+    executar(args.tamanhos, repeticoes=args.repeticoes)
+
+
+if __name__ == '__main__':
+    configurar_django()
+    main()
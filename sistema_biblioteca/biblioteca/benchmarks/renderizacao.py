@@ -0,0 +1,100 @@
+"""
+renderizacao.py
+Mede o tempo de renderização das listagens de livros e de empréstimos com
+--linhas linhas (padrão 1.000), sem acesso ao banco: as instâncias são montadas
+em memória. Cada template é renderizado com o cache de fragmentos desligado
+(DummyCache: todas as linhas são renderizadas) e ligado, depois de uma primeira
+renderização que preenche o cache (cada linha vira uma leitura do cache).
+A listagem de livros também é medida com uma única linha alterada, como após
+um empréstimo, que invalida a página inteira mas só um fragmento.
+Uso:
+    python -m biblioteca.benchmarks.renderizacao --linhas 1000 --repeticoes 30
+"""
+
+import argparse
+from datetime import date, datetime, timedelta
+from functools import partial
+
+from . import configurar_django, cronometrar, percentis
+
+CACHE_LOCAL = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'OPTIONS': {'MAX_ENTRIES': 100_000}}
+    for alias in ('default', 'template_fragments')
+}
+CACHE_DESLIGADO = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    'template_fragments': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def _contextos(linhas):
+    from django.contrib.auth.models import User
+    from biblioteca.models import Emprestimo, Livro
+    from biblioteca.views import _contexto_linhas_livro
+
+    livros = [
+        Livro(id=i, titulo=f"Livro {i}", autor=f"Autor {i % 97}", data_publicacao=date(2000, 1, 1),
+              copias_disponiveis=2, copias_total=3, versao=1)
+        for i in range(1, linhas + 1)
+    ]
+    leitor = User(id=2, username='leitor')
+    inicio = datetime(2025, 1, 1)
+    emprestimos = [
+        Emprestimo(id=i, livro=livros[i - 1], usuario=leitor, data_emprestimo=inicio,
+                   data_prevista_devolucao=inicio + timedelta(days=14),
+                   devolvido=i % 2 == 0, data_devolucao=inicio + timedelta(days=7) if i % 2 == 0 else None)
+        for i in range(1, linhas + 1)
+    ]
+    return {
+        'livros': ('listar_livro.html', {'livros': livros, **_contexto_linhas_livro()}),
+        'emprestimos': ('listar_emprestimos.html', {'emprestimos': emprestimos}),
+    }
+
+
+def executar(linhas, repeticoes):
+    from django.contrib.auth.models import User
+    from django.core.cache import caches
+    from django.template.loader import render_to_string
+    from django.test import RequestFactory
+    from django.test.utils import override_settings, setup_test_environment
+
+    setup_test_environment()
+    request = RequestFactory().get('/')
+    request.user = User(id=1, username='admin', is_superuser=True)
+    contextos = _contextos(linhas)
+
+    print(f"{linhas:,} linhas, {repeticoes} repetições (ms)")
+    print(f"{'listagem':<12} {'cache':<22} {'média':>8} {'p50':>8} {'p95':>8}")
+    for nome, (template, contexto) in contextos.items():
+        renderizar = partial(render_to_string, template, contexto, request=request)
+        medicoes = []
+        with override_settings(CACHES=CACHE_DESLIGADO):
+            renderizar()
+            medicoes.append(('desligado', cronometrar(renderizar, repeticoes)))
+        with override_settings(CACHES=CACHE_LOCAL):
+            caches['default'].clear()
+            renderizar()
+            medicoes.append(('quente', cronometrar(renderizar, repeticoes)))
+            if nome == 'livros':
+                livro = contexto['livros'][linhas // 2]
+
+                def alterar_e_renderizar():
+                    livro.versao += 1
+                    renderizar()
+                medicoes.append(('quente, 1 linha nova', cronometrar(alterar_e_renderizar, repeticoes)))
+        for modo, amostras in medicoes:
+            resumo = percentis(amostras)
+            print(f"{nome:<12} {modo:<22} {resumo['media']:8.1f} {resumo['p50']:8.1f} {resumo['p95']:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--linhas', type=int, default=1000)
+    parser.add_argument('--repeticoes', type=int, default=30)
+    args = parser.parse_args()
+    executar(args.linhas, args.repeticoes)
+
+
+if __name__ == '__main__':
+    configurar_django()
+    main()
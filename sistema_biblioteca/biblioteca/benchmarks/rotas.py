@@ -0,0 +1,356 @@
+"""
+rotas.py
+Mede a latência (média, p50, p95 e p99) e o número de consultas SQL de cada URL
+de biblioteca/urls.py, pelo cliente de testes do Django com um superusuário
+logado, e das operações Livro.emprestar e Emprestimo.registrar_devolucao, sobre
+uma biblioteca sintética gerada por 'manage.py gerar_dados' (mesma semente,
+mesmos dados). Os parâmetros de cada requisição (ids, termos de busca) são
+sorteados com a mesma semente.
+- Requisições que gravam (POST) e as operações de circulação rodam em uma
+  transação desfeita ao final, para que todas as repetições partam do mesmo estado.
+- O cache de páginas fica desligado (DummyCache): mede-se a view, e não o cache
+  (ver cache_catalogo). As métricas (BIBLIOTECA_METRICAS) ficam ligadas, o que
+  também mede o endpoint /metricas/.
+- Respostas em streaming (exportações) são consumidas por inteiro.
+- URLs sem cenário em CENARIOS aparecem em "sem_cenario" no resultado.
+O resultado é gravado em JSON (--saida), com o commit atual, e pode ser comparado
+com o de outro commit (--comparar): p95 ou número de consultas acima da tolerância
+contam como regressão, e o script termina com código 1.
+Com --banco-atual, mede o banco configurado (já populado com gerar_dados, por
+exemplo o perfil grande, que leva cerca de 10 minutos para gerar) sem alterá-lo:
+a medição toda roda em uma transação desfeita ao final.
+Uso:
+    python -m biblioteca.benchmarks.rotas --perfil pequeno --saida base.json
+    python -m biblioteca.benchmarks.rotas --perfil pequeno --comparar base.json
+    python -m biblioteca.benchmarks.rotas --banco-atual --repeticoes 200 --saida grande.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+from . import configurar_django, banco_temporario, percentis
+
+CACHE_DESLIGADO = {
+    alias: {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    for alias in ('default', 'template_fragments')
+}
+TOLERANCIA = 0.2
+# Cenários caros, medidos com menos repetições.
+REPETICOES_MAXIMAS = {'exportar_livros': 5, 'exportar_emprestimos': 20}
+
+
+class _ContadorConsultas:
+
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        return execute(sql, params, many, context)
+
+
+class Amostras:
+    """
+    Parâmetros sorteados a partir dos dados gerados (ids, termos e empréstimos em aberto).
+    """
+
+    def __init__(self, aleatorio):
+        from django.contrib.auth.models import User
+        from biblioteca.models import Categoria, Emprestimo, Livro
+
+        self.aleatorio = aleatorio
+        self.livros = list(Livro.objects.filter(copias_disponiveis__gt=0).values_list('id', flat=True)[:5000])
+        self.categorias = list(Categoria.objects.values_list('id', flat=True)[:5000])
+        self.usuarios = list(User.objects.filter(is_superuser=False).values_list('id', flat=True)[:5000])
+        self.ativos = list(
+            Emprestimo.objects.filter(devolvido=False).values_list('id', 'usuario_id', 'livro_id')[:5000]
+        )
+        self.palavras = [titulo.split()[0] for titulo in Livro.objects.values_list('titulo', flat=True)[:5000]]
+        self.dias = list(Emprestimo.objects.dates('data_emprestimo', 'day')[:1000])
+
+    def livro(self):
+        return self.aleatorio.choice(self.livros)
+
+    def categoria(self):
+        return self.aleatorio.choice(self.categorias)
+
+    def usuario(self):
+        return self.aleatorio.choice(self.usuarios)
+
+    def ativo(self):
+        return self.aleatorio.choice(self.ativos)
+
+    def palavra(self):
+        return self.aleatorio.choice(self.palavras)
+
+    def semana(self):
+        inicio = self.aleatorio.choice(self.dias)
+        return {'inicio': inicio.isoformat(), 'fim': (inicio + timedelta(days=6)).isoformat()}
+
+
+def _devolucao_lote(amostras):
+    _, usuario_id, livro_id = amostras.ativo()
+    return {'usuario_id': usuario_id, 'livros': str(livro_id)}
+
+
+# Nome do cenário -> (nome da URL, método, função que recebe as Amostras e
+# retorna (args do reverse, parâmetros GET ou dados do POST)).
+CENARIOS = {
+    'pagina_inicial': ('pagina_inicial', 'get', lambda a: ((), {})),
+    'login': ('login', 'get', lambda a: ((), {})),
+    'logout': ('logout', 'get', lambda a: ((), {})),
+    'registro': ('registro', 'get', lambda a: ((), {})),
+    'perfil_usuario': ('perfil_usuario', 'get', lambda a: ((), {})),
+    'listar_categoria': ('listar_categoria', 'get', lambda a: ((), {})),
+    'adicionar_categoria': ('adicionar_categoria', 'get', lambda a: ((), {})),
+    'atualizar_categoria': ('atualizar_categoria', 'get', lambda a: ((a.categoria(),), {})),
+    'excluir_categoria': ('excluir_categoria', 'get', lambda a: ((a.categoria(),), {})),
+    'detalhes_categoria': ('detalhes_categoria', 'get', lambda a: ((a.categoria(),), {})),
+    'listar_livro': ('listar_livro', 'get', lambda a: ((), {})),
+    'buscar_livro': ('buscar_livro', 'get', lambda a: ((), {'q': a.palavra()})),
+    'atualizar_livro': ('atualizar_livro', 'get', lambda a: ((a.livro(),), {})),
+    'excluir_livro': ('excluir_livro', 'get', lambda a: ((a.livro(),), {})),
+    'adicionar_livro': ('adicionar_livro', 'get', lambda a: ((), {})),
+    'listar_emprestimos': ('listar_emprestimos', 'get', lambda a: ((), {})),
+    'listar_emprestimos?filtro=ativos': ('listar_emprestimos', 'get', lambda a: ((), {'filtro': 'ativos'})),
+    'listar_emprestimos?filtro=atrasados': ('listar_emprestimos', 'get', lambda a: ((), {'filtro': 'atrasados'})),
+    'registrar_emprestimo': ('registrar_emprestimo', 'post', lambda a: (
+        (), {'livro_id': a.livro(), 'usuario_id': a.usuario()},
+    )),
+    'registrar_devolucao': ('registrar_devolucao', 'get', lambda a: ((), {'usuario_id': a.ativo()[1]})),
+    'registrar_devolucao (POST)': ('registrar_devolucao', 'post', lambda a: ((), {'emprestimo_id': a.ativo()[0]})),
+    'registrar_emprestimo_lote': ('registrar_emprestimo_lote', 'post', lambda a: (
+        (), {'usuario_id': a.usuario(), 'livros': ' '.join(str(a.livro()) for _ in range(3))},
+    )),
+    'registrar_devolucao_lote': ('registrar_devolucao_lote', 'post', lambda a: ((), _devolucao_lote(a))),
+    'reservar_livro': ('reservar_livro', 'post', lambda a: ((), {'livro_id': a.livro(), 'usuario_id': a.usuario()})),
+    'autocompletar_usuarios': ('autocompletar_usuarios', 'get', lambda a: ((), {'q': 'leitor00001'})),
+    'autocompletar_livros': ('autocompletar_livros', 'get', lambda a: ((), {'q': a.palavra()[:4]})),
+    'exportar_emprestimos': ('exportar_emprestimos', 'get', lambda a: ((), a.semana())),
+    'exportar_livros': ('exportar_livros', 'get', lambda a: ((), {})),
+    'metricas': ('metricas', 'get', lambda a: ((), {})),
+    'api_livros': ('api_livros', 'get', lambda a: ((), {})),
+    'api_livros?campos=id,titulo': ('api_livros', 'get', lambda a: ((), {'campos': 'id,titulo'})),
+    'api_livro': ('api_livro', 'get', lambda a: ((a.livro(),), {})),
+    'api_categorias': ('api_categorias', 'get', lambda a: ((), {})),
+    'api_categoria': ('api_categoria', 'get', lambda a: ((a.categoria(),), {})),
+    'api_emprestimos': ('api_emprestimos', 'get', lambda a: ((), {})),
+    'api_emprestimos?filtro=atrasados': ('api_emprestimos', 'get', lambda a: ((), {'filtro': 'atrasados'})),
+    'api_emprestimo': ('api_emprestimo', 'get', lambda a: ((a.ativo()[0],), {})),
+    'api_emprestimos (POST)': ('api_emprestimos', 'post', lambda a: (
+        (), {'livro_id': a.livro(), 'usuario_id': a.usuario()},
+    )),
+    'api_devolucao': ('api_devolucao', 'post', lambda a: ((a.ativo()[0],), {})),
+}
+
+
+def _medir(funcao, repeticoes, preparar=None):
+    """
+    Executa 'funcao' 'repeticoes' vezes (após uma execução de aquecimento) e
+    retorna o resumo das durações e o maior número de consultas de uma execução.
+    """
+    from django.db import connection
+
+    duracoes, consultas = [], 0
+    for indice in range(repeticoes + 1):
+        if preparar:
+            preparar()
+        contador = _ContadorConsultas()
+        with connection.execute_wrapper(contador):
+            inicio = time.perf_counter()
+            funcao()
+            duracao = (time.perf_counter() - inicio) * 1000
+        if indice:
+            duracoes.append(duracao)
+            consultas = max(consultas, contador.total)
+    return {**percentis(duracoes), 'consultas': consultas, 'repeticoes': repeticoes}
+
+
+def _desfeito(funcao):
+    """
+    Envolve 'funcao' em uma transação desfeita ao final.
+    """
+    from django.db import transaction
+
+    def executar():
+        with transaction.atomic():
+            funcao()
+            transaction.set_rollback(True)
+    return executar
+
+
+def _requisicao(cliente, amostras, url_nome, metodo, parametros):
+    from django.conf import settings
+    from django.shortcuts import resolve_url
+    from django.urls import reverse
+
+    url_login = resolve_url(settings.LOGIN_URL)
+
+    def executar():
+        args, dados = parametros(amostras)
+        response = getattr(cliente, metodo)(reverse(url_nome, args=args), dados)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        # Um redirecionamento para o login mediria a view errada. O 409 da API é a
+        # recusa do empréstimo (ex.: usuário sorteado no limite), que as páginas
+        # HTML exibem com status 200.
+        falhou = response.status_code >= 400 and response.status_code != 409
+        if falhou or response.get('Location', '').startswith(url_login):
+            raise RuntimeError(f"{url_nome}: resposta {response.status_code} {response.get('Location', '')}.")
+    return executar
+
+
+def _operacoes(amostras):
+    from django.contrib.auth.models import User
+    from biblioteca.models import Emprestimo, Livro
+
+    def emprestar():
+        livro = Livro.objects.get(pk=amostras.livro())
+        livro.emprestar(User(pk=amostras.usuario()))
+
+    def devolver():
+        Emprestimo.objects.only('id', 'livro_id', 'usuario_id').get(pk=amostras.ativo()[0]).registrar_devolucao()
+
+    return {'Livro.emprestar': emprestar, 'Emprestimo.registrar_devolucao': devolver}
+
+
+def _sem_cenario():
+    from biblioteca import urls
+
+    cobertas = {url_nome for url_nome, _, _ in CENARIOS.values()}
+    return sorted(padrao.name for padrao in urls.urlpatterns if padrao.name not in cobertas)
+
+
+def executar(repeticoes, semente):
+    from django.contrib.auth.models import User
+    from django.test import Client
+
+    aleatorio = random.Random(semente)
+    amostras = Amostras(aleatorio)
+    admin = User.objects.create_superuser(username='benchmark_admin', password='senha_benchmark')
+    cliente = Client()
+    cliente.force_login(admin)
+
+    resultados = {}
+    for nome, (url_nome, metodo, parametros) in CENARIOS.items():
+        funcao = _requisicao(cliente, amostras, url_nome, metodo, parametros)
+        if metodo == 'post':
+            funcao = _desfeito(funcao)
+        # O logout encerra a sessão: o login é refeito antes de cada repetição e ao final.
+        preparar = (lambda: cliente.force_login(admin)) if url_nome == 'logout' else None
+        vezes = min(repeticoes, REPETICOES_MAXIMAS.get(nome, repeticoes))
+        resultados[nome] = _medir(funcao, vezes, preparar)
+        if preparar:
+            preparar()
+        _imprimir(nome, resultados[nome])
+    for nome, operacao in _operacoes(amostras).items():
+        resultados[nome] = _medir(_desfeito(operacao), repeticoes)
+        _imprimir(nome, resultados[nome])
+    return resultados
+
+
+def _imprimir(nome, resumo):
+    print(
+        f"{nome:<38} {resumo['media']:9.2f} {resumo['p50']:9.2f} {resumo['p95']:9.2f} "
+        f"{resumo['p99']:9.2f} {resumo['consultas']:10}"
+    )
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(anterior, atual, tolerancia):
+    """
+    Imprime a variação de p95 e de consultas de cada cenário em relação ao
+    resultado anterior e retorna os cenários com regressão.
+    """
+    regressoes = []
+    print(f"\nComparação com {anterior.get('commit') or 'o resultado anterior'} (tolerância {tolerancia:.0%}):")
+    for nome, resumo in atual['resultados'].items():
+        antes = anterior['resultados'].get(nome)
+        if antes is None:
+            print(f"{nome:<38} novo")
+            continue
+        variacao = resumo['p95'] / antes['p95'] - 1 if antes['p95'] else 0
+        regrediu = variacao > tolerancia or resumo['consultas'] > antes['consultas']
+        if regrediu:
+            regressoes.append(nome)
+        print(
+            f"{nome:<38} p95 {antes['p95']:9.2f} -> {resumo['p95']:9.2f} ({variacao:+7.1%})  "
+            f"consultas {antes['consultas']:4} -> {resumo['consultas']:4}{'  REGRESSÃO' if regrediu else ''}"
+        )
+    return regressoes
+
+
+def main():
+    from django.core.management import call_command
+    from django.test.utils import override_settings
+    from django.db import connection, transaction
+
+    from biblioteca.management.commands.gerar_dados import PERFIS
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--perfil', choices=PERFIS, default='pequeno', help="Tamanho dos dados gerados.")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--repeticoes', type=int, default=100)
+    parser.add_argument('--arquivo', help="Arquivo SQLite do banco temporário (padrão: memória).")
+    parser.add_argument('--banco-atual', action='store_true', help="Mede o banco configurado, sem gerar dados.")
+    parser.add_argument('--saida', help="Arquivo JSON com os resultados.")
+    parser.add_argument('--comparar', help="Resultado JSON anterior a comparar.")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA, help="Aumento de p95 tolerado (padrão: 0.2).")
+    args = parser.parse_args()
+
+    print(f"{'cenário':<38} {'média':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'consultas':>10}")
+    with override_settings(CACHES=CACHE_DESLIGADO, BIBLIOTECA_METRICAS=True):
+        if args.banco_atual:
+            from django.test.utils import setup_test_environment
+            setup_test_environment()
+            with transaction.atomic():
+                resultados = executar(args.repeticoes, args.semente)
+                transaction.set_rollback(True)
+            perfil = 'banco-atual'
+        else:
+            with banco_temporario(args.arquivo):
+                call_command('gerar_dados', perfil=args.perfil, semente=args.semente, verbosity=0)
+                resultados = executar(args.repeticoes, args.semente)
+            perfil = args.perfil
+
+    import django
+    atual = {
+        'commit': _commit(),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'perfil': perfil,
+        'semente': args.semente,
+        'banco': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'resultados': resultados,
+        'sem_cenario': _sem_cenario(),
+    }
+    if atual['sem_cenario']:
+        print(f"URLs sem cenário: {', '.join(atual['sem_cenario'])}")
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(atual, arquivo, indent=2, ensure_ascii=False)
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            if comparar(json.load(arquivo), atual, args.tolerancia):
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    configurar_django()
+    main()
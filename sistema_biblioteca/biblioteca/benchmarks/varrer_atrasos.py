@@ -0,0 +1,100 @@
+"""
+varrer_atrasos.py
+Mede o comando 'varrer_atrasos' em uma tabela de empréstimos grande, em que
+uma fração (--atrasados) dos empréstimos está em aberto e vencida; os demais já
+foram devolvidos. Com --atrasados 1 cada linha da tabela gera um aviso (pior
+caso). A varredura roda duas vezes: a primeira insere os avisos e a segunda
+(dia seguinte) atualiza os existentes. Também é exibido o aumento do
+pico de memória do processo durante as varreduras, que deve ser limitado pelo
+tamanho do lote e não pelo tamanho da tabela; no banco em memória (padrão) o
+aumento inclui a própria tabela de avisos, por isso use --arquivo para medi-lo.
+Uso:
+    python -m biblioteca.benchmarks.varrer_atrasos --tamanho 5000000 --atrasados 0.2
+"""
+
+import argparse
+import resource
+import time
+from datetime import datetime, timedelta
+
+from . import configurar_django, banco_temporario
+from .emprestimo_ativo import LOTE, USUARIOS, LIVROS, _criar_referencias
+
+REFERENCIA = datetime(2025, 6, 1)
+
+
+def _popular(connection, total, atrasados):
+    """
+    Insere 'total' empréstimos com prazos espalhados pelos 90 dias anteriores à
+    data de referência; a fração 'atrasados' fica em aberto e o resto, devolvido.
+    """
+    from biblioteca.models import Emprestimo
+
+    sql = (
+        f"INSERT INTO {Emprestimo._meta.db_table} "
+        f"(usuario_id, livro_id, data_emprestimo, data_prevista_devolucao, devolvido) "
+        f"VALUES (%s, %s, %s, %s, %s)"
+    )
+    intervalo = max(1, round(1 / atrasados))
+    prazos = [
+        ((REFERENCIA - timedelta(days=d + 14, minutes=m)).isoformat(' '),
+         (REFERENCIA - timedelta(days=d, minutes=m)).isoformat(' '))
+        for d in range(1, 91) for m in (0, 30)
+    ]
+    with connection.cursor() as cursor:
+        for base in range(0, total, LOTE):
+            cursor.executemany(sql, [
+                (i % USUARIOS + 1, (i // USUARIOS) % LIVROS + 1, *prazos[i % len(prazos)], i % intervalo != 0)
+                for i in range(base, min(base + LOTE, total))
+            ])
+
+
+def _pico_memoria_mb():
+    # ru_maxrss é informado em KB no Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def executar(tamanho, atrasados, tamanho_lote, arquivo=None):
+    from django.core.management import call_command
+    from biblioteca.models import AvisoAtraso, Emprestimo
+
+    with banco_temporario(arquivo) as connection:
+        _criar_referencias(connection)
+        _popular(connection, tamanho, atrasados)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        vencidos = Emprestimo.objects.atrasados(REFERENCIA).count()
+        print(f"{tamanho:,} empréstimos, {vencidos:,} em aberto e vencidos.")
+        plano = (
+            Emprestimo.objects.atrasados(REFERENCIA)
+            .order_by('data_prevista_devolucao', 'id').values_list('id')[:tamanho_lote].explain()
+        )
+        print(f"Plano de execução: {plano}")
+
+        memoria_inicial = _pico_memoria_mb()
+        for rodada, referencia in (('inserção', REFERENCIA), ('atualização', REFERENCIA + timedelta(days=1))):
+            inicio = time.perf_counter()
+            call_command(
+                'varrer_atrasos', data=f"{referencia:%Y-%m-%d}", tamanho_lote=tamanho_lote, verbosity=0
+            )
+            duracao = time.perf_counter() - inicio
+            print(
+                f"{rodada:<12} {duracao:7.1f}s  {vencidos / duracao:>10,.0f} avisos/s  "
+                f"pico de memória +{_pico_memoria_mb() - memoria_inicial:.0f} MB"
+            )
+        print(f"Avisos gravados: {AvisoAtraso.objects.count():,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tamanho', type=int, default=1_000_000)
+    parser.add_argument('--atrasados', type=float, default=0.2)
+    parser.add_argument('--tamanho-lote', type=int, default=5000)
+    parser.add_argument('--arquivo', help="Arquivo SQLite do banco de testes (padrão: memória).")
+    args = parser.parse_args()
+    executar(args.tamanho, args.atrasados, args.tamanho_lote, args.arquivo)
+
+
+if __name__ == '__main__':
+    configurar_django()
+    main()
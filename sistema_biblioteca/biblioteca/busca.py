@@ -0,0 +1,422 @@
+"""
+busca.py
+Arquivo responsável pela busca textual no catálogo da aplicação 'biblioteca'.
+Mantém um índice invertido sobre título, autor, ISBN e nomes das categorias de cada Livro:
+    - No SQLite usa uma tabela virtual FTS5 (criada pela migração 0004), ranqueada por bm25;
+      consultas amplas demais para ranquear (LIMITE_RANQUEAMENTO) voltam em ordem de id.
+    - No PostgreSQL usa uma coluna tsvector com índice GIN (migração 0012), com os
+      pesos das colunas em setweight() e ranqueada por ts_rank.
+    - O índice invertido em memória (IndiceInvertido) existe apenas para testes e
+      desenvolvimento: é de um único processo, mantido pelos sinais desse processo,
+      e é recusado com DEBUG=False.
+O índice é atualizado pelos sinais registrados em signals.py e, para cargas em lote
+(bulk_create não dispara sinais), por chamadas explícitas a indexar_livros().
+"""
+
+import bisect
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+TABELA_FTS = 'biblioteca_livro_busca'
+TABELA_VOCABULARIO = 'biblioteca_livro_busca_vocab'
+LIMITE_PADRAO = 50
+
+# Acima deste número estimado de livros correspondentes, a ordenação por bm25
+# (que pontua todos os resultados) é trocada pela ordem de id com LIMIT, que
+# termina assim que encontra os primeiros resultados.
+LIMITE_RANQUEAMENTO = 2_000
+
+# Pesos de cada coluna no bm25 (titulo, autor, isbn, categorias).
+PESOS_COLUNAS = (10.0, 5.0, 1.0, 2.0)
+
+# No PostgreSQL, as colunas recebem os pesos A (titulo), B (autor), D (isbn) e
+# C (categorias) do setweight(); o ts_rank recebe o valor de cada peso na ordem
+# {D, C, B, A}, proporcional a PESOS_COLUNAS.
+DOCUMENTO_POSTGRES = (
+    "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B') || "
+    "setweight(to_tsvector('simple', %s), 'D') || setweight(to_tsvector('simple', %s), 'C')"
+)
+PESOS_POSTGRES = '{0.1, 0.2, 0.5, 1.0}'
+
+BACKENDS_BUSCA = ('fts5', 'postgres', 'python')
+
+_PALAVRA = re.compile(r'\w+', re.UNICODE)
+
+
+def normalizar(texto):
+    """
+    Converte o texto em minúsculas e sem acentos, como o tokenizador do FTS5
+    configurado com 'remove_diacritics 2'.
+    """
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def tokenizar(texto):
+    """
+    Divide o texto normalizado em termos.
+    """
+    return _PALAVRA.findall(normalizar(texto))
+
+
+def backend():
+    """
+    Backend de busca em uso: 'fts5' no SQLite, 'postgres' no PostgreSQL e
+    'python' (índice em memória) nos demais bancos. O setting
+    BIBLIOTECA_BUSCA_BACKEND força um deles.
+    Raises:
+        ImproperlyConfigured: Se o backend for desconhecido, ou se o índice em
+        memória for escolhido com DEBUG=False.
+    """
+    escolhido = getattr(settings, 'BIBLIOTECA_BUSCA_BACKEND', None)
+    if not escolhido:
+        escolhido = {'sqlite': 'fts5', 'postgresql': 'postgres'}.get(connection.vendor, 'python')
+    if escolhido not in BACKENDS_BUSCA:
+        raise ImproperlyConfigured(
+            f"BIBLIOTECA_BUSCA_BACKEND={escolhido!r} inválido; use um de: {', '.join(BACKENDS_BUSCA)}."
+        )
+    if escolhido == 'python' and not settings.DEBUG:
+        raise ImproperlyConfigured(
+            "O índice de busca em memória é de um único processo e só pode ser usado com "
+            "DEBUG=True; use o SQLite (FTS5) ou o PostgreSQL."
+        )
+    return escolhido
+
+
+def usa_fts5():
+    """
+    Indica se o índice FTS5 do SQLite está em uso.
+    """
+    return backend() == 'fts5'
+
+
+def _documentos(ids):
+    """
+    Lê do banco os campos indexados dos livros informados.
+    Retorna {livro_id: (titulo, autor, isbn, 'categoria1 categoria2 ...')}.
+    """
+    from .models import Livro
+
+    categorias = defaultdict(list)
+    relacao = Livro.categorias.through.objects.filter(livro_id__in=ids)
+    for livro_id, nome in relacao.values_list('livro_id', 'categoria__nome'):
+        categorias[livro_id].append(nome)
+
+    return {
+        livro_id: (titulo, autor, isbn, ' '.join(categorias[livro_id]))
+        for livro_id, titulo, autor, isbn in
+        Livro.objects.filter(id__in=ids).values_list('id', 'titulo', 'autor', 'isbn')
+    }
+
+
+class IndiceInvertido:
+    """
+    Índice invertido em memória, para testes e desenvolvimento (DEBUG=True).
+    Cada termo aponta para os livros que o contêm e o peso da coluna em que aparece;
+    a relevância é a soma de peso * idf dos termos da consulta. Cada processo tem
+    o seu índice, atualizado só pelos sinais do próprio processo: com vários
+    processos, as alterações feitas em um não aparecem na busca dos outros.
+    """
+
+    def __init__(self):
+        self._termos = defaultdict(dict)
+        self._documentos = {}
+        self._vocabulario = None
+        self._carregado = False
+        self._trava = threading.RLock()
+
+    def _garantir_carregado(self):
+        if self._carregado:
+            return
+        from .models import Livro
+
+        with self._trava:
+            if self._carregado:
+                return
+            ids = list(Livro.objects.values_list('id', flat=True))
+            for inicio in range(0, len(ids), 2000):
+                for livro_id, campos in _documentos(ids[inicio:inicio + 2000]).items():
+                    self._adicionar(livro_id, campos)
+            self._carregado = True
+
+    def _adicionar(self, livro_id, campos):
+        pesos = defaultdict(float)
+        for peso, valor in zip(PESOS_COLUNAS, campos):
+            for termo in tokenizar(valor):
+                pesos[termo] += peso
+        self._documentos[livro_id] = tuple(pesos)
+        for termo, peso in pesos.items():
+            self._termos[termo][livro_id] = peso
+        self._vocabulario = None
+
+    def remover(self, ids):
+        with self._trava:
+            for livro_id in ids:
+                for termo in self._documentos.pop(livro_id, ()):
+                    postagens = self._termos.get(termo)
+                    if postagens is not None:
+                        postagens.pop(livro_id, None)
+                        if not postagens:
+                            del self._termos[termo]
+                            self._vocabulario = None
+
+    def indexar(self, documentos):
+        with self._trava:
+            if not self._carregado:
+                # Será lido do banco na primeira busca.
+                return
+            self.remover(documentos.keys())
+            for livro_id, campos in documentos.items():
+                self._adicionar(livro_id, campos)
+
+    def limpar(self):
+        with self._trava:
+            self._termos.clear()
+            self._documentos.clear()
+            self._vocabulario = None
+            self._carregado = False
+
+    def _com_prefixo(self, prefixo):
+        """
+        Retorna os termos que começam com o prefixo, por busca binária no vocabulário ordenado.
+        """
+        vocabulario = self._vocabulario
+        if vocabulario is None:
+            with self._trava:
+                vocabulario = self._vocabulario = sorted(self._termos)
+        inicio = bisect.bisect_left(vocabulario, prefixo)
+        fim = bisect.bisect_left(vocabulario, prefixo + '\U0010ffff')
+        return vocabulario[inicio:fim]
+
+    def buscar(self, termos, limite):
+        """
+        Retorna ids ranqueados dos livros que contêm todos os termos; o último
+        é tratado como prefixo (mesma semântica da consulta FTS5).
+        """
+        self._garantir_carregado()
+        if not termos:
+            return []
+        total = max(len(self._documentos), 1)
+        pontuacao = None
+        for posicao, termo in enumerate(termos):
+            if posicao == len(termos) - 1:
+                candidatos = self._com_prefixo(termo)
+            else:
+                candidatos = [termo]
+            encontrados = defaultdict(float)
+            for candidato in candidatos:
+                postagens = self._termos.get(candidato)
+                if not postagens:
+                    continue
+                idf = math.log(1 + total / len(postagens))
+                for livro_id, peso in postagens.items():
+                    encontrados[livro_id] += peso * idf
+            if pontuacao is None:
+                pontuacao = encontrados
+            else:
+                pontuacao = {i: p + encontrados[i] for i, p in pontuacao.items() if i in encontrados}
+            if not pontuacao:
+                return []
+        ordenados = sorted(pontuacao.items(), key=lambda item: (-item[1], item[0]))
+        return [livro_id for livro_id, _ in ordenados[:limite]]
+
+
+indice_memoria = IndiceInvertido()
+
+
+def _consulta_fts(termos):
+    """
+    Monta a expressão MATCH do FTS5: todos os termos obrigatórios, sendo o último
+    tratado como prefixo (a busca funciona durante a digitação).
+    Cada termo vai entre aspas para neutralizar a sintaxe do FTS5.
+    """
+    *completos, ultimo = termos
+    return ' AND '.join([f'"{termo}"' for termo in completos] + [f'"{ultimo}"*'])
+
+
+def _consulta_postgres(termos):
+    """
+    Monta o texto do to_tsquery(): todos os termos obrigatórios, sendo o último
+    prefixo (:*). Os termos vêm de tokenizar() (apenas letras, dígitos e '_') e
+    vão entre aspas simples para neutralizar os operadores do tsquery.
+    """
+    *completos, ultimo = termos
+    return ' & '.join([f"'{termo}'" for termo in completos] + [f"'{ultimo}':*"])
+
+
+def _indexar_postgres(documentos):
+    """
+    Grava (ou substitui) o tsvector dos documentos; os textos são normalizados
+    como os termos da consulta, sem acentos e em minúsculas.
+    """
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {TABELA_FTS} (livro_id, documento) VALUES (%s, {DOCUMENTO_POSTGRES}) "
+            f"ON CONFLICT (livro_id) DO UPDATE SET documento = EXCLUDED.documento",
+            [(livro_id, *(normalizar(campo) for campo in campos)) for livro_id, campos in documentos.items()],
+        )
+
+
+def _buscar_postgres(termos, limite):
+    """
+    Busca pelo índice GIN do tsvector, do maior para o menor ts_rank.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT livro_id FROM {TABELA_FTS}, to_tsquery('simple', %s) consulta "
+            f"WHERE documento @@ consulta "
+            f"ORDER BY ts_rank('{PESOS_POSTGRES}', documento, consulta) DESC, livro_id LIMIT %s",
+            [_consulta_postgres(termos), limite],
+        )
+        return [linha[0] for linha in cursor.fetchall()]
+
+
+def indexar_livros(ids):
+    """
+    (Re)indexa os livros informados, lendo os dados atuais do banco.
+    Livros que não existem mais são removidos do índice.
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    documentos = _documentos(ids)
+    remover_livros(set(ids) - documentos.keys())
+    indexar_documentos(documentos)
+
+
+def indexar_documentos(documentos):
+    """
+    Grava no índice documentos já montados, sem reler o banco.
+    Args:
+        documentos: {livro_id: (titulo, autor, isbn, 'categoria1 categoria2 ...')},
+        como em cargas em lote que acabaram de inserir os livros.
+    """
+    if not documentos:
+        return
+    escolhido = backend()
+    if escolhido == 'python':
+        indice_memoria.indexar(documentos)
+        return
+    if escolhido == 'postgres':
+        _indexar_postgres(documentos)
+        return
+    with connection.cursor() as cursor:
+        ids = list(documentos)
+        marcadores = ','.join(['%s'] * len(ids))
+        cursor.execute(f"DELETE FROM {TABELA_FTS} WHERE rowid IN ({marcadores})", ids)
+        cursor.executemany(
+            f"INSERT INTO {TABELA_FTS} (rowid, titulo, autor, isbn, categorias) VALUES (%s, %s, %s, %s, %s)",
+            [(livro_id, *campos) for livro_id, campos in documentos.items()],
+        )
+
+
+def remover_livros(ids):
+    """
+    Remove os livros informados do índice.
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    escolhido = backend()
+    if escolhido == 'python':
+        indice_memoria.remover(ids)
+        return
+    coluna = 'livro_id' if escolhido == 'postgres' else 'rowid'
+    with connection.cursor() as cursor:
+        marcadores = ','.join(['%s'] * len(ids))
+        cursor.execute(f"DELETE FROM {TABELA_FTS} WHERE {coluna} IN ({marcadores})", ids)
+
+
+def reconstruir_indice():
+    """
+    Recria todo o índice a partir das tabelas de Livro e Categoria.
+    """
+    escolhido = backend()
+    if escolhido == 'python':
+        indice_memoria.limpar()
+        return
+    from .models import Categoria, Livro
+
+    if escolhido == 'postgres':
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {TABELA_FTS}")
+        ids = list(Livro.objects.order_by('id').values_list('id', flat=True))
+        for inicio in range(0, len(ids), 2000):
+            _indexar_postgres(_documentos(ids[inicio:inicio + 2000]))
+        return
+
+    relacao = Livro.categorias.through._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABELA_FTS}")
+        cursor.execute(
+            f"INSERT INTO {TABELA_FTS} (rowid, titulo, autor, isbn, categorias) "
+            f"SELECT l.id, l.titulo, l.autor, l.isbn, "
+            f"COALESCE((SELECT group_concat(c.nome, ' ') FROM {relacao} lc "
+            f"JOIN {Categoria._meta.db_table} c ON c.id = lc.categoria_id "
+            f"WHERE lc.livro_id = l.id), '') "
+            f"FROM {Livro._meta.db_table} l"
+        )
+
+
+def buscar_ids(texto, limite=LIMITE_PADRAO):
+    """
+    Retorna os ids dos livros que correspondem ao texto, do mais para o menos relevante.
+    """
+    termos = tokenizar(texto)
+    if not termos:
+        return []
+    escolhido = backend()
+    if escolhido == 'python':
+        return indice_memoria.buscar(termos, limite)
+    if escolhido == 'postgres':
+        return _buscar_postgres(termos, limite)
+    pesos = ', '.join(str(p) for p in PESOS_COLUNAS)
+    with connection.cursor() as cursor:
+        if _estimar_resultados(cursor, termos) <= LIMITE_RANQUEAMENTO:
+            ordem = f"ORDER BY bm25({TABELA_FTS}, {pesos})"
+        else:
+            ordem = ""
+        cursor.execute(
+            f"SELECT rowid FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH %s {ordem} LIMIT %s",
+            [_consulta_fts(termos), limite],
+        )
+        return [linha[0] for linha in cursor.fetchall()]
+
+
+def _estimar_resultados(cursor, termos):
+    """
+    Estima quantos livros a consulta retorna, pelo termo mais seletivo, a partir
+    da contagem de documentos por termo mantida pelo FTS5 (tabela fts5vocab).
+    """
+    *completos, ultimo = termos
+    contagens = []
+    for termo in completos:
+        cursor.execute(f"SELECT COALESCE(SUM(doc), 0) FROM {TABELA_VOCABULARIO} WHERE term = %s", [termo])
+        contagens.append(cursor.fetchone()[0])
+    if contagens and min(contagens) <= LIMITE_RANQUEAMENTO:
+        return min(contagens)
+    # O último termo é prefixo: soma os documentos de todos os termos que começam com ele.
+    cursor.execute(
+        f"SELECT COALESCE(SUM(doc), 0) FROM {TABELA_VOCABULARIO} WHERE term >= %s AND term < %s",
+        [ultimo, ultimo + '\U0010ffff'],
+    )
+    contagens.append(cursor.fetchone()[0])
+    return min(contagens)
+
+
+def buscar_livros(texto, limite=LIMITE_PADRAO):
+    """
+    Retorna a lista de instâncias de Livro correspondentes ao texto, em ordem de relevância.
+    """
+    from .models import Livro
+
+    ids = buscar_ids(texto, limite)
+    livros = Livro.objects.in_bulk(ids)
+    return [livros[livro_id] for livro_id in ids if livro_id in livros]
@@ -0,0 +1,230 @@
+"""
+cache.py
+Arquivo responsável pelo cache de leitura (read-through) das páginas do catálogo.
+As páginas são guardadas com uma chave que inclui a versão de cada escopo de dados
+que exibem ('livros', 'categorias', 'emprestimos'). Uma alteração invalida o escopo
+incrementando a sua versão: as chaves antigas deixam de ser lidas e expiram
+sozinhas, sem varredura de chaves. As mesmas versões formam a ETag das páginas
+(pagina_condicional) e das respostas da API (etag()), para responder 304 sem
+consultar o banco. O backend vem de CACHES (alias do setting
+BIBLIOTECA_CACHE_ALIAS, padrão 'default'); acertos e falhas são contados por
+página em cada processo.
+Com mais de um processo, o backend precisa ser compartilhado (BIBLIOTECA_CACHE
+'redis' ou, em um único servidor, 'arquivo'): as versões só valem onde foram
+incrementadas, e com 'locmem' os outros processos continuariam servindo as
+páginas e ETags antigas. As configurações de produção recusam 'locmem'.
+"""
+
+import hashlib
+import threading
+import time
+from collections import Counter
+from functools import partial, wraps
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+LIVROS = 'livros'
+CATEGORIAS = 'categorias'
+EMPRESTIMOS = 'emprestimos'
+# Geração das chaves dos fragmentos das linhas das listagens ({% cache %}). As
+# chaves trazem o id e a versão da linha, que recomeçam quando o banco é recriado
+# (gerar_dados, flush); só então esta geração muda, descartando todos os fragmentos.
+FRAGMENTOS = 'fragmentos'
+
+_acertos = Counter()
+_falhas = Counter()
+_trava_metricas = threading.Lock()
+
+
+def _cache():
+    return caches[getattr(settings, 'BIBLIOTECA_CACHE_ALIAS', 'default')]
+
+
+def _chave_versao(escopo):
+    return f"biblioteca:versao:{escopo}"
+
+
+def _versao_inicial():
+    # Baseada no relógio: se a versão for descartada pelo backend, a nova não
+    # coincide com uma versão anterior cujas páginas ainda estejam no cache.
+    return time.time_ns() // 1000
+
+
+def versoes(escopos):
+    """
+    Retorna as versões atuais dos escopos (uma leitura get_many), criando as que faltam.
+    """
+    cache = _cache()
+    chaves = {escopo: _chave_versao(escopo) for escopo in escopos}
+    encontradas = cache.get_many(chaves.values())
+    resultado = {}
+    for escopo, chave in chaves.items():
+        versao = encontradas.get(chave)
+        if versao is None:
+            versao = _versao_inicial()
+            if not cache.add(chave, versao, timeout=None):
+                versao = cache.get(chave, versao)
+        resultado[escopo] = versao
+    return resultado
+
+
+def geracao_fragmentos():
+    """
+    Retorna a geração atual das chaves dos fragmentos das linhas.
+    """
+    return versoes([FRAGMENTOS])[FRAGMENTOS]
+
+
+def invalidar(*escopos):
+    """
+    Incrementa a versão dos escopos, invalidando as páginas que dependem deles.
+    """
+    cache = _cache()
+    for escopo in escopos:
+        try:
+            cache.incr(_chave_versao(escopo))
+        except ValueError:
+            cache.set(_chave_versao(escopo), _versao_inicial(), timeout=None)
+
+
+def invalidar_ao_confirmar(*escopos):
+    """
+    Invalida os escopos agora e de novo após o commit da transação atual.
+    A segunda invalidação descarta páginas que outra requisição tenha gravado
+    com os dados antigos enquanto a transação ainda não estava confirmada.
+    Chega aos outros processos apenas com um cache compartilhado.
+    """
+    invalidar(*escopos)
+    transaction.on_commit(partial(invalidar, *escopos))
+
+
+def metricas():
+    """
+    Retorna {pagina: {'acertos': n, 'falhas': n}} acumulados neste processo.
+    """
+    with _trava_metricas:
+        return {
+            pagina: {'acertos': _acertos[pagina], 'falhas': _falhas[pagina]}
+            for pagina in sorted(set(_acertos) | set(_falhas))
+        }
+
+
+def zerar_metricas():
+    with _trava_metricas:
+        _acertos.clear()
+        _falhas.clear()
+
+
+def _registrar(contador, pagina):
+    with _trava_metricas:
+        contador[pagina] += 1
+
+
+def _endereco(request):
+    parametros = sorted(request.GET.lists())
+    return hashlib.md5(f"{request.path}?{parametros}".encode()).hexdigest()
+
+
+def _versao(escopos):
+    return '.'.join(str(v) for _, v in sorted(versoes(escopos).items()))
+
+
+def _perfil(request):
+    # O HTML das páginas muda apenas para superusuários (links de edição e exclusão).
+    return 'admin' if request.user.is_superuser else 'usuario'
+
+
+def _chave_pagina(pagina, request, escopos):
+    """
+    Chave da página: nome, caminho e parâmetros (em ordem canônica), o perfil do
+    usuário que altera o HTML (superusuário ou não) e as versões dos escopos.
+    """
+    return f"biblioteca:pagina:{pagina}:{_endereco(request)}:{_perfil(request)}:{_versao(escopos)}"
+
+
+def etag(request, escopos):
+    """
+    ETag de uma resposta GET a partir do endereço (caminho e parâmetros) e das
+    versões dos escopos exibidos. Não consulta o banco: com If-None-Match, o
+    decorador condition() responde 304 antes de executar a view.
+    """
+    return f"{_endereco(request)}-{_versao(escopos)}"
+
+
+def pagina_em_cache(*escopos, timeout=None):
+    """
+    Decorador de views GET que guarda a resposta renderizada no cache.
+    Deve ficar abaixo dos decoradores de autenticação e permissão, que continuam
+    rodando em toda requisição. Só respostas 200 são guardadas; as respostas
+    trazem o cabeçalho X-Cache (HIT ou MISS).
+    Args:
+        escopos: Escopos de dados exibidos pela página (LIVROS, CATEGORIAS).
+        timeout: Validade em segundos (padrão: setting BIBLIOTECA_CACHE_TIMEOUT, 300).
+    """
+    def decorador(view):
+        pagina = view.__name__
+
+        @wraps(view)
+        def view_em_cache(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            cache = _cache()
+            chave = _chave_pagina(pagina, request, escopos)
+            guardada = cache.get(chave)
+            if guardada is not None:
+                _registrar(_acertos, pagina)
+                conteudo, tipo = guardada
+                response = HttpResponse(conteudo, content_type=tipo)
+                response['X-Cache'] = 'HIT'
+                return response
+
+            _registrar(_falhas, pagina)
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming:
+                validade = timeout if timeout is not None else getattr(settings, 'BIBLIOTECA_CACHE_TIMEOUT', 300)
+                cache.set(chave, (response.content, response['Content-Type']), validade)
+            response['X-Cache'] = 'MISS'
+            return response
+
+        return view_em_cache
+    return decorador
+
+
+def pagina_condicional(*escopos):
+    """
+    Decorador de views GET que responde 304 Not Modified, sem executar a view,
+    quando o If-None-Match do navegador coincide com a ETag atual da página:
+    endereço, perfil do usuário, versões dos escopos e o hash do manifesto dos
+    estáticos (que muda quando um deploy altera CSS ou JS). Deve ficar acima de
+    pagina_em_cache e abaixo dos decoradores de autenticação e permissão. As
+    respostas trazem Cache-Control: private, no-cache, para que o navegador
+    revalide a cada acesso em vez de reutilizar a página por heurística.
+    As versões só mudam em todos os processos com um cache compartilhado
+    (BIBLIOTECA_CACHE 'arquivo' ou 'redis'); com 'locmem', cada processo teria a
+    sua e responderia 304 para alterações feitas em outro, por isso as
+    configurações de produção recusam 'locmem'.
+    Args:
+        escopos: Escopos de dados exibidos pela página (LIVROS, CATEGORIAS).
+    """
+    def etag_pagina(request, *args, **kwargs):
+        manifesto = getattr(staticfiles_storage, 'manifest_hash', '')
+        return f"{etag(request, escopos)}-{_perfil(request)}{manifesto}"
+
+    def decorador(view):
+        view_condicional = condition(etag_func=etag_pagina)(view)
+
+        @wraps(view)
+        def view_com_etag(request, *args, **kwargs):
+            response = view_condicional(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        return view_com_etag
+    return decorador
@@ -0,0 +1,114 @@
+"""
+estaticos.py
+Arquivo responsável pelo armazenamento e pela entrega dos arquivos estáticos.
+ArmazenamentoEstatico grava, no collectstatic, os nomes com hash do conteúdo
+(ManifestStaticFilesStorage) e versões pré-comprimidas (.gz e, se o pacote
+brotli estiver instalado, .br) de CSS, JS e SVG. servir_estatico entrega esses
+arquivos a partir de STATIC_ROOT escolhendo a versão comprimida pelo
+Accept-Encoding; nomes com hash recebem cache de um ano (immutable), já que
+qualquer alteração gera um novo nome. Em produção um servidor web na frente da
+aplicação pode entregar o mesmo diretório (ex.: gzip_static/brotli_static no nginx).
+"""
+
+import gzip
+import posixpath
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.http import Http404
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.static import serve
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+EXTENSOES_COMPRIMIDAS = ('.css', '.js', '.svg', '.json', '.txt')
+TAMANHO_MINIMO = 256
+UM_ANO = 365 * 24 * 60 * 60
+VALIDADE_SEM_HASH = 60 * 60
+
+
+def _comprimir(conteudo):
+    """
+    Retorna {extensão: conteúdo comprimido} nos formatos disponíveis.
+    mtime=0 torna o .gz idêntico entre execuções do collectstatic.
+    """
+    variantes = {'.gz': gzip.compress(conteudo, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variantes['.br'] = brotli.compress(conteudo, quality=11)
+    return variantes
+
+
+class ArmazenamentoEstatico(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage que também grava as variantes .gz e .br.
+    Uma variante só é gravada se for menor que o original.
+    Os comentários sourceMappingURL não são reescritos: o Bootstrap é mantido
+    como distribuído, sem os .map, que não são publicados.
+    """
+
+    patterns = tuple(
+        (extensao, tuple(p for p in padroes if 'sourceMappingURL' not in str(p)))
+        for extensao, padroes in ManifestStaticFilesStorage.patterns
+    )
+
+    def post_process(self, paths, dry_run=False, **opcoes):
+        yield from super().post_process(paths, dry_run, **opcoes)
+        if dry_run:
+            return
+        nomes = {*paths, *self.hashed_files.values()}
+        for nome in sorted(nomes):
+            if nome.endswith(EXTENSOES_COMPRIMIDAS) and self.exists(nome):
+                self._gravar_variantes(nome)
+
+    def _gravar_variantes(self, nome):
+        with self.open(nome) as arquivo:
+            conteudo = arquivo.read()
+        if len(conteudo) < TAMANHO_MINIMO:
+            return
+        for extensao, comprimido in _comprimir(conteudo).items():
+            if len(comprimido) >= len(conteudo):
+                continue
+            if self.exists(nome + extensao):
+                self.delete(nome + extensao)
+            self._save(nome + extensao, ContentFile(comprimido))
+
+
+def _nomes_com_hash():
+    return set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+
+def servir_estatico(request, caminho):
+    """
+    View que entrega um arquivo de STATIC_ROOT, preferindo a variante .br ou .gz
+    aceita pelo cliente. Usada quando não há servidor web na frente da aplicação
+    (setting BIBLIOTECA_SERVIR_ESTATICOS).
+    Args:
+        caminho: Caminho do arquivo relativo a STATIC_URL.
+    Raises:
+        Http404: Se o arquivo não existir ou o caminho sair de STATIC_ROOT.
+    """
+    caminho = posixpath.normpath(caminho).lstrip('/')
+    if caminho.startswith('..') or caminho.endswith(('.gz', '.br')):
+        raise Http404("Arquivo não encontrado.")
+    aceitas = request.headers.get('Accept-Encoding', '')
+    response = None
+    for extensao, codificacao in (('.br', 'br'), ('.gz', 'gzip')):
+        if codificacao in aceitas:
+            try:
+                # serve() deduz Content-Type e Content-Encoding pelo nome (ex.: .css.gz).
+                response = serve(request, caminho + extensao, document_root=settings.STATIC_ROOT)
+                break
+            except Http404:
+                continue
+    if response is None:
+        response = serve(request, caminho, document_root=settings.STATIC_ROOT)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if caminho in _nomes_com_hash():
+        patch_cache_control(response, public=True, max_age=UM_ANO, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=VALIDADE_SEM_HASH)
+    return response
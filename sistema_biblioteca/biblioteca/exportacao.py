@@ -0,0 +1,140 @@
+"""
+exportacao.py
+Arquivo responsável pela exportação em fluxo (streaming) de empréstimos e livros.
+As linhas são lidas com values_list() + iterator(chunk_size=...) e serializadas em
+blocos de bytes (CSV ou JSONL, opcionalmente comprimidos com gzip), de modo que a
+memória usada é constante e os primeiros bytes saem antes do fim da consulta.
+Usado pelas views de exportação e pelo comando 'exportar_dados'.
+"""
+
+import csv
+import io
+import json
+import zlib
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Emprestimo, Livro
+
+TAMANHO_LOTE = 2000
+TAMANHO_BLOCO = 64 * 1024
+
+COLUNAS_EMPRESTIMOS = (
+    ('id', 'id'),
+    ('usuario', 'usuario__username'),
+    ('livro_isbn', 'livro__isbn'),
+    ('livro_titulo', 'livro__titulo'),
+    ('data_emprestimo', 'data_emprestimo'),
+    ('data_devolucao', 'data_devolucao'),
+    ('devolvido', 'devolvido'),
+)
+
+COLUNAS_LIVROS = (
+    ('id', 'id'),
+    ('titulo', 'titulo'),
+    ('autor', 'autor'),
+    ('data_publicacao', 'data_publicacao'),
+    ('isbn', 'isbn'),
+    ('copias_disponiveis', 'copias_disponiveis'),
+)
+
+FORMATOS = ('csv', 'jsonl')
+
+
+def linhas_emprestimos(inicio=None, fim=None, tamanho_lote=TAMANHO_LOTE):
+    """
+    Itera sobre os empréstimos como tuplas, em ordem de data de empréstimo.
+    Args:
+        inicio: Data (date) inicial, inclusiva, de data_emprestimo.
+        fim: Data (date) final, inclusiva, de data_emprestimo.
+    """
+    emprestimos = Emprestimo.objects.order_by('data_emprestimo', 'id')
+    if inicio:
+        emprestimos = emprestimos.filter(data_emprestimo__gte=inicio)
+    if fim:
+        # Comparação por intervalo aberto para aproveitar o índice em data_emprestimo.
+        emprestimos = emprestimos.filter(data_emprestimo__lt=fim + timedelta(days=1))
+    campos = [campo for _, campo in COLUNAS_EMPRESTIMOS]
+    return emprestimos.values_list(*campos).iterator(chunk_size=tamanho_lote)
+
+
+def linhas_livros(tamanho_lote=TAMANHO_LOTE):
+    """
+    Itera sobre o inventário de livros como tuplas, em ordem de id.
+    """
+    campos = [campo for _, campo in COLUNAS_LIVROS]
+    return Livro.objects.order_by('id').values_list(*campos).iterator(chunk_size=tamanho_lote)
+
+
+def _em_blocos(partes):
+    """
+    Agrupa pequenos pedaços de texto em blocos de bytes de ~TAMANHO_BLOCO.
+    """
+    buffer, tamanho = [], 0
+    for parte in partes:
+        buffer.append(parte)
+        tamanho += len(parte)
+        if tamanho >= TAMANHO_BLOCO:
+            yield ''.join(buffer).encode('utf-8')
+            buffer, tamanho = [], 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def gerar_csv(colunas, linhas):
+    """
+    Serializa as linhas como CSV (com cabeçalho), em blocos de bytes.
+    """
+    saida = io.StringIO()
+    escritor = csv.writer(saida)
+
+    def partes():
+        escritor.writerow([nome for nome, _ in colunas])
+        for linha in linhas:
+            escritor.writerow(linha)
+            if saida.tell() >= TAMANHO_BLOCO:
+                yield saida.getvalue()
+                saida.seek(0)
+                saida.truncate()
+        yield saida.getvalue()
+
+    return _em_blocos(partes())
+
+
+def gerar_jsonl(colunas, linhas):
+    """
+    Serializa as linhas como JSON Lines (um objeto por linha), em blocos de bytes.
+    """
+    nomes = [nome for nome, _ in colunas]
+    codificador = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    return _em_blocos(
+        codificador.encode(dict(zip(nomes, linha))) + '\n' for linha in linhas
+    )
+
+
+def comprimir_gzip(blocos):
+    """
+    Comprime os blocos em formato gzip à medida que são produzidos.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for bloco in blocos:
+        comprimido = compressor.compress(bloco)
+        if comprimido:
+            yield comprimido
+    yield compressor.flush()
+
+
+def exportar(colunas, linhas, formato='csv', gzip=False):
+    """
+    Retorna um iterador de bytes com as linhas no formato pedido.
+    Raises:
+        ValueError: Se o formato não for 'csv' ou 'jsonl'.
+    """
+    if formato == 'csv':
+        blocos = gerar_csv(colunas, linhas)
+    elif formato == 'jsonl':
+        blocos = gerar_jsonl(colunas, linhas)
+    else:
+        raise ValueError(f"Formato de exportação inválido: {formato}")
+    return comprimir_gzip(blocos) if gzip else blocos
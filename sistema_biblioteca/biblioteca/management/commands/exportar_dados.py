@@ -0,0 +1,59 @@
+"""
+exportar_dados.py
+Comando de gerenciamento para exportar empréstimos ou livros em CSV/JSONL.
+Usa o mesmo gerador em fluxo das views de exportação (exportacao.py), com memória constante.
+Uso:
+    python manage.py exportar_dados emprestimos --inicio 2024-01-01 --fim 2024-12-31 --gzip -o emprestimos.csv.gz
+    python manage.py exportar_dados livros --formato jsonl > livros.jsonl
+"""
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from biblioteca import exportacao
+
+
+def _data(valor):
+    try:
+        data = parse_date(valor)
+    except ValueError:
+        data = None
+    if data is None:
+        raise CommandError(f"Data inválida: '{valor}' (use AAAA-MM-DD).")
+    return data
+
+
+class Command(BaseCommand):
+    help = "Exporta o histórico de empréstimos ou o inventário de livros em CSV ou JSONL."
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=['emprestimos', 'livros'])
+        parser.add_argument('--formato', choices=exportacao.FORMATOS, default='csv')
+        parser.add_argument('--gzip', action='store_true', help="Comprime a saída com gzip.")
+        parser.add_argument('--inicio', type=_data, help="Data inicial (inclusiva) de data_emprestimo.")
+        parser.add_argument('--fim', type=_data, help="Data final (inclusiva) de data_emprestimo.")
+        parser.add_argument('--lote', type=int, default=exportacao.TAMANHO_LOTE, help="Linhas lidas por vez.")
+        parser.add_argument('-o', '--saida', help="Arquivo de saída (padrão: saída padrão).")
+
+    def handle(self, *args, **opcoes):
+        if opcoes['tipo'] == 'emprestimos':
+            colunas = exportacao.COLUNAS_EMPRESTIMOS
+            linhas = exportacao.linhas_emprestimos(opcoes['inicio'], opcoes['fim'], tamanho_lote=opcoes['lote'])
+        else:
+            if opcoes['inicio'] or opcoes['fim']:
+                raise CommandError("--inicio/--fim se aplicam apenas a empréstimos.")
+            colunas = exportacao.COLUNAS_LIVROS
+            linhas = exportacao.linhas_livros(tamanho_lote=opcoes['lote'])
+
+        blocos = exportacao.exportar(colunas, linhas, formato=opcoes['formato'], gzip=opcoes['gzip'])
+        if opcoes['saida']:
+            with open(opcoes['saida'], 'wb') as arquivo:
+                for bloco in blocos:
+                    arquivo.write(bloco)
+        else:
+            saida = getattr(self.stdout, 'buffer', None) or sys.stdout.buffer
+            for bloco in blocos:
+                saida.write(bloco)
+            saida.flush()
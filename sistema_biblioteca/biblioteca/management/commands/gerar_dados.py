@@ -0,0 +1,264 @@
+"""
+gerar_dados.py
+Comando de gerenciamento que gera uma biblioteca sintética para medições de
+desempenho: categorias, leitores (User e PerfilLeitor), livros com categorias e
+o histórico de empréstimos. Os dados dependem apenas de --semente e dos tamanhos
+(as datas são relativas a REFERENCIA, fixa), então duas gerações com os mesmos
+parâmetros produzem o mesmo banco, e medições de commits diferentes são comparáveis.
+Os registros são gravados com executemany em lotes de LOTE linhas, sem save() nem
+sinais; os contadores de cópias e de empréstimos ativos já saem consistentes
+(recalcular_contadores --verificar não acusa divergências) e o índice de busca é
+reconstruído ao final. Os empréstimos estão em ordem cronológica de id; os
+FRACAO_ATIVOS mais recentes estão em aberto, parte deles atrasados em REFERENCIA.
+O banco precisa estar sem livros, categorias e empréstimos.
+Uso:
+    python manage.py gerar_dados --perfil pequeno
+    python manage.py gerar_dados --perfil grande --semente 7
+    python manage.py gerar_dados --livros 200000 --emprestimos 2000000
+"""
+
+import itertools
+import random
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from biblioteca import busca, cache
+from biblioteca.models import SEM_LIMITE, Categoria, Emprestimo, Livro, PerfilLeitor, PoliticaEmprestimo
+
+PERFIS = {
+    'pequeno': {'livros': 10_000, 'categorias': 100, 'usuarios': 2_000, 'emprestimos': 100_000},
+    'medio': {'livros': 100_000, 'categorias': 1_000, 'usuarios': 20_000, 'emprestimos': 1_000_000},
+    'grande': {'livros': 1_000_000, 'categorias': 5_000, 'usuarios': 200_000, 'emprestimos': 10_000_000},
+}
+LOTE = 50_000
+FRACAO_ATIVOS = 0.05
+REFERENCIA = datetime(2025, 6, 30, 12, 0)
+HISTORICO = timedelta(days=5 * 365)
+PERIODO_ATIVOS = timedelta(days=30)
+
+ROTULOS = {'livros': 'livros', 'categorias': 'categorias', 'usuarios': 'usuários', 'emprestimos': 'empréstimos'}
+
+SILABAS = "ba be bi bo bu ca ce ci co cu da de di do du fa fe fi fo fu la le li lo lu ma me mi mo mu na ne ni no nu ra re ri ro ru sa se si so su ta te ti to tu".split()
+NOMES = "Ana Bruno Carla Daniel Eduarda Felipe Gabriela Heitor Isabela João Larissa Marcos Natália Otávio Paula Rafael Sofia Tiago Vitória".split()
+SOBRENOMES = "Silva Souza Costa Santos Oliveira Pereira Lima Carvalho Ferreira Almeida Ribeiro Gomes Martins Rocha".split()
+
+
+def _vocabulario(aleatorio, tamanho):
+    """
+    Gera 'tamanho' palavras distintas e os pesos acumulados de uma distribuição
+    de Zipf (poucas palavras muito comuns, muitas raras, como em um catálogo real).
+    """
+    palavras = set()
+    while len(palavras) < tamanho:
+        palavras.add(''.join(aleatorio.choices(SILABAS, k=aleatorio.randint(2, 4))))
+    pesos = list(itertools.accumulate(1 / (posicao + 1) for posicao in range(tamanho)))
+    return sorted(palavras), pesos
+
+
+def _lotes(linhas):
+    iterador = iter(linhas)
+    while lote := list(itertools.islice(iterador, LOTE)):
+        yield lote
+
+
+class Command(BaseCommand):
+    help = "Gera uma biblioteca sintética e determinística para medições de desempenho."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--perfil', choices=PERFIS, default='pequeno',
+            help="Tamanhos pré-definidos (padrão: pequeno; grande = 1M livros e 10M empréstimos).",
+        )
+        for nome in ('livros', 'categorias', 'usuarios', 'emprestimos'):
+            parser.add_argument(f'--{nome}', type=int, help=f"Número de {ROTULOS[nome]} (substitui o do perfil).")
+        parser.add_argument('--semente', type=int, default=42, help="Semente do gerador (padrão: 42).")
+
+    def handle(self, *args, **opcoes):
+        self.verbosity = opcoes['verbosity']
+        tamanhos = {
+            nome: opcoes[nome] if opcoes[nome] is not None else padrao
+            for nome, padrao in PERFIS[opcoes['perfil']].items()
+        }
+        if min(tamanhos['livros'], tamanhos['categorias'], tamanhos['usuarios']) < 1 or tamanhos['emprestimos'] < 0:
+            raise CommandError("Livros, categorias e usuários devem ser positivos.")
+        if Livro.objects.exists() or Categoria.objects.exists() or Emprestimo.objects.exists():
+            raise CommandError("O banco já tem livros, categorias ou empréstimos; gere os dados em um banco vazio.")
+
+        self.aleatorio = random.Random(opcoes['semente'])
+        self.palavras, self.pesos = _vocabulario(self.aleatorio, 20_000)
+        self.relogio = time.perf_counter()
+
+        categorias = self._categorias(tamanhos['categorias'])
+        usuarios = self._usuarios(tamanhos['usuarios'])
+        ativos = self._planejar_ativos(usuarios, tamanhos['livros'], tamanhos['emprestimos'])
+        self._livros(tamanhos['livros'], categorias, Counter(livro for _, livro in ativos))
+        self._emprestimos(usuarios, tamanhos['livros'], tamanhos['emprestimos'], ativos)
+        self._perfis(usuarios, Counter(usuario for usuario, _ in ativos))
+
+        self._reiniciar_sequencias()
+        busca.reconstruir_indice()
+        cache.invalidar(cache.LIVROS, cache.CATEGORIAS, cache.EMPRESTIMOS, cache.FRAGMENTOS)
+        self._relatar("Índice de busca reconstruído")
+        if self.verbosity >= 1:
+            self.stdout.write(self.style.SUCCESS(
+                "Dados gerados: " + ", ".join(f"{valor:,} {ROTULOS[nome]}" for nome, valor in tamanhos.items())
+                + f" ({len(ativos):,} empréstimos em aberto)."
+            ))
+
+    def _relatar(self, mensagem):
+        if self.verbosity >= 2:
+            self.stdout.write(f"[{time.perf_counter() - self.relogio:8.1f}s] {mensagem}")
+
+    def _inserir(self, tabela, colunas, linhas):
+        """
+        Insere as linhas em lotes de LOTE, cada lote em uma transação.
+        """
+        sql = f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({', '.join(['%s'] * len(colunas))})"
+        total = 0
+        for lote in _lotes(linhas):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, lote)
+            total += len(lote)
+        self._relatar(f"{tabela}: {total:,} linhas")
+
+    def _titulo(self, palavras):
+        return ' '.join(self.aleatorio.choices(self.palavras, cum_weights=self.pesos, k=palavras)).title()
+
+    def _categorias(self, quantidade):
+        nomes = set()
+        while len(nomes) < quantidade:
+            nomes.add(self._titulo(2)[:100])
+        Categoria.objects.bulk_create(
+            [Categoria(id=indice, nome=nome) for indice, nome in enumerate(sorted(nomes), start=1)],
+            batch_size=1000,
+        )
+        self._relatar(f"{Categoria._meta.db_table}: {quantidade:,} linhas")
+        return list(range(1, quantidade + 1))
+
+    def _usuarios(self, quantidade):
+        """
+        Cria os leitores com ids a partir do maior id existente e senha inutilizável.
+        """
+        inicio = (User.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+        cadastro = connection.ops.adapt_datetimefield_value(REFERENCIA - HISTORICO)
+        ids = list(range(inicio, inicio + quantidade))
+        # Nomes guardados para os perfis, que levam as versões normalizadas.
+        self.nomes = {}
+
+        def linhas():
+            for indice, usuario_id in enumerate(ids, start=1):
+                username, nome = f"leitor{indice:07d}", self.aleatorio.choice(NOMES)
+                self.nomes[usuario_id] = PerfilLeitor.nomes_normalizados(username, nome)
+                yield (usuario_id, username, '!', nome, self.aleatorio.choice(SOBRENOMES), '', False, False, True, cadastro)
+
+        self._inserir(
+            User._meta.db_table,
+            ('id', 'username', 'password', 'first_name', 'last_name', 'email',
+             'is_superuser', 'is_staff', 'is_active', 'date_joined'),
+            linhas(),
+        )
+        return ids
+
+    def _planejar_ativos(self, usuarios, livros, emprestimos):
+        """
+        Escolhe os pares (usuário, livro) dos empréstimos em aberto, sem repetir
+        um par (restrição 'emprestimo_ativo_unico') e sem passar do limite padrão
+        de empréstimos por usuário. O k-ésimo empréstimo em aberto é do usuário
+        k % U com o livro (k // U + k % U) % L de uma permutação dos livros:
+        pares distintos enquanto houver menos de U * L empréstimos em aberto.
+        """
+        limite = PoliticaEmprestimo.limite_padrao()
+        por_usuario = livros if limite == SEM_LIMITE else min(limite, livros)
+        quantidade = min(int(emprestimos * FRACAO_ATIVOS), len(usuarios) * por_usuario)
+        permutacao = list(range(1, livros + 1))
+        self.aleatorio.shuffle(permutacao)
+        total = len(usuarios)
+        return [
+            (usuarios[k % total], permutacao[(k // total + k % total) % livros])
+            for k in range(quantidade)
+        ]
+
+    def _livros(self, quantidade, categorias, ativos_por_livro):
+        pesos_categorias = list(itertools.accumulate(1 / (posicao + 1) for posicao in range(len(categorias))))
+
+        def linhas():
+            for livro_id in range(1, quantidade + 1):
+                ativos = ativos_por_livro[livro_id]
+                total = self.aleatorio.randint(1, 5) + ativos
+                publicacao = date(self.aleatorio.randint(1900, 2024), self.aleatorio.randint(1, 12), 1)
+                yield (
+                    livro_id, self._titulo(self.aleatorio.randint(1, 4))[:200],
+                    f"{self.aleatorio.choice(NOMES)} {self.aleatorio.choice(SOBRENOMES)}",
+                    connection.ops.adapt_datefield_value(publicacao), f"{9780000000000 + livro_id}",
+                    total - ativos, total, ativos, 0, 0,
+                )
+
+        self._inserir(
+            Livro._meta.db_table,
+            ('id', 'titulo', 'autor', 'data_publicacao', 'isbn', 'copias_disponiveis',
+             'copias_total', 'emprestimos_ativos', 'copias_reservadas', 'versao'),
+            linhas(),
+        )
+        self._inserir(
+            Livro.categorias.through._meta.db_table,
+            ('livro_id', 'categoria_id'),
+            (
+                (livro_id, categoria_id)
+                for livro_id in range(1, quantidade + 1)
+                for categoria_id in set(self.aleatorio.choices(
+                    categorias, cum_weights=pesos_categorias, k=self.aleatorio.randint(1, 3)
+                ))
+            ),
+        )
+
+    def _emprestimos(self, usuarios, livros, quantidade, ativos):
+        """
+        Grava o histórico em ordem cronológica: os devolvidos ao longo de HISTORICO
+        e, por último, os em aberto, emprestados nos PERIODO_ATIVOS antes de REFERENCIA.
+        """
+        prazo = Emprestimo.prazo()
+        adaptar = connection.ops.adapt_datetimefield_value
+        devolvidos = quantidade - len(ativos)
+        inicio_ativos = REFERENCIA - PERIODO_ATIVOS
+        passo_devolvidos = (HISTORICO - PERIODO_ATIVOS) / max(devolvidos, 1)
+        passo_ativos = PERIODO_ATIVOS / max(len(ativos), 1)
+
+        def linhas():
+            inicio = REFERENCIA - HISTORICO
+            for indice in range(devolvidos):
+                emprestimo = inicio + passo_devolvidos * indice
+                devolucao = emprestimo + timedelta(days=self.aleatorio.randint(1, 21))
+                yield (
+                    self.aleatorio.choice(usuarios), self.aleatorio.randint(1, livros),
+                    adaptar(emprestimo), adaptar(devolucao), adaptar(emprestimo + prazo), True,
+                )
+            for indice, (usuario_id, livro_id) in enumerate(ativos):
+                emprestimo = inicio_ativos + passo_ativos * indice
+                yield usuario_id, livro_id, adaptar(emprestimo), None, adaptar(emprestimo + prazo), False
+
+        self._inserir(
+            Emprestimo._meta.db_table,
+            ('usuario_id', 'livro_id', 'data_emprestimo', 'data_devolucao', 'data_prevista_devolucao', 'devolvido'),
+            linhas(),
+        )
+
+    def _perfis(self, usuarios, ativos_por_usuario):
+        self._inserir(
+            PerfilLeitor._meta.db_table,
+            ('usuario_id', 'emprestimos_ativos', 'username_normalizado', 'nome_normalizado'),
+            ((usuario_id, ativos_por_usuario[usuario_id], *self.nomes[usuario_id]) for usuario_id in usuarios),
+        )
+
+    def _reiniciar_sequencias(self):
+        # Os ids foram informados explicitamente; no PostgreSQL as sequências
+        # precisam avançar até eles (no SQLite a lista de comandos é vazia).
+        modelos = [User, Categoria, Livro, Livro.categorias.through, Emprestimo, PerfilLeitor]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), modelos):
+                cursor.execute(sql)
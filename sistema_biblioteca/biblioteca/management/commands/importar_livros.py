@@ -0,0 +1,282 @@
+"""
+importar_livros.py
+Comando de gerenciamento para carga em lote do catálogo (Livro e Categoria).
+Lê CSV ou JSONL (registros no estilo MARC) em fluxo, valida em lotes e grava com
+bulk_create dentro de uma transação por lote, registrando um checkpoint ao final
+de cada lote para permitir retomar a importação.
+Uso:
+    python manage.py importar_livros catalogo.csv --lote 5000
+    python manage.py importar_livros catalogo.jsonl --retomar
+"""
+
+import csv
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from biblioteca import busca, cache
+from biblioteca.models import Categoria, Livro, validar_isbn
+
+# Campos MARC usados nos registros JSONL (tag -> campo do Livro).
+CAMPOS_MARC = {
+    '020': 'isbn',
+    '100': 'autor',
+    '245': 'titulo',
+    '264': 'data_publicacao',
+    '260': 'data_publicacao',
+    '650': 'categorias',
+}
+
+FORMATOS_DATA = ('%Y-%m-%d', '%d/%m/%Y')
+
+
+class RegistroInvalido(ValueError):
+    """
+    Registro do arquivo de entrada que não pode ser importado.
+    """
+
+
+def _subcampo(valor):
+    """
+    Extrai o valor de um campo MARC, que pode ser texto simples ou um
+    dicionário de subcampos ({'a': ...}).
+    """
+    if isinstance(valor, dict):
+        return valor.get('a', '')
+    return valor
+
+
+def _registro_marc(dados):
+    registro = {}
+    for chave, valor in dados.items():
+        campo = CAMPOS_MARC.get(chave, chave)
+        if campo == 'categorias':
+            valores = valor if isinstance(valor, list) else [valor]
+            registro['categorias'] = [_subcampo(v) for v in valores]
+        else:
+            registro.setdefault(campo, _subcampo(valor))
+    return registro
+
+
+def _ler_csv(arquivo, separador_categorias):
+    for numero, linha in enumerate(csv.DictReader(arquivo), start=1):
+        categorias = linha.get('categorias') or ''
+        linha['categorias'] = [c for c in categorias.split(separador_categorias)]
+        yield numero, linha
+
+
+def _ler_jsonl(arquivo):
+    for numero, linha in enumerate(arquivo, start=1):
+        if not linha.strip():
+            continue
+        try:
+            yield numero, _registro_marc(json.loads(linha))
+        except (ValueError, AttributeError):
+            yield numero, None
+
+
+def _data(valor):
+    valor = str(valor or '').strip().rstrip('.')
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        pass
+    if len(valor) == 4 and valor.isdigit():
+        # Registros MARC costumam trazer apenas o ano.
+        return date(int(valor), 1, 1)
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            continue
+    raise RegistroInvalido(f"Data de publicação inválida: '{valor}'.")
+
+
+def _livro(registro):
+    """
+    Converte um registro lido em (Livro, [nomes de categoria]), aplicando as
+    mesmas regras de Livro.clean() e validar_isbn().
+    """
+    if registro is None:
+        raise RegistroInvalido("Linha não é um JSON válido.")
+    titulo = str(registro.get('titulo') or '').strip()
+    autor = str(registro.get('autor') or '').strip()
+    if not titulo:
+        raise RegistroInvalido("O título do livro não pode ser vazio.")
+    if not autor:
+        raise RegistroInvalido("O nome do autor não pode ser vazio.")
+
+    isbn = str(registro.get('isbn') or '').replace('-', '').replace(' ', '')
+    try:
+        validar_isbn(isbn)
+    except ValidationError as erro:
+        raise RegistroInvalido(erro.messages[0])
+
+    try:
+        copias = int(registro.get('copias_disponiveis') or 1)
+    except (TypeError, ValueError):
+        raise RegistroInvalido("Número de cópias disponíveis inválido.")
+    if copias < 0:
+        raise RegistroInvalido("O número de cópias disponíveis não pode ser negativo.")
+
+    categorias = [str(nome).strip()[:100] for nome in registro.get('categorias') or []]
+    livro = Livro(
+        titulo=titulo[:200],
+        autor=autor[:100],
+        data_publicacao=_data(registro.get('data_publicacao')),
+        isbn=isbn,
+        copias_disponiveis=copias,
+        # bulk_create não chama Livro.save(), que calcula o total.
+        copias_total=copias,
+    )
+    return livro, [nome for nome in categorias if nome]
+
+
+class Command(BaseCommand):
+    help = "Importa livros e categorias em lote a partir de um arquivo CSV ou JSONL."
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Arquivo .csv ou .jsonl ('-' para a entrada padrão).")
+        parser.add_argument('--formato', choices=['csv', 'jsonl'], help="Padrão: deduzido pela extensão.")
+        parser.add_argument('--lote', type=int, default=5000, help="Registros por transação (padrão: 5000).")
+        parser.add_argument('--separador-categorias', default=';', help="Separador de categorias no CSV.")
+        parser.add_argument('--checkpoint', help="Arquivo de checkpoint (padrão: <arquivo>.checkpoint).")
+        parser.add_argument('--retomar', action='store_true', help="Continua a partir do último checkpoint.")
+
+    def handle(self, *args, **opcoes):
+        self.verbosity = opcoes['verbosity']
+        caminho = opcoes['arquivo']
+        formato = opcoes['formato'] or ('jsonl' if caminho.endswith(('.jsonl', '.json')) else 'csv')
+        tamanho_lote = max(1, opcoes['lote'])
+        checkpoint = opcoes['checkpoint'] or (None if caminho == '-' else f"{caminho}.checkpoint")
+
+        inicio = 0
+        if opcoes['retomar']:
+            if not checkpoint:
+                raise CommandError("--retomar exige --checkpoint ao ler da entrada padrão.")
+            inicio = self._ler_checkpoint(checkpoint)
+            if inicio:
+                self.stdout.write(f"Retomando após o registro {inicio}.")
+
+        arquivo = sys.stdin if caminho == '-' else open(caminho, encoding='utf-8', newline='')
+        try:
+            if formato == 'csv':
+                registros = _ler_csv(arquivo, opcoes['separador_categorias'])
+            else:
+                registros = _ler_jsonl(arquivo)
+            registros = islice(registros, inicio, None)
+            self._importar(registros, tamanho_lote, checkpoint, inicio)
+        finally:
+            if arquivo is not sys.stdin:
+                arquivo.close()
+
+    def _importar(self, registros, tamanho_lote, checkpoint, processados):
+        self.categorias = dict(Categoria.objects.values_list('nome', 'id'))
+        totais = {'importados': 0, 'duplicados': 0, 'invalidos': 0}
+        relogio = time.perf_counter()
+
+        while True:
+            lote = list(islice(registros, tamanho_lote))
+            if not lote:
+                break
+            with transaction.atomic():
+                resultado = self._gravar_lote(lote)
+            for chave, valor in resultado.items():
+                totais[chave] += valor
+            processados += len(lote)
+            if checkpoint:
+                self._gravar_checkpoint(checkpoint, processados)
+
+            decorrido = time.perf_counter() - relogio
+            if self.verbosity >= 1:
+                self.stdout.write(
+                    f"{processados} registros lidos, {totais['importados']} livros importados "
+                    f"({totais['importados'] / max(decorrido, 1e-9):.0f} livros/s)."
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Importação concluída: {totais['importados']} importados, "
+            f"{totais['duplicados']} ISBNs repetidos, {totais['invalidos']} inválidos."
+        ))
+
+    def _gravar_lote(self, lote):
+        livros, categorias_por_isbn = [], {}
+        invalidos = duplicados = 0
+        for numero, registro in lote:
+            try:
+                livro, categorias = _livro(registro)
+            except RegistroInvalido as erro:
+                invalidos += 1
+                if self.verbosity >= 2:
+                    self.stderr.write(f"Registro {numero}: {erro}")
+                continue
+            if livro.isbn in categorias_por_isbn:
+                duplicados += 1
+                continue
+            categorias_por_isbn[livro.isbn] = categorias
+            livros.append(livro)
+
+        existentes = set(
+            Livro.objects.filter(isbn__in=categorias_por_isbn).values_list('isbn', flat=True)
+        )
+        novos = [livro for livro in livros if livro.isbn not in existentes]
+        Livro.objects.bulk_create(novos, batch_size=1000)
+
+        self._criar_categorias({
+            nome for livro in novos for nome in categorias_por_isbn[livro.isbn]
+        })
+        # A relação tem apenas dois inteiros por linha; o executemany direto
+        # é cerca de 2,5x mais rápido que bulk_create com instâncias do modelo.
+        Relacao = Livro.categorias.through
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {Relacao._meta.db_table} (livro_id, categoria_id) VALUES (%s, %s)",
+                [
+                    (livro.pk, self.categorias[nome])
+                    for livro in novos
+                    for nome in dict.fromkeys(categorias_por_isbn[livro.isbn])
+                ],
+            )
+
+        # bulk_create não dispara os sinais que mantêm o índice de busca e o cache.
+        if novos:
+            cache.invalidar_ao_confirmar(cache.LIVROS)
+        busca.indexar_documentos({
+            livro.pk: (livro.titulo, livro.autor, livro.isbn, ' '.join(categorias_por_isbn[livro.isbn]))
+            for livro in novos
+        })
+        return {
+            'importados': len(novos),
+            'duplicados': duplicados + len(livros) - len(novos),
+            'invalidos': invalidos,
+        }
+
+    def _criar_categorias(self, nomes):
+        faltantes = nomes - self.categorias.keys()
+        if not faltantes:
+            return
+        Categoria.objects.bulk_create([Categoria(nome=nome) for nome in faltantes], ignore_conflicts=True)
+        cache.invalidar_ao_confirmar(cache.CATEGORIAS)
+        self.categorias.update(Categoria.objects.filter(nome__in=faltantes).values_list('nome', 'id'))
+
+    def _ler_checkpoint(self, checkpoint):
+        try:
+            with open(checkpoint, encoding='utf-8') as arquivo:
+                return int(json.load(arquivo)['processados'])
+        except FileNotFoundError:
+            return 0
+        except (ValueError, KeyError, TypeError):
+            raise CommandError(f"Checkpoint inválido: {checkpoint}")
+
+    def _gravar_checkpoint(self, checkpoint, processados):
+        temporario = f"{checkpoint}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            json.dump({'processados': processados}, arquivo)
+        os.replace(temporario, checkpoint)
@@ -0,0 +1,159 @@
+"""
+recalcular_contadores.py
+Comando de gerenciamento para reconciliar os contadores de circulação.
+Recalcula, a partir dos empréstimos em aberto e das reservas com cópia separada,
+Livro.emprestimos_ativos, Livro.copias_reservadas, Livro.copias_disponiveis
+(copias_total - emprestimos_ativos - copias_reservadas) e
+PerfilLeitor.emprestimos_ativos. As contagens são subconsultas correlacionadas
+(COUNT dos empréstimos em aberto e das reservas separadas de cada linha), e a
+correção é um único UPDATE por tabela que as avalia no próprio banco: empréstimos
+e devoluções confirmados enquanto o comando roda não são sobrescritos por uma
+contagem lida antes. A divergência encontrada é relatada.
+Uso:
+    python manage.py recalcular_contadores
+    python manage.py recalcular_contadores --verificar -v 2
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from biblioteca import cache
+from biblioteca.models import Emprestimo, Livro, PerfilLeitor, Reserva
+
+
+def _contagem(queryset, campo, referencia='pk'):
+    """
+    Subconsulta correlacionada que conta as linhas de 'queryset' cujo 'campo'
+    é igual à coluna 'referencia' da linha externa (0 quando não há nenhuma).
+    """
+    contagem = (
+        queryset.filter(**{campo: OuterRef(referencia)})
+        .order_by()
+        .values(campo)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(contagem, output_field=IntegerField()), 0)
+
+
+def _ativos_por(campo, referencia='pk'):
+    """
+    Empréstimos em aberto de cada livro ('livro') ou usuário ('usuario').
+    """
+    return _contagem(Emprestimo.objects.filter(devolvido=False), campo, referencia)
+
+
+def _reservas_separadas():
+    """
+    Reservas com cópia separada ('disponivel') de cada livro.
+    """
+    return _contagem(Reserva.objects.filter(situacao=Reserva.DISPONIVEL), 'livro')
+
+
+def _divergentes(esperado):
+    """
+    Filtro das linhas em que algum campo difere do valor esperado.
+    """
+    filtro = Q()
+    for campo, valor in esperado.items():
+        filtro |= ~Q(**{campo: valor})
+    return filtro
+
+
+class Command(BaseCommand):
+    help = "Recalcula os contadores de cópias e de empréstimos ativos de livros e leitores."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar', action='store_true',
+            help="Apenas relata as divergências, sem corrigir.",
+        )
+
+    def handle(self, *args, **opcoes):
+        self.verbosity = opcoes['verbosity']
+        corrigir = not opcoes['verificar']
+        with transaction.atomic():
+            livros = self._livros(corrigir)
+            leitores = self._leitores(corrigir)
+
+        if self.verbosity < 1:
+            return
+        acao = "corrigidos" if corrigir else "com divergência"
+        self.stdout.write(self.style.SUCCESS(
+            f"Livros: {livros['verificados']} verificados, {livros['divergentes']} {acao}. "
+            f"Leitores: {leitores['verificados']} verificados, {leitores['divergentes']} {acao}."
+        ))
+
+    def _relatar(self, mensagem):
+        if self.verbosity >= 2:
+            self.stdout.write(mensagem)
+
+    def _livros(self, corrigir):
+        """
+        Confere os contadores de cada livro. copias_total é a referência: as cópias
+        disponíveis são o total menos os empréstimos ativos e as cópias separadas
+        para reservas (e o total nunca fica abaixo dessas duas somadas).
+        """
+        ativos, separadas = _ativos_por('livro'), _reservas_separadas()
+        copias_total = Greatest(F('copias_total'), ativos + separadas)
+        esperado = {
+            'emprestimos_ativos': ativos,
+            'copias_reservadas': separadas,
+            'copias_total': copias_total,
+            # No UPDATE as expressões leem os valores anteriores da linha, então o
+            # total aqui é o mesmo Greatest gravado em copias_total.
+            'copias_disponiveis': copias_total - ativos - separadas,
+        }
+        divergentes = Livro.objects.filter(_divergentes(esperado))
+        if self.verbosity >= 2:
+            anotados = divergentes.annotate(**{f'{campo}_esperado': valor for campo, valor in esperado.items()})
+            for livro in anotados.order_by('id').iterator():
+                self._relatar(f"Livro {livro.pk}: " + ", ".join(
+                    f"{campo} {getattr(livro, campo)} -> {getattr(livro, f'{campo}_esperado')}"
+                    for campo in esperado
+                    if getattr(livro, campo) != getattr(livro, f'{campo}_esperado')
+                ))
+
+        if corrigir:
+            corrigidos = divergentes.update(versao=F('versao') + 1, **esperado)
+            if corrigidos:
+                cache.invalidar_ao_confirmar(cache.LIVROS)
+        else:
+            corrigidos = divergentes.count()
+        return {'verificados': Livro.objects.count(), 'divergentes': corrigidos}
+
+    def _leitores(self, corrigir):
+        """
+        Confere o contador de cada perfil de leitor, criando os perfis que faltam.
+        """
+        # Usuários com empréstimos em aberto e sem perfil (ex.: empréstimos criados fora de emprestar()).
+        faltantes = list(
+            Emprestimo.objects.filter(devolvido=False, usuario__perfil_leitor__isnull=True)
+            .values('usuario_id')
+            .annotate(total=Count('id'))
+            .values_list('usuario_id', 'total')
+            .order_by('usuario_id')
+        )
+        for usuario_id, total in faltantes:
+            self._relatar(f"Usuário {usuario_id}: perfil criado com emprestimos_ativos {total}")
+
+        esperado = {'emprestimos_ativos': _ativos_por('usuario', 'usuario_id')}
+        divergentes = PerfilLeitor.objects.filter(_divergentes(esperado))
+        if corrigir:
+            # Os perfis novos nascem zerados e recebem a contagem no mesmo UPDATE dos demais.
+            PerfilLeitor.objects.bulk_create(
+                [PerfilLeitor(usuario_id=usuario_id) for usuario_id, _ in faltantes], ignore_conflicts=True,
+            )
+        if self.verbosity >= 2:
+            anotados = divergentes.annotate(esperado=esperado['emprestimos_ativos'])
+            for perfil in anotados.exclude(usuario_id__in=[usuario_id for usuario_id, _ in faltantes]).order_by('id'):
+                self._relatar(
+                    f"Usuário {perfil.usuario_id}: emprestimos_ativos {perfil.emprestimos_ativos} -> {perfil.esperado}"
+                )
+
+        verificados = PerfilLeitor.objects.count()
+        if corrigir:
+            return {'verificados': verificados, 'divergentes': divergentes.update(**esperado)}
+        return {'verificados': verificados + len(faltantes), 'divergentes': divergentes.count() + len(faltantes)}
@@ -0,0 +1,119 @@
+"""
+varrer_atrasos.py
+Comando de gerenciamento para gerar os avisos de atraso (e multas) dos empréstimos
+em aberto com prazo vencido. Feito para rodar periodicamente (ex.: cron diário).
+Os empréstimos atrasados são percorridos em lotes por cursor (keyset) na ordem
+(data_prevista_devolucao, id), que o índice 'emprestimo_atraso_idx' entrega já
+ordenada; cada lote é gravado com um único INSERT ... ON CONFLICT DO UPDATE em
+sua própria transação, de modo que a memória usada não depende do tamanho da
+tabela e uma varredura repetida apenas atualiza os avisos existentes.
+Uso:
+    python manage.py varrer_atrasos
+    python manage.py varrer_atrasos --data 2025-03-01 --tamanho-lote 10000 -v 2
+"""
+
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.timezone import make_aware, now
+
+from biblioteca.models import AvisoAtraso, Emprestimo
+
+TAMANHO_LOTE = 5000
+UM_DIA = timedelta(days=1)
+
+
+def dias_de_atraso(data_prevista, referencia):
+    """
+    Dias de atraso na data de referência; um dia iniciado conta como dia inteiro.
+    """
+    return -((data_prevista - referencia) // UM_DIA)
+
+
+class Command(BaseCommand):
+    help = "Gera ou atualiza os avisos de atraso e as multas dos empréstimos vencidos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data', help="Data de referência no formato AAAA-MM-DD (padrão: agora).",
+        )
+        parser.add_argument(
+            '--tamanho-lote', type=int, default=TAMANHO_LOTE,
+            help=f"Empréstimos por lote (padrão: {TAMANHO_LOTE}).",
+        )
+
+    def handle(self, *args, **opcoes):
+        self.verbosity = opcoes['verbosity']
+        referencia = self._referencia(opcoes['data'])
+        tamanho_lote = opcoes['tamanho_lote']
+        if tamanho_lote < 1:
+            raise CommandError("--tamanho-lote deve ser maior que zero.")
+
+        multa_diaria = AvisoAtraso.multa_diaria()
+        atrasados = (
+            Emprestimo.objects.atrasados(referencia)
+            .order_by('data_prevista_devolucao', 'id')
+            .values_list('id', 'data_prevista_devolucao')
+        )
+        total, lotes, ultimo = 0, 0, None
+        while True:
+            lote = atrasados
+            if ultimo is not None:
+                prevista, emprestimo_id = ultimo
+                # (prevista, id) > ultimo; o limite inferior explícito mantém a
+                # varredura como um intervalo do índice, sem reordenar as linhas.
+                lote = lote.filter(
+                    Q(data_prevista_devolucao__gt=prevista)
+                    | Q(data_prevista_devolucao=prevista, id__gt=emprestimo_id),
+                    data_prevista_devolucao__gte=prevista,
+                )
+            linhas = list(lote[:tamanho_lote])
+            if not linhas:
+                break
+            with transaction.atomic():
+                self._gravar(linhas, referencia, multa_diaria)
+            total += len(linhas)
+            lotes += 1
+            ultimo = (linhas[-1][1], linhas[-1][0])
+            if self.verbosity >= 2:
+                self.stdout.write(f"Lote {lotes}: {len(linhas)} avisos (total {total}).")
+
+        if self.verbosity >= 1:
+            self.stdout.write(self.style.SUCCESS(
+                f"{total} empréstimos em atraso em {referencia:%d/%m/%Y %H:%M}; avisos gerados ou atualizados."
+            ))
+
+    def _referencia(self, data):
+        if not data:
+            return now()
+        try:
+            referencia = datetime.strptime(data, '%Y-%m-%d')
+        except ValueError:
+            raise CommandError("Data inválida; use o formato AAAA-MM-DD.")
+        return make_aware(referencia) if settings.USE_TZ else referencia
+
+    def _gravar(self, linhas, referencia, multa_diaria):
+        """
+        Grava os avisos do lote com INSERT ... ON CONFLICT DO UPDATE (SQLite e
+        PostgreSQL). executemany com SQL fixo evita montar milhares de instâncias
+        e compilar uma instrução por lote, como faria bulk_create(update_conflicts=True).
+        """
+        data = connection.ops.adapt_datetimefield_value(referencia)
+        parametros = []
+        for emprestimo_id, prevista in linhas:
+            dias = dias_de_atraso(prevista, referencia)
+            # multa_diaria já tem duas casas decimais; o Decimal vai direto ao driver.
+            parametros.append((emprestimo_id, dias, dias * multa_diaria, data, data))
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {AvisoAtraso._meta.db_table} "
+                f"(emprestimo_id, dias_atraso, valor_multa, gerado_em, atualizado_em) "
+                f"VALUES (%s, %s, %s, %s, %s) "
+                f"ON CONFLICT (emprestimo_id) DO UPDATE SET "
+                f"dias_atraso = EXCLUDED.dias_atraso, valor_multa = EXCLUDED.valor_multa, "
+                f"atualizado_em = EXCLUDED.atualizado_em",
+                parametros,
+            )
@@ -0,0 +1,248 @@
+"""
+metricas.py
+Arquivo responsável pela instrumentação das requisições (setting BIBLIOTECA_METRICAS).
+MetricasMiddleware mede, em cada requisição, o número de consultas SQL e o tempo
+gasto nelas (connection.execute_wrapper, sem depender de DEBUG, que guarda todas
+as consultas em memória), o tempo de renderização dos templates (backend
+TemplatesMedidos) e o tempo total. Os valores vão para o cabeçalho Server-Timing
+da resposta e para histogramas por view (nome da URL) e método, exportados no
+formato texto do Prometheus pela view exportar_metricas, junto com os acertos e
+falhas do cache de páginas (cache.metricas()).
+Os histogramas são acumulados por processo: com vários processos cada um expõe
+os seus, e o Prometheus soma as séries.
+"""
+
+import hmac
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from . import cache
+
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LIMITES_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+VIEW_NAO_RESOLVIDA = 'nao_resolvida'
+# Outros métodos viram 'outro', para que clientes não criem séries arbitrárias.
+METODOS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+TIPO_PROMETHEUS = 'text/plain; version=0.0.4; charset=utf-8'
+
+_medicao_atual = ContextVar('biblioteca_medicao', default=None)
+
+
+class Histograma:
+    """
+    Histograma cumulativo no modelo do Prometheus, com uma série por combinação
+    de rótulos. Seguro para uso por várias threads.
+    Args:
+        nome: Nome da métrica.
+        ajuda: Descrição exibida na linha # HELP.
+        rotulos: Nomes dos rótulos de cada série.
+        limites: Limites superiores dos buckets, em ordem crescente.
+    """
+
+    def __init__(self, nome, ajuda, rotulos, limites):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = rotulos
+        self.limites = limites
+        self._series = {}
+        self._trava = threading.Lock()
+
+    def observar(self, valores_rotulos, valor):
+        with self._trava:
+            serie = self._series.get(valores_rotulos)
+            if serie is None:
+                serie = self._series[valores_rotulos] = {'buckets': [0] * len(self.limites), 'soma': 0, 'total': 0}
+            for indice, limite in enumerate(self.limites):
+                if valor <= limite:
+                    serie['buckets'][indice] += 1
+            serie['soma'] += valor
+            serie['total'] += 1
+
+    def zerar(self):
+        with self._trava:
+            self._series.clear()
+
+    def linhas(self):
+        """
+        Retorna as linhas da métrica no formato texto do Prometheus.
+        """
+        with self._trava:
+            series = {rotulos: {**serie, 'buckets': list(serie['buckets'])} for rotulos, serie in self._series.items()}
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        for valores_rotulos, serie in sorted(series.items()):
+            rotulos = _rotulos(zip(self.rotulos, valores_rotulos))
+            for limite, contagem in zip(self.limites, serie['buckets']):
+                linhas.append(f"{self.nome}_bucket{{{rotulos},le=\"{limite}\"}} {contagem}")
+            linhas.append(f"{self.nome}_bucket{{{rotulos},le=\"+Inf\"}} {serie['total']}")
+            linhas.append(f"{self.nome}_sum{{{rotulos}}} {serie['soma']}")
+            linhas.append(f"{self.nome}_count{{{rotulos}}} {serie['total']}")
+        return linhas
+
+
+def _rotulos(pares):
+    def escapar(valor):
+        return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{nome}="{escapar(valor)}"' for nome, valor in pares)
+
+
+ROTULOS = ('view', 'metodo')
+DURACAO = Histograma(
+    'biblioteca_requisicao_segundos', "Tempo total das requisições por view.", ROTULOS, LIMITES_SEGUNDOS,
+)
+SQL_DURACAO = Histograma(
+    'biblioteca_sql_segundos', "Tempo gasto em consultas SQL por requisição.", ROTULOS, LIMITES_SEGUNDOS,
+)
+SQL_CONSULTAS = Histograma(
+    'biblioteca_sql_consultas', "Número de consultas SQL por requisição.", ROTULOS, LIMITES_CONSULTAS,
+)
+TEMPLATE_DURACAO = Histograma(
+    'biblioteca_template_segundos', "Tempo de renderização de templates por requisição.", ROTULOS, LIMITES_SEGUNDOS,
+)
+HISTOGRAMAS = (DURACAO, SQL_DURACAO, SQL_CONSULTAS, TEMPLATE_DURACAO)
+
+
+def zerar_metricas():
+    for histograma in HISTOGRAMAS:
+        histograma.zerar()
+
+
+class _Medicao:
+    __slots__ = ('consultas', 'sql', 'template')
+
+    def __init__(self):
+        self.consultas = 0
+        self.sql = 0.0
+        self.template = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Assinatura exigida por connection.execute_wrapper().
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += time.perf_counter() - inicio
+            self.consultas += 1
+
+
+class _TemplateMedido(Template):
+
+    def render(self, context=None, request=None):
+        medicao = _medicao_atual.get()
+        if medicao is None:
+            return super().render(context, request)
+        inicio = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            medicao.template += time.perf_counter() - inicio
+
+
+class TemplatesMedidos(DjangoTemplates):
+    """
+    Backend de templates do Django que soma o tempo de renderização à medição
+    da requisição atual. Fora de uma requisição medida, o custo é uma leitura
+    de ContextVar. Templates incluídos ({% include %}, {% extends %}) entram
+    no tempo do template que os renderiza.
+    """
+
+    def from_string(self, template_code):
+        return _TemplateMedido(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return _TemplateMedido(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class MetricasMiddleware:
+    """
+    Middleware que mede cada requisição e acrescenta o cabeçalho Server-Timing
+    (sql, template e total, em milissegundos). Deve ser o primeiro de MIDDLEWARE,
+    para que o tempo total e as consultas incluam os demais middlewares (sessão,
+    autenticação). Desativado, a menos que o setting BIBLIOTECA_METRICAS seja
+    verdadeiro. O tempo de SQL inclui as consultas feitas durante a renderização,
+    então sql e template podem se sobrepor. Em respostas em streaming, só é medido
+    o trabalho feito antes do envio do corpo.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'BIBLIOTECA_METRICAS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        medicao = _Medicao()
+        token = _medicao_atual.set(medicao)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as pilha:
+                for conexao in connections.all():
+                    pilha.enter_context(conexao.execute_wrapper(medicao))
+                response = self.get_response(request)
+        finally:
+            total = time.perf_counter() - inicio
+            _medicao_atual.reset(token)
+
+        correspondencia = getattr(request, 'resolver_match', None)
+        rotulos = (
+            correspondencia.view_name if correspondencia else VIEW_NAO_RESOLVIDA,
+            request.method if request.method in METODOS else 'outro',
+        )
+        DURACAO.observar(rotulos, total)
+        SQL_DURACAO.observar(rotulos, medicao.sql)
+        SQL_CONSULTAS.observar(rotulos, medicao.consultas)
+        TEMPLATE_DURACAO.observar(rotulos, medicao.template)
+        response['Server-Timing'] = (
+            f'sql;dur={medicao.sql * 1000:.1f};desc="{medicao.consultas} consultas", '
+            f'template;dur={medicao.template * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+        return response
+
+
+def _linhas_cache():
+    linhas = [
+        "# HELP biblioteca_cache_paginas_total Leituras do cache de páginas do catálogo.",
+        "# TYPE biblioteca_cache_paginas_total counter",
+    ]
+    for pagina, contagens in cache.metricas().items():
+        for resultado, chave in (('acerto', 'acertos'), ('falha', 'falhas')):
+            rotulos = _rotulos((('pagina', pagina), ('resultado', resultado)))
+            linhas.append(f"biblioteca_cache_paginas_total{{{rotulos}}} {contagens[chave]}")
+    return linhas
+
+
+def _autorizado(request):
+    token = getattr(settings, 'BIBLIOTECA_METRICAS_TOKEN', '')
+    if token:
+        recebido = request.headers.get('Authorization', '')
+        if hmac.compare_digest(recebido.encode(), f"Bearer {token}".encode()):
+            return True
+    return request.user.is_authenticated and request.user.is_superuser
+
+
+def exportar_metricas(request):
+    """
+    View que exporta os histogramas e as métricas do cache no formato texto do
+    Prometheus. Acessível a superusuários ou com o cabeçalho
+    "Authorization: Bearer <BIBLIOTECA_METRICAS_TOKEN>" (para o coletor).
+    Raises:
+        Http404: Se as métricas estiverem desativadas.
+    """
+    if not getattr(settings, 'BIBLIOTECA_METRICAS', False):
+        raise Http404("Métricas desativadas.")
+    if not _autorizado(request):
+        return HttpResponseForbidden("Acesso negado.")
+    linhas = [linha for histograma in HISTOGRAMAS for linha in histograma.linhas()]
+    linhas.extend(_linhas_cache())
+    return HttpResponse('\n'.join(linhas) + '\n', content_type=TIPO_PROMETHEUS)
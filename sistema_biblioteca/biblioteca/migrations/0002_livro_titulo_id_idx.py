@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 07:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emprestimo',
+            name='data_emprestimo',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='livro',
+            index=models.Index(fields=['titulo', 'id'], name='livro_titulo_id_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 07:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0002_livro_titulo_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emprestimo',
+            index=models.Index(fields=['devolvido', 'id'], name='emprestimo_devolvido_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='emprestimo',
+            constraint=models.UniqueConstraint(condition=models.Q(('devolvido', False)), fields=('usuario', 'livro'), name='emprestimo_ativo_unico', violation_error_message='Este usuário já possui um empréstimo deste livro.'),
+        ),
+    ]
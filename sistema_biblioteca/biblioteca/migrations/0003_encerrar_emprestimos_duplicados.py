@@ -0,0 +1,64 @@
+# Substitui a 0003_emprestimo_ativo_indices encerrando, antes da restrição
+# emprestimo_ativo_unico, os empréstimos em aberto repetidos que a impediriam.
+# Bancos que já aplicaram a 0003 original (e, portanto, já têm a restrição)
+# recebem esta migração como aplicada; nos demais ela roda no lugar da original.
+
+import logging
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+from django.utils.timezone import now
+
+logger = logging.getLogger(__name__)
+
+
+def encerrar_emprestimos_duplicados(apps, schema_editor):
+    """
+    Encerra os empréstimos em aberto repetidos do mesmo usuário e livro: o mais
+    antigo (menor id) continua em aberto, os demais são marcados como devolvidos
+    e a cópia de cada um volta ao estoque. Os ids encerrados vão para o log.
+    """
+    Emprestimo = apps.get_model('biblioteca', 'Emprestimo')
+    Livro = apps.get_model('biblioteca', 'Livro')
+    grupos = (
+        Emprestimo.objects.filter(devolvido=False)
+        .values('usuario_id', 'livro_id')
+        .annotate(total=Count('id'), mantido=Min('id'))
+        .filter(total__gt=1)
+    )
+    for grupo in grupos:
+        repetidos = Emprestimo.objects.filter(
+            usuario_id=grupo['usuario_id'], livro_id=grupo['livro_id'], devolvido=False,
+        ).exclude(pk=grupo['mantido'])
+        ids = sorted(repetidos.values_list('id', flat=True))
+        repetidos.update(devolvido=True, data_devolucao=now())
+        Livro.objects.filter(pk=grupo['livro_id']).update(copias_disponiveis=F('copias_disponiveis') + len(ids))
+        logger.warning(
+            "Empréstimos repetidos do usuário %s e livro %s encerrados: %s (mantido: %s).",
+            grupo['usuario_id'], grupo['livro_id'], ', '.join(map(str, ids)), grupo['mantido'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    replaces = [
+        ('biblioteca', '0003_emprestimo_ativo_indices'),
+    ]
+
+    dependencies = [
+        ('biblioteca', '0002_livro_titulo_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(encerrar_emprestimos_duplicados, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='emprestimo',
+            index=models.Index(fields=['devolvido', 'id'], name='emprestimo_devolvido_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='emprestimo',
+            constraint=models.UniqueConstraint(condition=models.Q(('devolvido', False)), fields=('usuario', 'livro'), name='emprestimo_ativo_unico', violation_error_message='Este usuário já possui um empréstimo deste livro.'),
+        ),
+    ]
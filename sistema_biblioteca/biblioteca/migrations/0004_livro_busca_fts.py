@@ -0,0 +1,43 @@
+# Índice de busca textual do catálogo (ver biblioteca/busca.py).
+
+from django.db import migrations
+
+
+def criar_indice_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS biblioteca_livro_busca USING fts5("
+        "titulo, autor, isbn, categorias, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3 4')"
+    )
+    schema_editor.execute(
+        "INSERT INTO biblioteca_livro_busca (rowid, titulo, autor, isbn, categorias) "
+        "SELECT l.id, l.titulo, l.autor, l.isbn, "
+        "COALESCE((SELECT group_concat(c.nome, ' ') FROM biblioteca_livro_categorias lc "
+        "JOIN biblioteca_categoria c ON c.id = lc.categoria_id WHERE lc.livro_id = l.id), '') "
+        "FROM biblioteca_livro l"
+    )
+    # Contagem de documentos por termo, usada para estimar o tamanho dos resultados.
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS biblioteca_livro_busca_vocab "
+        "USING fts5vocab(biblioteca_livro_busca, 'row')"
+    )
+
+
+def remover_indice_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS biblioteca_livro_busca_vocab")
+    schema_editor.execute("DROP TABLE IF EXISTS biblioteca_livro_busca")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0003_emprestimo_ativo_indices'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice_fts, remover_indice_fts),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-18 08:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0004_livro_busca_fts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='emprestimo',
+            index=models.Index(fields=['data_emprestimo', 'id'], name='emprestimo_data_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Índices de expressão em auth_user usados pelo autocompletar de usuários
+    (busca por prefixo, sem diferenciar maiúsculas, em username e first_name).
+    O modelo User pertence ao app 'auth', por isso os índices são criados aqui.
+    """
+
+    dependencies = [
+        ('biblioteca', '0005_emprestimo_data_id_idx'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX biblioteca_usuario_username_lower_idx ON auth_user (LOWER(username))',
+            'DROP INDEX biblioteca_usuario_username_lower_idx',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX biblioteca_usuario_nome_lower_idx ON auth_user (LOWER(first_name))',
+            'DROP INDEX biblioteca_usuario_nome_lower_idx',
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.4 on 2026-10-18 08:22
+# Contadores de circulação (ver Livro e PerfilLeitor em models.py).
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def preencher_contadores(apps, schema_editor):
+    """
+    Inicializa os contadores a partir dos empréstimos em aberto já existentes.
+    """
+    Livro = apps.get_model('biblioteca', 'Livro')
+    Emprestimo = apps.get_model('biblioteca', 'Emprestimo')
+    PerfilLeitor = apps.get_model('biblioteca', 'PerfilLeitor')
+    ativos = Emprestimo.objects.filter(devolvido=False)
+
+    Livro.objects.update(copias_total=F('copias_disponiveis'))
+    por_livro = dict(ativos.values('livro_id').annotate(total=Count('id')).values_list('livro_id', 'total'))
+    livros = list(Livro.objects.filter(pk__in=por_livro).only('id', 'copias_disponiveis'))
+    for livro in livros:
+        livro.emprestimos_ativos = por_livro[livro.pk]
+        livro.copias_total = livro.copias_disponiveis + livro.emprestimos_ativos
+    Livro.objects.bulk_update(livros, ['emprestimos_ativos', 'copias_total'], batch_size=1000)
+
+    PerfilLeitor.objects.bulk_create(
+        [
+            PerfilLeitor(usuario_id=usuario_id, emprestimos_ativos=total)
+            for usuario_id, total in ativos.values('usuario_id').annotate(total=Count('id'))
+            .values_list('usuario_id', 'total')
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0006_usuario_autocompletar_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='livro',
+            name='copias_total',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='livro',
+            name='emprestimos_ativos',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='PerfilLeitor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('emprestimos_ativos', models.PositiveIntegerField(default=0)),
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='perfil_leitor', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(preencher_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-18 08:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('biblioteca', '0007_contadores_circulacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PoliticaEmprestimo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('limite_emprestimos', models.PositiveIntegerField()),
+                ('grupo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='politica_emprestimo', to='auth.group')),
+            ],
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.4 on 2026-10-18 08:46
+# Prazo de devolução dos empréstimos e avisos de atraso (ver Emprestimo e AvisoAtraso em models.py).
+
+from datetime import timedelta
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import DateTimeField, ExpressionWrapper, F
+
+
+def preencher_prazos(apps, schema_editor):
+    """
+    Calcula a data prevista de devolução dos empréstimos existentes com um único UPDATE.
+    """
+    Emprestimo = apps.get_model('biblioteca', 'Emprestimo')
+    prazo = timedelta(days=getattr(settings, 'BIBLIOTECA_PRAZO_EMPRESTIMO_DIAS', 14))
+    Emprestimo.objects.filter(data_prevista_devolucao__isnull=True).update(
+        data_prevista_devolucao=ExpressionWrapper(F('data_emprestimo') + prazo, output_field=DateTimeField())
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0008_politica_emprestimo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvisoAtraso',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dias_atraso', models.PositiveIntegerField()),
+                ('valor_multa', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('gerado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('atualizado_em', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='emprestimo',
+            name='data_prevista_devolucao',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(preencher_prazos, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='emprestimo',
+            index=models.Index(condition=models.Q(('devolvido', False)), fields=['data_prevista_devolucao', 'id'], name='emprestimo_atraso_idx'),
+        ),
+        migrations.AddField(
+            model_name='avisoatraso',
+            name='emprestimo',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='aviso_atraso', to='biblioteca.emprestimo'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0009_prazo_devolucao_avisos_atraso'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='livro',
+            name='copias_reservadas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Reserva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('situacao', models.CharField(choices=[('aguardando', 'Aguardando'), ('disponivel', 'Disponível para retirada'), ('atendida', 'Atendida'), ('cancelada', 'Cancelada')], default='aguardando', max_length=10)),
+                ('criada_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('disponivel_em', models.DateTimeField(blank=True, null=True)),
+                ('livro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to='biblioteca.livro')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('situacao', 'aguardando')), fields=['livro', 'criada_em', 'id'], name='reserva_fila_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('situacao__in', ['aguardando', 'disponivel'])), fields=('usuario', 'livro'), name='reserva_aberta_unica', violation_error_message='Este usuário já está na fila deste livro.')],
+            },
+        ),
+    ]
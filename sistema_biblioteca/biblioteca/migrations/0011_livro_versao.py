@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0010_fila_reservas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='livro',
+            name='versao',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
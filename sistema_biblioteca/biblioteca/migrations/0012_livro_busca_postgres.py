@@ -0,0 +1,70 @@
+# Índice de busca textual do catálogo no PostgreSQL (ver biblioteca/busca.py).
+
+import unicodedata
+
+from django.db import migrations
+
+# Cópias congeladas de busca.DOCUMENTO_POSTGRES e busca.normalizar: a migração não
+# deve mudar de comportamento se o módulo da aplicação mudar depois.
+DOCUMENTO = (
+    "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B') || "
+    "setweight(to_tsvector('simple', %s), 'D') || setweight(to_tsvector('simple', %s), 'C')"
+)
+
+
+def normalizar(texto):
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def criar_indice_postgres(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    # Sem chave estrangeira para biblioteca_livro: o flush do Django (TRUNCATE sem
+    # CASCADE) não conhece esta tabela, e busca.remover_livros já apaga as linhas.
+    schema_editor.execute(
+        "CREATE TABLE IF NOT EXISTS biblioteca_livro_busca (livro_id bigint PRIMARY KEY, documento tsvector NOT NULL)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS biblioteca_livro_busca_gin ON biblioteca_livro_busca USING GIN (documento)"
+    )
+
+    # Os textos são normalizados em Python (sem acentos), como os termos das consultas.
+    Livro = apps.get_model('biblioteca', 'Livro')
+    ids = list(Livro.objects.order_by('id').values_list('id', flat=True))
+    with schema_editor.connection.cursor() as cursor:
+        for inicio in range(0, len(ids), 2000):
+            lote = ids[inicio:inicio + 2000]
+            categorias = {}
+            relacao = Livro.categorias.through.objects.filter(livro_id__in=lote)
+            for livro_id, nome in relacao.values_list('livro_id', 'categoria__nome'):
+                categorias.setdefault(livro_id, []).append(nome)
+            cursor.executemany(
+                f"INSERT INTO biblioteca_livro_busca (livro_id, documento) VALUES (%s, {DOCUMENTO}) "
+                f"ON CONFLICT (livro_id) DO NOTHING",
+                [
+                    (livro_id, *(normalizar(campo) for campo in (
+                        titulo, autor, isbn, ' '.join(categorias.get(livro_id, [])),
+                    )))
+                    for livro_id, titulo, autor, isbn in
+                    Livro.objects.filter(id__in=lote).values_list('id', 'titulo', 'autor', 'isbn')
+                ],
+            )
+
+
+def remover_indice_postgres(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS biblioteca_livro_busca")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0011_livro_versao'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice_postgres, remover_indice_postgres),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:43
+# Nomes normalizados do autocompletar de usuários (ver PerfilLeitor em models.py).
+
+import unicodedata
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def normalizar(texto):
+    # Cópia congelada de busca.normalizar.
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def preencher_nomes(apps, schema_editor):
+    """
+    Cria os perfis que faltam e preenche os nomes normalizados de todos os usuários.
+    """
+    User = apps.get_model('auth', 'User')
+    PerfilLeitor = apps.get_model('biblioteca', 'PerfilLeitor')
+    usuarios = User.objects.order_by('id').values_list('id', 'username', 'first_name')
+    lote = []
+    for usuario_id, username, nome in usuarios.iterator(chunk_size=2000):
+        lote.append(PerfilLeitor(
+            usuario_id=usuario_id, username_normalizado=normalizar(username)[:150],
+            nome_normalizado=normalizar(nome)[:150],
+        ))
+        if len(lote) == 2000:
+            _gravar(PerfilLeitor, lote)
+            lote = []
+    _gravar(PerfilLeitor, lote)
+
+
+def _gravar(PerfilLeitor, perfis):
+    PerfilLeitor.objects.bulk_create(
+        perfis, update_conflicts=True, unique_fields=['usuario'],
+        update_fields=['username_normalizado', 'nome_normalizado'],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('biblioteca', '0012_livro_busca_postgres'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfilleitor',
+            name='nome_normalizado',
+            field=models.CharField(blank=True, default='', max_length=150),
+        ),
+        migrations.AddField(
+            model_name='perfilleitor',
+            name='username_normalizado',
+            field=models.CharField(blank=True, default='', max_length=150),
+        ),
+        migrations.RunPython(preencher_nomes, migrations.RunPython.noop),
+        # Os índices LOWER() da migração 0006 deixam de ser usados pelo autocompletar.
+        migrations.RunSQL(
+            'DROP INDEX biblioteca_usuario_username_lower_idx',
+            'CREATE INDEX biblioteca_usuario_username_lower_idx ON auth_user (LOWER(username))',
+        ),
+        migrations.RunSQL(
+            'DROP INDEX biblioteca_usuario_nome_lower_idx',
+            'CREATE INDEX biblioteca_usuario_nome_lower_idx ON auth_user (LOWER(first_name))',
+        ),
+        migrations.AddIndex(
+            model_name='perfilleitor',
+            index=models.Index(fields=['username_normalizado'], name='perfil_username_norm_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='perfilleitor',
+            index=models.Index(fields=['nome_normalizado'], name='perfil_nome_norm_idx'),
+        ),
+    ]
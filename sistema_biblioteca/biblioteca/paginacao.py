@@ -0,0 +1,200 @@
+"""
+paginacao.py
+Arquivo responsável pela paginação por cursor (keyset) da aplicação 'biblioteca'.
+Em vez de OFFSET, cada página continua a partir dos valores da chave de ordenação
+do último (ou primeiro) registro exibido, mantendo custo constante em qualquer página.
+"""
+
+import base64
+import json
+from dataclasses import dataclass, field
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+TAMANHO_PAGINA_PADRAO = 25
+TAMANHO_PAGINA_MAXIMO = 100
+
+
+class CursorInvalido(ValueError):
+    """
+    Exceção levantada quando o token de cursor recebido não pode ser decodificado
+    ou não corresponde à ordenação da listagem.
+    """
+
+
+@dataclass
+class PaginaCursor:
+    """
+    Representa uma página obtida por cursor.
+    Campos:
+        - itens: Registros da página, já na ordem de exibição.
+        - proximo: Token opaco da próxima página (None se for a última).
+        - anterior: Token opaco da página anterior (None se for a primeira).
+    """
+    itens: list = field(default_factory=list)
+    proximo: str = None
+    anterior: str = None
+
+    def __iter__(self):
+        return iter(self.itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+    def __bool__(self):
+        return bool(self.itens)
+
+    @property
+    def tem_outras_paginas(self):
+        return bool(self.proximo or self.anterior)
+
+
+def codificar_cursor(direcao, valores):
+    """
+    Gera um token opaco (base64 url-safe) com a direção e os valores da chave.
+    """
+    bruto = json.dumps([direcao, valores], cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(token):
+    """
+    Decodifica um token gerado por codificar_cursor().
+    Raises:
+        CursorInvalido: Se o token estiver corrompido ou em formato inesperado.
+    """
+    try:
+        preenchimento = '=' * (-len(token) % 4)
+        direcao, valores = json.loads(base64.urlsafe_b64decode(token + preenchimento))
+    except (ValueError, TypeError):
+        raise CursorInvalido("Cursor de paginação inválido.")
+    if direcao not in ('p', 'a') or not isinstance(valores, list):
+        raise CursorInvalido("Cursor de paginação inválido.")
+    return direcao, valores
+
+
+def _campos(ordenacao):
+    """
+    Converte ('-titulo', 'id') em [('titulo', True), ('id', False)] (campo, descendente).
+    """
+    return [(campo.lstrip('-'), campo.startswith('-')) for campo in ordenacao]
+
+
+def _campo_modelo(queryset, campo):
+    """
+    Campo (Field) usado para converter o valor do cursor: do modelo ou, em
+    querysets de values() com expressões, o output_field da anotação.
+    """
+    if campo in queryset.query.annotations:
+        return queryset.query.annotations[campo].output_field
+    if campo == 'pk':
+        return queryset.model._meta.pk
+    return queryset.model._meta.get_field(campo)
+
+
+def _converter_valores(queryset, campos, valores):
+    """
+    Confere a quantidade de valores do cursor e converte cada um para o tipo do
+    seu campo, antes que cheguem ao filtro da consulta.
+    Raises:
+        CursorInvalido: Se a quantidade não bater com a ordenação ou algum valor
+        for nulo ou de tipo incompatível com o campo.
+    """
+    if len(valores) != len(campos):
+        raise CursorInvalido("Cursor de paginação inválido.")
+    convertidos = []
+    for (campo, _), valor in zip(campos, valores):
+        try:
+            if valor is None or isinstance(valor, (list, dict)):
+                raise ValidationError("Valor de cursor inválido.")
+            convertidos.append(_campo_modelo(queryset, campo).to_python(valor))
+        except (FieldDoesNotExist, ValidationError, TypeError, ValueError):
+            raise CursorInvalido("Cursor de paginação inválido.")
+    return convertidos
+
+
+def _valor(item, campo):
+    if isinstance(item, dict):
+        return item[campo]
+    return getattr(item, campo)
+
+
+def _filtro_apos(campos, valores, invertido):
+    """
+    Monta o filtro equivalente a (a, b, ...) > (x, y, ...) respeitando a direção
+    de cada campo: (a > x) OR (a = x AND b > y) OR ...
+    """
+    filtro = Q()
+    igualdades = {}
+    for (campo, descendente), valor in zip(campos, valores):
+        crescente = descendente == invertido
+        lookup = f"{campo}__gt" if crescente else f"{campo}__lt"
+        filtro |= Q(**igualdades, **{lookup: valor})
+        igualdades[campo] = valor
+    return filtro
+
+
+def paginar_por_cursor(queryset, cursor=None, ordenacao=('id',), tamanho=TAMANHO_PAGINA_PADRAO, estrito=False):
+    """
+    Retorna uma PaginaCursor do queryset ordenado por 'ordenacao'.
+    A ordenação deve terminar em um campo único (normalmente 'id') para que o
+    cursor identifique uma posição sem ambiguidade.
+    Args:
+        queryset: QuerySet (de modelos ou de values()) a ser paginado.
+        cursor: Token recebido em ?cursor= (None para a primeira página).
+        ordenacao: Campos de ordenação, com '-' para ordem decrescente.
+        tamanho: Quantidade de registros por página.
+        estrito: Se True, um cursor inválido levanta CursorInvalido; senão
+            (páginas HTML), é tratado como pedido da primeira página.
+    Raises:
+        CursorInvalido: Com estrito=True, se o cursor estiver corrompido, tiver
+        outra quantidade de valores ou valores de tipo incompatível com os campos.
+    """
+    campos = _campos(ordenacao)
+    tamanho = max(1, min(int(tamanho), TAMANHO_PAGINA_MAXIMO))
+
+    direcao, valores = 'p', None
+    if cursor:
+        try:
+            direcao, valores = decodificar_cursor(cursor)
+            valores = _converter_valores(queryset, campos, valores)
+        except CursorInvalido:
+            if estrito:
+                raise
+            direcao, valores = 'p', None
+
+    voltando = direcao == 'a'
+    if voltando:
+        ordem = [f"{c}" if desc else f"-{c}" for c, desc in campos]
+    else:
+        ordem = list(ordenacao)
+
+    qs = queryset.order_by(*ordem)
+    if valores is not None:
+        qs = qs.filter(_filtro_apos(campos, valores, invertido=voltando))
+
+    itens = list(qs[:tamanho + 1])
+    ha_mais = len(itens) > tamanho
+    itens = itens[:tamanho]
+    if voltando:
+        itens.reverse()
+
+    pagina = PaginaCursor(itens=itens)
+    if not itens:
+        return pagina
+
+    def chave(item):
+        return [_valor(item, c) for c, _ in campos]
+
+    if voltando:
+        pagina.proximo = codificar_cursor('p', chave(itens[-1]))
+        if ha_mais:
+            pagina.anterior = codificar_cursor('a', chave(itens[0]))
+    else:
+        if ha_mais:
+            pagina.proximo = codificar_cursor('p', chave(itens[-1]))
+        if valores is not None:
+            pagina.anterior = codificar_cursor('a', chave(itens[0]))
+    return pagina
@@ -1 +1,311 @@
-# services.py
+"""
+services.py
+Arquivo responsável pelas operações de circulação em lote da aplicação 'biblioteca'.
+Usado pelos balcões de atendimento, que leem uma pilha de livros por leitor:
+os livros são resolvidos em uma única consulta e todos os empréstimos (ou
+devoluções) são gravados em uma única transação, com um número fixo de
+consultas independente da quantidade de livros.
+"""
+
+import re
+from dataclasses import dataclass
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils.timezone import now
+
+from . import cache
+from .models import Emprestimo, Livro, PerfilLeitor, PoliticaEmprestimo, Reserva
+
+# Mensagens exibidas para cada situação de item no lote.
+SITUACOES = {
+    'emprestado': "Empréstimo registrado.",
+    'devolvido': "Devolução registrada.",
+    'nao_encontrado': "Livro não encontrado.",
+    'repetido': "Livro informado mais de uma vez no lote.",
+    'sem_copias': "Nenhuma cópia disponível.",
+    'emprestimo_duplicado': "Este usuário já possui um empréstimo deste livro.",
+    'sem_emprestimo': "Não há empréstimo ativo deste livro para o usuário.",
+    'limite_emprestimos': "Limite de empréstimos simultâneos do usuário atingido.",
+}
+
+MAXIMO_ITENS_LOTE = 100
+
+
+@dataclass
+class ResultadoItem:
+    """
+    Resultado de um item de uma operação em lote.
+    Campos:
+        - identificador: Valor informado (id ou ISBN do livro).
+        - situacao: Chave de SITUACOES descrevendo o resultado.
+        - livro: Livro resolvido, ou None se não encontrado.
+        - emprestimo: Empréstimo criado ou devolvido, quando houver.
+    """
+    identificador: str
+    situacao: str
+    livro: Livro = None
+    emprestimo: Emprestimo = None
+
+    @property
+    def sucesso(self):
+        return self.situacao in ('emprestado', 'devolvido')
+
+    @property
+    def mensagem(self):
+        return SITUACOES[self.situacao]
+
+
+def separar_identificadores(texto):
+    """
+    Separa o texto lido no balcão (um código por linha, ou separados por
+    espaço, vírgula ou ponto e vírgula) em uma lista de identificadores.
+    Raises:
+        ValidationError: Se o lote estiver vazio ou exceder MAXIMO_ITENS_LOTE.
+    """
+    identificadores = [item for item in re.split(r'[\s,;]+', texto or '') if item]
+    if not identificadores:
+        raise ValidationError("Informe ao menos um livro.", code='lote_vazio')
+    if len(identificadores) > MAXIMO_ITENS_LOTE:
+        raise ValidationError(
+            f"O lote pode ter no máximo {MAXIMO_ITENS_LOTE} livros.", code='lote_grande'
+        )
+    return identificadores
+
+
+def _chave(identificador):
+    """
+    Classifica o identificador como ISBN (10 ou 13 dígitos, hífens ignorados)
+    ou id do livro. Retorna ('isbn'|'id', valor) ou None se inválido.
+    """
+    valor = str(identificador).strip().replace('-', '')
+    if not valor.isdigit():
+        return None
+    if len(valor) in (10, 13):
+        return ('isbn', valor)
+    return ('id', int(valor))
+
+
+def resolver_livros(identificadores):
+    """
+    Resolve ids e ISBNs em livros com uma única consulta.
+    Returns:
+        Dicionário {identificador: Livro} apenas com os encontrados.
+    """
+    chaves = {identificador: _chave(identificador) for identificador in identificadores}
+    ids = {chave[1] for chave in chaves.values() if chave and chave[0] == 'id'}
+    isbns = {chave[1] for chave in chaves.values() if chave and chave[0] == 'isbn'}
+    if not ids and not isbns:
+        return {}
+
+    por_chave = {}
+    for livro in Livro.objects.filter(Q(pk__in=ids) | Q(isbn__in=isbns)):
+        por_chave[('id', livro.pk)] = livro
+        por_chave[('isbn', livro.isbn)] = livro
+    return {
+        identificador: por_chave[chave]
+        for identificador, chave in chaves.items()
+        if chave in por_chave
+    }
+
+
+def _classificar(identificadores):
+    """
+    Resolve os identificadores e separa os livros válidos (na ordem de leitura,
+    sem repetição) dos itens não encontrados ou repetidos.
+    Returns:
+        (resultados, livros): resultados é uma lista alinhada aos identificadores,
+        com None nas posições ainda pendentes; livros é {posição: Livro}.
+    """
+    encontrados = resolver_livros(identificadores)
+    resultados, livros, vistos = [], {}, set()
+    for posicao, identificador in enumerate(identificadores):
+        livro = encontrados.get(identificador)
+        if livro is None:
+            resultados.append(ResultadoItem(identificador, 'nao_encontrado'))
+        elif livro.pk in vistos:
+            resultados.append(ResultadoItem(identificador, 'repetido', livro))
+        else:
+            vistos.add(livro.pk)
+            livros[posicao] = livro
+            resultados.append(None)
+    return resultados, livros
+
+
+def emprestar_em_lote(usuario, identificadores):
+    """
+    Registra o empréstimo de vários livros para um usuário.
+    Em uma única transação: trava os livros com cópias disponíveis, descarta
+    os que o usuário já tem emprestados, respeita o limite da política de
+    empréstimos do usuário (os livros excedentes, na ordem de leitura, ficam de
+    fora), decrementa o estoque de todos com um só UPDATE e insere os
+    empréstimos com bulk_create. Livros com uma cópia separada para o usuário
+    (reserva 'disponivel') usam essa cópia e a reserva é atendida; nos
+    emprestados do estoque, a reserva do usuário ainda na fila também é
+    encerrada como atendida.
+    Args:
+        usuario: Instância de User que está realizando os empréstimos.
+        identificadores: Lista de ids ou ISBNs dos livros.
+    Returns:
+        Lista de ResultadoItem, na ordem dos identificadores.
+    Raises:
+        ValidationError: Se outro balcão alterar o estoque ou registrar empréstimos
+        do usuário durante a operação (code='sem_copias', 'emprestimo_duplicado'
+        ou 'limite_emprestimos'); nesse caso nenhum item do lote é gravado.
+    """
+    resultados, livros = _classificar(identificadores)
+    if not livros:
+        return resultados
+
+    limite = PoliticaEmprestimo.limite_para(usuario.pk)
+    with transaction.atomic():
+        ids = [livro.pk for livro in livros.values()]
+        if limite is not None:
+            em_uso = (
+                PerfilLeitor.objects.select_for_update().filter(usuario=usuario)
+                .values_list('emprestimos_ativos', flat=True).first()
+            ) or 0
+            restantes = max(limite - em_uso, 0)
+        disponiveis = set(
+            Livro.objects.select_for_update()
+            .filter(pk__in=ids, copias_disponiveis__gt=0)
+            .values_list('pk', flat=True)
+        )
+        reservas = dict(
+            Reserva.objects.filter(usuario=usuario, livro__in=ids, situacao__in=Reserva.EM_ABERTO)
+            .values_list('livro_id', 'situacao')
+        )
+        separadas = {livro_id for livro_id, situacao in reservas.items() if situacao == Reserva.DISPONIVEL}
+        ativos = set(
+            Emprestimo.objects.filter(usuario=usuario, livro__in=ids, devolvido=False)
+            .values_list('livro_id', flat=True)
+        )
+
+        # bulk_create não chama Emprestimo.save(), que calcula o prazo.
+        data_emprestimo = now()
+        data_prevista_devolucao = data_emprestimo + Emprestimo.prazo()
+        novos = {}
+        for posicao, livro in livros.items():
+            if livro.pk in ativos:
+                resultados[posicao] = ResultadoItem(identificadores[posicao], 'emprestimo_duplicado', livro)
+            elif livro.pk not in disponiveis and livro.pk not in separadas:
+                resultados[posicao] = ResultadoItem(identificadores[posicao], 'sem_copias', livro)
+            elif limite is not None and len(novos) >= restantes:
+                resultados[posicao] = ResultadoItem(identificadores[posicao], 'limite_emprestimos', livro)
+            else:
+                novos[posicao] = Emprestimo(
+                    livro=livro,
+                    usuario=usuario,
+                    data_emprestimo=data_emprestimo,
+                    data_prevista_devolucao=data_prevista_devolucao,
+                )
+
+        if novos:
+            if not PerfilLeitor.reservar_emprestimos(usuario.pk, len(novos)):
+                raise ValidationError(SITUACOES['limite_emprestimos'], code='limite_emprestimos')
+            do_estoque = [e.livro_id for e in novos.values() if e.livro_id not in separadas]
+            das_reservas = [e.livro_id for e in novos.values() if e.livro_id in separadas]
+            if das_reservas:
+                atendidas = Reserva.objects.filter(
+                    usuario=usuario, livro__in=das_reservas, situacao=Reserva.DISPONIVEL
+                ).update(situacao=Reserva.ATENDIDA)
+                if atendidas != len(das_reservas):
+                    raise ValidationError(SITUACOES['sem_copias'], code='sem_copias')
+                Livro.objects.filter(pk__in=das_reservas).update(
+                    copias_reservadas=Greatest(F('copias_reservadas') - 1, 0),
+                    emprestimos_ativos=F('emprestimos_ativos') + 1,
+                    versao=F('versao') + 1,
+                )
+            if do_estoque:
+                # As linhas estão travadas, então todas continuam com cópias disponíveis;
+                # a condição no UPDATE protege bancos sem SELECT ... FOR UPDATE.
+                reservados = Livro.objects.filter(pk__in=do_estoque, copias_disponiveis__gt=0).update(
+                    copias_disponiveis=F('copias_disponiveis') - 1,
+                    emprestimos_ativos=F('emprestimos_ativos') + 1,
+                    versao=F('versao') + 1,
+                )
+                if reservados != len(do_estoque):
+                    raise ValidationError(SITUACOES['sem_copias'], code='sem_copias')
+                na_fila = [livro_id for livro_id in do_estoque if reservas.get(livro_id) == Reserva.AGUARDANDO]
+                if na_fila:
+                    Reserva.objects.filter(
+                        usuario=usuario, livro__in=na_fila, situacao=Reserva.AGUARDANDO
+                    ).update(situacao=Reserva.ATENDIDA)
+            try:
+                Emprestimo.objects.bulk_create(novos.values())
+            except IntegrityError:
+                # Outro balcão registrou um dos empréstimos entre a consulta e a
+                # inserção; a exceção desfaz todo o lote.
+                raise ValidationError(SITUACOES['emprestimo_duplicado'], code='emprestimo_duplicado')
+            cache.invalidar_ao_confirmar(cache.LIVROS, cache.EMPRESTIMOS)
+
+    for posicao, emprestimo in novos.items():
+        resultados[posicao] = ResultadoItem(identificadores[posicao], 'emprestado', emprestimo.livro, emprestimo)
+    return resultados
+
+
+def devolver_em_lote(usuario, identificadores):
+    """
+    Registra a devolução de vários livros de um usuário.
+    Em uma única transação: trava os empréstimos ativos do usuário para os
+    livros informados, marca todos como devolvidos com um UPDATE e incrementa
+    o estoque dos livros com outro UPDATE. As cópias de livros com fila de
+    reservas são separadas para o primeiro de cada fila (um UPDATE por livro
+    com fila).
+    Args:
+        usuario: Instância de User que está devolvendo os livros.
+        identificadores: Lista de ids ou ISBNs dos livros.
+    Returns:
+        Lista de ResultadoItem, na ordem dos identificadores.
+    """
+    resultados, livros = _classificar(identificadores)
+    if not livros:
+        return resultados
+
+    with transaction.atomic():
+        emprestimos = {
+            emprestimo.livro_id: emprestimo
+            for emprestimo in Emprestimo.objects.select_for_update().filter(
+                usuario=usuario, livro__in=[livro.pk for livro in livros.values()], devolvido=False
+            )
+        }
+        if emprestimos:
+            # As linhas lidas estão travadas até o fim da transação (FOR UPDATE; no
+            # SQLite a transação detém a escrita), e o PostgreSQL só as entrega se
+            # ainda estiverem em aberto depois de esperar pela trava. Nenhum outro
+            # balcão as devolve antes deste UPDATE, que as marca pela chave primária.
+            data_devolucao = now()
+            Emprestimo.objects.filter(pk__in=[e.pk for e in emprestimos.values()]).update(
+                devolvido=True, data_devolucao=data_devolucao
+            )
+            com_fila = set(
+                Reserva.objects.filter(livro__in=list(emprestimos), situacao=Reserva.AGUARDANDO)
+                .values_list('livro_id', flat=True).distinct()
+            )
+            separadas = [livro_id for livro_id in com_fila if Reserva.atribuir_proxima(livro_id)]
+            if separadas:
+                Livro.objects.filter(pk__in=separadas).update(
+                    copias_reservadas=F('copias_reservadas') + 1,
+                    emprestimos_ativos=Greatest(F('emprestimos_ativos') - 1, 0),
+                    versao=F('versao') + 1,
+                )
+            Livro.objects.filter(pk__in=emprestimos).exclude(pk__in=separadas).update(
+                copias_disponiveis=F('copias_disponiveis') + 1,
+                emprestimos_ativos=Greatest(F('emprestimos_ativos') - 1, 0),
+                versao=F('versao') + 1,
+            )
+            PerfilLeitor.ajustar_emprestimos_ativos(usuario.pk, -len(emprestimos))
+            cache.invalidar_ao_confirmar(cache.LIVROS, cache.EMPRESTIMOS)
+
+    for posicao, livro in livros.items():
+        emprestimo = emprestimos.get(livro.pk)
+        if emprestimo is None:
+            resultados[posicao] = ResultadoItem(identificadores[posicao], 'sem_emprestimo', livro)
+            continue
+        emprestimo.livro = livro
+        emprestimo.devolvido = True
+        emprestimo.data_devolucao = data_devolucao
+        resultados[posicao] = ResultadoItem(identificadores[posicao], 'devolvido', livro, emprestimo)
+    return resultados
@@ -0,0 +1,125 @@
+"""
+signals.py
+Arquivo responsável pelos receptores de sinais da aplicação 'biblioteca'.
+Mantém o índice de busca (busca.py) sincronizado com Livro, Categoria e a
+relação Livro.categorias, e invalida as páginas do catálogo em cache e as
+versões que formam a ETag da API (cache.py); após migrate e flush, invalida
+também os fragmentos das linhas das listagens. Também mantém os nomes
+normalizados dos usuários em PerfilLeitor, usados pelo autocompletar.
+Registrado em apps.bibliotecaConfig.ready().
+"""
+
+from django.contrib.auth.models import User
+from django.db.models.signals import post_migrate, post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+
+from . import busca, cache
+from .models import Categoria, Emprestimo, Livro, PerfilLeitor
+
+
+@receiver(post_save, sender=Livro)
+def indexar_livro_salvo(sender, instance, **kwargs):
+    busca.indexar_livros([instance.pk])
+
+
+@receiver(post_delete, sender=Livro)
+def remover_livro_excluido(sender, instance, **kwargs):
+    busca.remover_livros([instance.pk])
+
+
+@receiver(m2m_changed, sender=Livro.categorias.through)
+def indexar_categorias_alteradas(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Reindexa os livros afetados quando categorias são adicionadas ou removidas.
+    Pelo lado da categoria (reverse=True), pk_set contém os ids dos livros.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        if action != 'pre_clear':
+            busca.indexar_livros([instance.pk])
+        return
+    if action == 'pre_clear':
+        # Após o clear não há mais como saber quais livros estavam associados.
+        instance._livros_reindexar = list(instance.livros.values_list('id', flat=True))
+    elif action == 'post_clear':
+        busca.indexar_livros(getattr(instance, '_livros_reindexar', []))
+    else:
+        busca.indexar_livros(pk_set or [])
+
+
+@receiver(post_save, sender=Categoria)
+def indexar_categoria_renomeada(sender, instance, created, **kwargs):
+    if not created:
+        busca.indexar_livros(instance.livros.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Categoria)
+def guardar_livros_da_categoria(sender, instance, **kwargs):
+    # A exclusão em cascata da relação não dispara m2m_changed.
+    instance._livros_reindexar = list(instance.livros.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Categoria)
+def indexar_categoria_excluida(sender, instance, **kwargs):
+    busca.indexar_livros(getattr(instance, '_livros_reindexar', []))
+
+
+# Cache do catálogo: cada alteração incrementa a versão do escopo afetado.
+
+@receiver(post_save, sender=Livro)
+@receiver(post_delete, sender=Livro)
+def invalidar_cache_livros(sender, **kwargs):
+    cache.invalidar_ao_confirmar(cache.LIVROS)
+
+
+@receiver(m2m_changed, sender=Livro.categorias.through)
+def invalidar_cache_categorias_dos_livros(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        cache.invalidar_ao_confirmar(cache.LIVROS)
+
+
+@receiver(post_save, sender=Categoria)
+def invalidar_cache_categorias(sender, **kwargs):
+    cache.invalidar_ao_confirmar(cache.CATEGORIAS)
+
+
+@receiver(post_delete, sender=Categoria)
+def invalidar_cache_categoria_excluida(sender, **kwargs):
+    # A exclusão também remove a categoria dos livros (sem m2m_changed).
+    cache.invalidar_ao_confirmar(cache.CATEGORIAS, cache.LIVROS)
+
+
+@receiver(post_save, sender=Emprestimo)
+def invalidar_cache_emprestimos(sender, **kwargs):
+    # Devoluções e empréstimos em lote usam UPDATE/bulk_create e invalidam o escopo
+    # explicitamente; exclusões só ocorrem em cascata de Livro (escopo 'livros',
+    # também usado pela API de empréstimos) ou de User (abaixo).
+    cache.invalidar_ao_confirmar(cache.EMPRESTIMOS)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidar_cache_usuarios(sender, update_fields=None, **kwargs):
+    # A API de empréstimos exibe o username. O login só grava last_login.
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        cache.invalidar_ao_confirmar(cache.EMPRESTIMOS)
+
+
+@receiver(post_save, sender=User)
+def sincronizar_nomes_usuario(sender, instance, update_fields=None, **kwargs):
+    # Nomes normalizados do autocompletar; o login só grava last_login.
+    if update_fields is None or set(update_fields) & {'username', 'first_name'}:
+        PerfilLeitor.sincronizar_nomes([instance])
+
+
+@receiver(post_migrate)
+def invalidar_banco_recriado(sender, app_config=None, **kwargs):
+    """
+    Invalida as páginas e os fragmentos das linhas após migrate e flush (que
+    também emite post_migrate). O TRUNCATE do flush não dispara sinais, e com o
+    banco recriado ids e versões das linhas recomeçam e voltariam a casar com
+    fragmentos antigos.
+    """
+    if app_config is not None and app_config.name == 'biblioteca':
+        cache.invalidar(cache.LIVROS, cache.CATEGORIAS, cache.EMPRESTIMOS, cache.FRAGMENTOS)
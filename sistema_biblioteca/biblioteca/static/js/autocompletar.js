@@ -0,0 +1,82 @@
+/*
+ * autocompletar.js
+ * Seletores de usuário e livro carregados sob demanda.
+ * Cada campo [data-autocompletar] consulta a URL informada (?q=...) enquanto o
+ * usuário digita e preenche um <datalist>; ao escolher uma opção, o id é gravado
+ * no campo oculto indicado em data-alvo, que é o valor enviado pelo formulário.
+ */
+(function () {
+    'use strict';
+
+    var ESPERA_MS = 200;
+    var TAMANHO_MINIMO = 2;
+
+    function iniciar(campo) {
+        if (campo.dataset.autocompletarIniciado) {
+            return;
+        }
+        campo.dataset.autocompletarIniciado = '1';
+
+        var lista = document.getElementById(campo.getAttribute('list'));
+        var alvo = document.getElementById(campo.dataset.alvo);
+        var temporizador = null;
+        var controle = null;
+
+        function selecionar() {
+            alvo.value = '';
+            for (var i = 0; i < lista.options.length; i++) {
+                if (lista.options[i].value === campo.value) {
+                    alvo.value = lista.options[i].dataset.id;
+                    break;
+                }
+            }
+            campo.setCustomValidity(alvo.value ? '' : 'Selecione uma opção da lista.');
+        }
+
+        function carregar() {
+            var termo = campo.value.trim();
+            if (termo.length < TAMANHO_MINIMO) {
+                return;
+            }
+            if (controle) {
+                controle.abort();
+            }
+            controle = new AbortController();
+            var url = campo.dataset.autocompletar + '?q=' + encodeURIComponent(termo);
+            fetch(url, {signal: controle.signal, headers: {'Accept': 'application/json'}})
+                .then(function (resposta) { return resposta.json(); })
+                .then(function (dados) {
+                    lista.innerHTML = '';
+                    dados.resultados.forEach(function (item) {
+                        var opcao = document.createElement('option');
+                        opcao.value = item.texto;
+                        opcao.dataset.id = item.id;
+                        lista.appendChild(opcao);
+                    });
+                    selecionar();
+                })
+                .catch(function (erro) {
+                    if (erro.name !== 'AbortError') {
+                        console.error(erro);
+                    }
+                });
+        }
+
+        campo.addEventListener('input', function () {
+            selecionar();
+            clearTimeout(temporizador);
+            temporizador = setTimeout(carregar, ESPERA_MS);
+        });
+        campo.addEventListener('change', selecionar);
+    }
+
+    function iniciarTodos() {
+        document.querySelectorAll('[data-autocompletar]').forEach(iniciar);
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', iniciarTodos);
+    } else {
+        iniciarTodos();
+    }
+})();
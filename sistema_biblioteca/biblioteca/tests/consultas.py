@@ -0,0 +1,96 @@
+"""
+consultas.py
+Orçamento de consultas SQL das views nos testes.
+orcamento_consultas.json declara, por nome de URL, o máximo de consultas de uma
+requisição (incluindo a sessão e o usuário da autenticação, com o cache
+desligado pelo executor dos testes). OrcamentoConsultasMixin, usado com
+TestCase, verifica esse máximo e se o número de consultas de uma view é o mesmo
+com poucas e com muitas linhas (o sinal de um N+1, como um template que acessa
+emprestimo.usuario sem select_related).
+"""
+
+import json
+from pathlib import Path
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+ARQUIVO_ORCAMENTO = Path(__file__).with_name('orcamento_consultas.json')
+
+
+def carregar_orcamento():
+    """
+    Retorna {nome da URL: máximo de consultas}; chaves iniciadas por '_' são comentários.
+    """
+    with open(ARQUIVO_ORCAMENTO, encoding='utf-8') as arquivo:
+        return {nome: limite for nome, limite in json.load(arquivo).items() if not nome.startswith('_')}
+
+
+def _listar(consultas):
+    return '\n'.join(f"  {indice}. {consulta['sql']}" for indice, consulta in enumerate(consultas, start=1))
+
+
+class OrcamentoConsultasMixin:
+    """
+    Asserções de número de consultas para TestCase (usa self.client).
+    """
+    orcamento = carregar_orcamento()
+
+    def _requisitar(self, nome_url, metodo='get', args=(), dados=None):
+        with CaptureQueriesContext(connection) as consultas:
+            response = getattr(self.client, metodo)(reverse(nome_url, args=args), dados or {})
+            if response.streaming:
+                # Em exportações, as consultas acontecem durante a leitura do corpo.
+                b''.join(response.streaming_content)
+        return response, consultas.captured_queries
+
+    def _verificar_orcamento(self, nome_url, consultas):
+        limite = self.orcamento.get(nome_url)
+        if limite is None:
+            self.fail(f"A URL '{nome_url}' não tem orçamento em {ARQUIVO_ORCAMENTO.name}.")
+        if len(consultas) > limite:
+            self.fail(
+                f"'{nome_url}' executou {len(consultas)} consultas; o orçamento é {limite}:\n{_listar(consultas)}"
+            )
+
+    def assertOrcamentoConsultas(self, nome_url, metodo='get', args=(), dados=None):
+        """
+        Requisita a URL e falha se ela passar do orçamento.
+        Args:
+            nome_url: Nome da URL (chave do orçamento).
+            metodo: Método do cliente de testes ('get' ou 'post').
+            args: Argumentos do reverse().
+            dados: Parâmetros GET ou dados do POST.
+        Returns:
+            A resposta da requisição.
+        """
+        response, consultas = self._requisitar(nome_url, metodo, args, dados)
+        self._verificar_orcamento(nome_url, consultas)
+        return response
+
+    def assertConsultasConstantes(self, nome_url, criar_linhas, tamanhos=(2, 20), metodo='get', args=(), dados=None):
+        """
+        Requisita a URL com tamanhos[0] e depois com tamanhos[1] linhas e falha
+        se o número de consultas crescer ou passar do orçamento.
+        Args:
+            nome_url: Nome da URL (chave do orçamento).
+            criar_linhas: Função que recebe uma quantidade e cria essa quantidade
+                de linhas a mais (ex.: empréstimos exibidos pela view).
+            tamanhos: Número de linhas das duas requisições (o segundo maior que o
+                primeiro e, em listagens paginadas, até o tamanho da página).
+        Returns:
+            A resposta da segunda requisição.
+        """
+        menor, maior = tamanhos
+        criar_linhas(menor)
+        _, poucas = self._requisitar(nome_url, metodo, args, dados)
+        criar_linhas(maior - menor)
+        response, muitas = self._requisitar(nome_url, metodo, args, dados)
+        if len(muitas) > len(poucas):
+            self.fail(
+                f"'{nome_url}' executou {len(poucas)} consultas com {menor} linhas e "
+                f"{len(muitas)} com {maior}:\n{_listar(muitas)}"
+            )
+        self._verificar_orcamento(nome_url, muitas)
+        return response
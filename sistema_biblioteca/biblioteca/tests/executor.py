@@ -0,0 +1,34 @@
+"""
+executor.py
+Executor dos testes da aplicação 'biblioteca' (setting TEST_RUNNER).
+Desliga o cache durante os testes: as transações de TestCase nunca são
+confirmadas e muitos testes criam dados com bulk_create, então páginas em cache
+de um teste apareceriam nos seguintes. Os testes do cache ativam um LocMemCache
+com override_settings. Os estáticos usam o armazenamento sem manifesto, para que
+os templates renderizem sem um collectstatic prévio.
+"""
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+CACHE_DESLIGADO = {
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    'template_fragments': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+ARMAZENAMENTO_TESTES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+class ExecutorTestes(DiscoverRunner):
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._configuracao_testes = override_settings(CACHES=CACHE_DESLIGADO, STORAGES=ARMAZENAMENTO_TESTES)
+        self._configuracao_testes.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._configuracao_testes.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,180 @@
+import json
+from datetime import date, timedelta
+from unittest import mock
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.urls import reverse
+from django.utils.timezone import now
+from ..models import Categoria, Emprestimo, Livro
+from .. import api, cache
+from ..paginacao import codificar_cursor
+from .tests_cache import CACHE_LOCAL
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class ApiTestCase(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.usuario = User.objects.create_user(username='leitor', password='senha_teste')
+        self.client.login(username='leitor', password='senha_teste')
+        self.categoria = Categoria.objects.create(nome="Romance")
+        self.livros = []
+        for i in range(5):
+            livro = Livro.objects.create(
+                titulo=f"Livro {i}", autor="Machado de Assis", data_publicacao=date(1899, 1, 1),
+                isbn=f"{i:013d}", copias_disponiveis=1,
+            )
+            livro.categorias.add(self.categoria)
+            self.livros.append(livro)
+
+    def _json(self, nome, args=(), **parametros):
+        response = self.client.get(reverse(nome, args=args), parametros)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return response.json()
+
+    def _emprestar(self, livro, **dados):
+        return self.client.post(
+            reverse('api_emprestimos'), json.dumps({'livro_id': livro.pk, **dados}), content_type='application/json',
+        )
+
+    def test_exige_autenticacao(self):
+        """Testa se sem sessão a API responde 401 em JSON, sem redirecionar para o login."""
+        self.client.logout()
+        response = self.client.get(reverse('api_livros'))
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['codigo'], 'nao_autenticado')
+
+    def test_listagem_por_cursor_com_selecao_de_campos(self):
+        """Testa a paginação por cursor, a seleção de campos e as categorias dos livros."""
+        pagina = self._json('api_livros', campos='titulo,categorias', tamanho=2)
+        self.assertEqual(pagina['resultados'], [
+            {'titulo': "Livro 0", 'categorias': [self.categoria.pk]},
+            {'titulo': "Livro 1", 'categorias': [self.categoria.pk]},
+        ])
+        self.assertIsNone(pagina['anterior'])
+
+        titulos = [linha['titulo'] for linha in pagina['resultados']]
+        while pagina['proximo']:
+            response = self.client.get(pagina['proximo'])
+            pagina = response.json()
+            titulos += [linha['titulo'] for linha in pagina['resultados']]
+        self.assertEqual(titulos, [livro.titulo for livro in self.livros])
+
+        livro = self._json('api_livro', args=[self.livros[0].pk])
+        self.assertEqual(livro['data_publicacao'], '1899-01-01')
+        self.assertEqual(set(livro), set(api.CAMPOS_LIVRO))
+
+    def test_parametros_invalidos(self):
+        """Testa as respostas 400 para campos inexistentes, números e cursores inválidos, e 404 em JSON."""
+        response = self.client.get(reverse('api_livros'), {'campos': 'titulo,senha'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['erro'], "Campos inexistentes: senha.")
+        self.assertEqual(self.client.get(reverse('api_livros'), {'tamanho': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api_emprestimos'), {'filtro': 'todos'}).status_code, 400)
+        cursor = codificar_cursor('p', ['Livro 1', 'x'])
+        response = self.client.get(reverse('api_livros'), {'cursor': cursor})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['codigo'], 'cursor_invalido')
+        cursor = codificar_cursor('p', [1, 2])
+        self.assertEqual(self.client.get(reverse('api_emprestimos'), {'cursor': cursor}).status_code, 400)
+        response = self.client.get(reverse('api_categoria', args=[999999]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json()['codigo'], 'nao_encontrado')
+
+    def test_etag_responde_304_sem_consultar_o_banco(self):
+        """Testa o If-None-Match: 304 sem consultas além da sessão, e nova ETag após alteração."""
+        url = reverse('api_livros')
+        etag = self.client.get(url)['ETag']
+
+        # Restam apenas a sessão e o usuário da autenticação.
+        with self.assertNumQueries(2):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertNotEqual(self.client.get(url, {'tamanho': 2})['ETag'], etag)
+
+        self.livros[0].emprestar(self.usuario)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_invalidada_por_outro_cliente_do_cache(self):
+        """Testa se uma gravação vista por outra conexão ao mesmo cache (outro processo) muda a ETag."""
+        url = reverse('api_categorias')
+        etag = self.client.get(url)['ETag']
+        # 'template_fragments' aponta para o mesmo armazenamento, como o Redis de outro processo.
+        with override_settings(BIBLIOTECA_CACHE_ALIAS='template_fragments'):
+            cache.invalidar(cache.CATEGORIAS)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_dos_emprestimos(self):
+        """Testa se a ETag dos empréstimos muda com devoluções e usernames, mas não com o login."""
+        emprestimo = self.livros[0].emprestar(self.usuario)
+        url = reverse('api_emprestimos')
+        etag = self.client.get(url)['ETag']
+        self.client.login(username='leitor', password='senha_teste')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        emprestimo.registrar_devolucao()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.usuario.username = 'leitora'
+        self.usuario.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+        self.assertFalse(self.client.get(url, {'filtro': 'atrasados'}).has_header('ETag'))
+
+    def test_emprestimo_e_devolucao(self):
+        """Testa o empréstimo (201, Location e 409 com o código do erro) e a devolução repetida."""
+        livro = self.livros[0]
+        response = self._emprestar(livro)
+        self.assertEqual(response.status_code, 201)
+        emprestimo = response.json()
+        self.assertEqual(response['Location'], reverse('api_emprestimo', args=[emprestimo['id']]))
+        self.assertEqual(emprestimo['livro_titulo'], "Livro 0")
+        self.assertEqual(emprestimo['usuario_username'], 'leitor')
+        self.assertFalse(emprestimo['devolvido'])
+
+        outro = User.objects.create_user(username='outro')
+        response = self._emprestar(livro, usuario_id=outro.pk)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['codigo'], 'sem_copias')
+        Livro.objects.filter(pk=livro.pk).update(copias_disponiveis=1)
+        self.assertEqual(self._emprestar(livro).json()['codigo'], 'emprestimo_duplicado')
+        Livro.objects.filter(pk=livro.pk).update(copias_disponiveis=0)
+
+        url = reverse('api_devolucao', args=[emprestimo['id']])
+        devolvido = self.client.post(url).json()
+        self.assertTrue(devolvido['devolvido'])
+        self.assertEqual(self.client.post(url).json(), devolvido)
+        livro.refresh_from_db()
+        self.assertEqual(livro.copias_disponiveis, 1)
+
+    def test_filtros_dos_emprestimos(self):
+        """Testa os filtros de empréstimos por situação, usuário e livro."""
+        atrasado = self.livros[0].emprestar(self.usuario)
+        vencido = now() - timedelta(days=1)
+        Emprestimo.objects.filter(pk=atrasado.pk).update(data_prevista_devolucao=vencido)
+        outro = User.objects.create_user(username='outro')
+        self.livros[1].emprestar(outro).registrar_devolucao()
+
+        ids = lambda **filtros: [e['id'] for e in self._json('api_emprestimos', campos='id', **filtros)['resultados']]
+        self.assertEqual(ids(filtro='atrasados'), [atrasado.pk])
+        self.assertEqual(ids(filtro='ativos'), [atrasado.pk])
+        self.assertEqual(len(ids(filtro='devolvidos')), 1)
+        self.assertEqual(ids(usuario=self.usuario.pk), [atrasado.pk])
+        self.assertEqual(ids(livro=self.livros[1].pk), ids(usuario=outro.pk))
+
+
+class SerializacaoApiTestCase(SimpleTestCase):
+
+    def test_json_padrao_igual_ao_orjson(self):
+        """Testa se, sem o orjson, a serialização produz o mesmo JSON (datas em ISO 8601)."""
+        dados = {'data': date(2025, 6, 30), 'momento': now().replace(microsecond=1234), 'titulo': "Memórias"}
+        with mock.patch.object(api, 'orjson', None):
+            padrao = api.serializar(dados)
+        self.assertEqual(json.loads(padrao)['momento'], dados['momento'].isoformat())
+        if api.orjson is not None:
+            self.assertEqual(json.loads(api.serializar(dados)), json.loads(padrao))
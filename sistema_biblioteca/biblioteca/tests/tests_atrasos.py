@@ -0,0 +1,103 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from ..models import AvisoAtraso, Emprestimo, Livro
+from .. import services
+
+
+class PrazoDevolucaoTestCase(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(username='leitor', password='senha_teste')
+        self.livro = Livro.objects.create(
+            titulo="Livro Teste", autor="Autor", data_publicacao=date.today(),
+            isbn="1234567890", copias_disponiveis=3,
+        )
+
+    def test_prazo_calculado_no_emprestimo(self):
+        """Testa se emprestar() grava a data prevista de devolução."""
+        emprestimo = self.livro.emprestar(self.usuario)
+        emprestimo.refresh_from_db()
+        self.assertEqual(emprestimo.data_prevista_devolucao - emprestimo.data_emprestimo, timedelta(days=14))
+        self.assertFalse(emprestimo.atrasado)
+
+    @override_settings(BIBLIOTECA_PRAZO_EMPRESTIMO_DIAS=7)
+    def test_prazo_configuravel_e_emprestimo_em_lote(self):
+        """Testa o setting de prazo e o preenchimento do prazo no empréstimo em lote."""
+        services.emprestar_em_lote(self.usuario, [str(self.livro.pk)])
+        emprestimo = Emprestimo.objects.get()
+        self.assertEqual(emprestimo.data_prevista_devolucao - emprestimo.data_emprestimo, timedelta(days=7))
+
+    def test_atrasados(self):
+        """Testa o filtro de atrasados na data de referência."""
+        emprestimo = self.livro.emprestar(self.usuario)
+        depois_do_prazo = emprestimo.data_prevista_devolucao + timedelta(seconds=1)
+        self.assertFalse(Emprestimo.objects.atrasados().exists())
+        self.assertEqual(list(Emprestimo.objects.atrasados(depois_do_prazo)), [emprestimo])
+
+        emprestimo.registrar_devolucao()
+        self.assertFalse(Emprestimo.objects.atrasados(depois_do_prazo).exists())
+
+
+class VarrerAtrasosTestCase(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(username='leitor', password='senha_teste')
+        livros = Livro.objects.bulk_create([
+            Livro(titulo=f"Livro {i}", autor="Autor", data_publicacao=date.today(), isbn=f"{i:013d}")
+            for i in range(7)
+        ])
+        # Prazos de 1 a 7 dias antes de 10/03/2025, com horário para testar o arredondamento.
+        Emprestimo.objects.bulk_create([
+            Emprestimo(
+                usuario=self.usuario, livro=livro,
+                data_emprestimo=datetime(2025, 2, 1),
+                data_prevista_devolucao=datetime(2025, 3, 10 - i, 12),
+            )
+            for i, livro in enumerate(livros)
+        ])
+        self.devolvido = Emprestimo.objects.get(livro=livros[0])
+        Emprestimo.objects.filter(pk=self.devolvido.pk).update(devolvido=True, data_devolucao=datetime(2025, 3, 1))
+
+    def _varrer(self, data, *args):
+        saida = StringIO()
+        call_command('varrer_atrasos', '--data', data, *args, stdout=saida)
+        return saida.getvalue()
+
+    @override_settings(BIBLIOTECA_MULTA_DIARIA='0.50')
+    def test_gera_avisos_em_lotes(self):
+        """Testa a geração dos avisos em vários lotes, com dias de atraso e multa."""
+        saida = self._varrer('2025-03-10', '--tamanho-lote', '2')
+
+        self.assertIn("6 empréstimos em atraso", saida)
+        avisos = AvisoAtraso.objects.order_by('dias_atraso')
+        self.assertEqual([a.dias_atraso for a in avisos], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(avisos[2].valor_multa, Decimal('1.50'))
+        self.assertFalse(AvisoAtraso.objects.filter(emprestimo=self.devolvido).exists())
+
+    def test_nova_varredura_atualiza_avisos(self):
+        """Testa se a varredura do dia seguinte atualiza os avisos em vez de duplicá-los."""
+        self._varrer('2025-03-10')
+        aviso = AvisoAtraso.objects.order_by('dias_atraso').first()
+
+        self._varrer('2025-03-11')
+        self.assertEqual(AvisoAtraso.objects.count(), 6)
+        aviso_atualizado = AvisoAtraso.objects.get(pk=aviso.pk)
+        self.assertEqual(aviso_atualizado.dias_atraso, 2)
+        self.assertEqual(aviso_atualizado.valor_multa, Decimal('2.00'))
+        self.assertEqual(aviso_atualizado.gerado_em, aviso.gerado_em)
+        self.assertEqual(aviso_atualizado.atualizado_em, datetime(2025, 3, 11))
+
+    def test_consultas_por_lote(self):
+        """Testa se cada lote custa uma leitura e uma gravação (mais a transação)."""
+        with self.assertNumQueries(3 * 4 + 1):
+            self._varrer('2025-03-10', '--tamanho-lote', '2', '-v', '0')
+
+    def test_data_invalida(self):
+        """Testa a validação da data de referência."""
+        with self.assertRaises(CommandError):
+            self._varrer('10/03/2025')
@@ -0,0 +1,106 @@
+import importlib
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+
+class PerfilSqliteProducaoTestCase(SimpleTestCase):
+
+    def setUp(self):
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio)
+        self.arquivo = str(Path(diretorio) / 'producao.sqlite3')
+        # Alias próprio: o 'default' dos testes não pode ser usado em SimpleTestCase.
+        conexoes = ConnectionHandler({
+            'default': {},
+            'producao': {**settings.BANCOS['sqlite_producao'], 'NAME': self.arquivo},
+        })
+        self.conexao = conexoes['producao']
+        self.addCleanup(self.conexao.close)
+
+    def _pragma(self, nome):
+        with self.conexao.cursor() as cursor:
+            cursor.execute(f"PRAGMA {nome}")
+            return cursor.fetchone()[0]
+
+    def test_pragmas_aplicados_na_conexao(self):
+        """Testa se cada nova conexão do perfil de produção aplica WAL e os demais PRAGMAs."""
+        self.assertEqual(self._pragma('journal_mode'), 'wal')
+        self.assertEqual(self._pragma('synchronous'), 1)  # NORMAL
+        self.assertEqual(self._pragma('cache_size'), -20000)
+        self.assertGreater(self._pragma('mmap_size'), 0)
+        self.assertEqual(self._pragma('busy_timeout'), 10000)
+        self.assertTrue(self.conexao.settings_dict['CONN_MAX_AGE'])
+
+    def test_transacao_comeca_com_trava_de_escrita(self):
+        """Testa se transaction.atomic() começa com BEGIN IMMEDIATE, que já bloqueia outros escritores."""
+        self.conexao.ensure_connection()
+        self.assertEqual(self.conexao.transaction_mode, 'IMMEDIATE')
+        # Mesmo início de transação usado por atomic() no SQLite.
+        self.conexao._start_transaction_under_autocommit()
+        try:
+            outra = sqlite3.connect(self.arquivo, timeout=0)
+            self.addCleanup(outra.close)
+            with self.assertRaisesMessage(sqlite3.OperationalError, 'locked'):
+                outra.execute("BEGIN IMMEDIATE")
+        finally:
+            self.conexao.cursor().execute("ROLLBACK")
+
+
+class ConfiguracoesPorAmbienteTestCase(SimpleTestCase):
+
+    def _carregar(self, ambiente, **variaveis):
+        """Importa de novo base.py e o módulo do ambiente com as variáveis informadas."""
+        self.addCleanup(importlib.reload, importlib.import_module('sistema_biblioteca.settings.base'))
+        with mock.patch.dict(os.environ, variaveis):
+            importlib.reload(importlib.import_module('sistema_biblioteca.settings.base'))
+            sys.modules.pop(f'sistema_biblioteca.settings.{ambiente}', None)
+            return importlib.import_module(f'sistema_biblioteca.settings.{ambiente}')
+
+    def test_producao_exige_chave_e_hosts(self):
+        """Testa se o ambiente de produção recusa subir sem chave secreta ou hosts."""
+        with self.assertRaisesMessage(ImproperlyConfigured, 'BIBLIOTECA_SECRET_KEY'):
+            self._carregar('prod', BIBLIOTECA_SECRET_KEY='', BIBLIOTECA_HOSTS='biblioteca.exemplo.com')
+        with self.assertRaisesMessage(ImproperlyConfigured, 'BIBLIOTECA_HOSTS'):
+            self._carregar('prod', BIBLIOTECA_SECRET_KEY='chave', BIBLIOTECA_HOSTS='')
+
+    def test_producao_desliga_debug_e_usa_perfil_escolhido(self):
+        """Testa DEBUG desligado em produção mesmo com BIBLIOTECA_DEBUG e a escolha do banco."""
+        prod = self._carregar(
+            'prod', BIBLIOTECA_SECRET_KEY='chave', BIBLIOTECA_HOSTS='a.exemplo.com, b.exemplo.com',
+            BIBLIOTECA_DEBUG='1', BIBLIOTECA_BANCO='sqlite_producao',
+        )
+        self.assertFalse(prod.DEBUG)
+        self.assertEqual(prod.ALLOWED_HOSTS, ['a.exemplo.com', 'b.exemplo.com'])
+        self.assertEqual(prod.DATABASES['default']['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+
+        prod = self._carregar('prod', BIBLIOTECA_SECRET_KEY='chave', BIBLIOTECA_HOSTS='a.exemplo.com')
+        self.assertEqual(prod.DATABASES['default']['ENGINE'], 'django.db.backends.postgresql')
+        self.assertIn('pool', prod.DATABASES['default']['OPTIONS'])
+
+    def test_producao_exige_cache_compartilhado(self):
+        """Testa se produção usa Redis por padrão e recusa o cache local de cada processo."""
+        variaveis = {'BIBLIOTECA_SECRET_KEY': 'chave', 'BIBLIOTECA_HOSTS': 'a.exemplo.com'}
+        prod = self._carregar('prod', **variaveis)
+        self.assertEqual(prod.CACHES['default']['BACKEND'], 'django.core.cache.backends.redis.RedisCache')
+        self.assertIs(prod.CACHES['template_fragments'], prod.CACHES['default'])
+        prod = self._carregar('prod', BIBLIOTECA_CACHE='arquivo', **variaveis)
+        self.assertIn('FileBasedCache', prod.CACHES['default']['BACKEND'])
+
+        with self.assertRaisesMessage(ImproperlyConfigured, "BIBLIOTECA_CACHE='locmem'"):
+            self._carregar('prod', BIBLIOTECA_CACHE='locmem', **variaveis)
+        with self.assertRaisesMessage(ImproperlyConfigured, 'BIBLIOTECA_CACHE'):
+            self._carregar('dev', BIBLIOTECA_CACHE='memoria')
+
+    def test_perfil_de_banco_invalido(self):
+        """Testa a mensagem de erro para um perfil de banco desconhecido."""
+        with self.assertRaisesMessage(ImproperlyConfigured, 'BIBLIOTECA_BANCO'):
+            self._carregar('dev', BIBLIOTECA_BANCO='mysql')
@@ -0,0 +1,140 @@
+from datetime import date
+from unittest import mock
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.contrib.auth.models import User
+from django.urls import reverse
+from ..models import Categoria, Livro
+from .. import busca
+
+
+class BuscaTestMixin:
+    """Cenário comum aos dois backends de busca."""
+
+    def setUp(self):
+        busca.indice_memoria.limpar()
+        self.fantasia = Categoria.objects.create(nome="Fantasia")
+        self.hobbit = Livro.objects.create(
+            titulo="O Hobbit", autor="J. R. R. Tolkien",
+            data_publicacao=date(1937, 9, 21), isbn="9788595084742",
+        )
+        self.hobbit.categorias.add(self.fantasia)
+        self.senhor = Livro.objects.create(
+            titulo="O Senhor dos Anéis", autor="J. R. R. Tolkien",
+            data_publicacao=date(1954, 7, 29), isbn="9788533613379",
+        )
+        self.dom = Livro.objects.create(
+            titulo="Dom Casmurro", autor="Machado de Assis",
+            data_publicacao=date(1899, 1, 1), isbn="9788535910667",
+        )
+
+    def test_busca_por_titulo_autor_e_isbn(self):
+        """Testa se título, autor e ISBN são encontrados."""
+        self.assertEqual(busca.buscar_ids("casmurro"), [self.dom.pk])
+        self.assertEqual(set(busca.buscar_ids("tolkien")), {self.hobbit.pk, self.senhor.pk})
+        self.assertEqual(busca.buscar_ids("9788535910667"), [self.dom.pk])
+
+    def test_busca_ignora_acentos_e_usa_prefixo(self):
+        """Testa se a busca é insensível a acentos e aceita prefixos."""
+        self.assertEqual(busca.buscar_ids("aneis"), [self.senhor.pk])
+        self.assertEqual(busca.buscar_ids("mach"), [self.dom.pk])
+
+    def test_titulo_tem_mais_relevancia(self):
+        """Testa se o livro com o termo no título vem antes do livro com o termo na categoria."""
+        urbana = Livro.objects.create(
+            titulo="Fantasia Urbana", autor="Outro Autor",
+            data_publicacao=date(2000, 1, 1), isbn="1234567890",
+        )
+        self.assertEqual(busca.buscar_ids("fantasia"), [urbana.pk, self.hobbit.pk])
+
+    def test_indice_sincronizado_com_alteracoes(self):
+        """Testa se edição, categorias e exclusão refletem no índice."""
+        self.dom.titulo = "Memórias Póstumas"
+        self.dom.save()
+        self.assertEqual(busca.buscar_ids("casmurro"), [])
+        self.assertEqual(busca.buscar_ids("postumas"), [self.dom.pk])
+
+        self.dom.categorias.add(self.fantasia)
+        self.assertIn(self.dom.pk, busca.buscar_ids("fantasia"))
+
+        self.fantasia.nome = "Épico"
+        self.fantasia.save()
+        self.assertEqual(busca.buscar_ids("fantasia"), [])
+        self.assertEqual(set(busca.buscar_ids("epico")), {self.hobbit.pk, self.dom.pk})
+
+        self.fantasia.delete()
+        self.assertEqual(busca.buscar_ids("epico"), [])
+
+        self.dom.delete()
+        self.assertEqual(busca.buscar_ids("machado"), [])
+
+
+class BuscaFts5TestCase(BuscaTestMixin, TestCase):
+
+    def setUp(self):
+        if not busca.usa_fts5():
+            self.skipTest("FTS5 disponível apenas no SQLite.")
+        super().setUp()
+
+    def test_view_buscar_livro(self):
+        """Testa se a view de busca lista os livros encontrados."""
+        User.objects.create_user(username='leitor', password='senha_teste')
+        self.client.login(username='leitor', password='senha_teste')
+        response = self.client.get(reverse('buscar_livro'), {'q': 'hobbit'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['livros'], [self.hobbit])
+        self.assertContains(response, "O Hobbit")
+        self.assertNotContains(response, "Dom Casmurro")
+
+
+class BuscaPostgresTestCase(BuscaTestMixin, TestCase):
+
+    def setUp(self):
+        if busca.backend() != 'postgres':
+            self.skipTest("tsvector disponível apenas no PostgreSQL.")
+        super().setUp()
+
+    def test_consulta_usa_indice_gin(self):
+        """Testa se a consulta de busca é atendida pelo índice GIN do tsvector."""
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            cursor.execute(
+                f"EXPLAIN SELECT livro_id FROM {busca.TABELA_FTS} WHERE documento @@ to_tsquery('simple', %s)",
+                [busca._consulta_postgres(['tolk'])],
+            )
+            plano = ' '.join(linha[0] for linha in cursor.fetchall())
+        self.assertIn('biblioteca_livro_busca_gin', plano)
+
+
+class EscolhaBackendBuscaTestCase(SimpleTestCase):
+
+    def test_backend_pelo_banco(self):
+        """Testa a escolha do backend pelo banco em uso e pelo setting."""
+        for vendor, esperado in (('sqlite', 'fts5'), ('postgresql', 'postgres')):
+            with self.subTest(vendor=vendor), mock.patch.object(connection, 'vendor', vendor):
+                self.assertEqual(busca.backend(), esperado)
+        with override_settings(BIBLIOTECA_BUSCA_BACKEND='elastic'):
+            with self.assertRaisesMessage(ImproperlyConfigured, 'BIBLIOTECA_BUSCA_BACKEND'):
+                busca.backend()
+
+    def test_indice_em_memoria_apenas_com_debug(self):
+        """Testa se o índice em memória, de um único processo, é recusado com DEBUG=False."""
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            with override_settings(DEBUG=True):
+                self.assertEqual(busca.backend(), 'python')
+            with override_settings(DEBUG=False):
+                with self.assertRaisesMessage(ImproperlyConfigured, 'DEBUG=True'):
+                    busca.buscar_ids("tolkien")
+
+    def test_consulta_postgres(self):
+        """Testa o tsquery gerado: termos obrigatórios e o último como prefixo."""
+        termos = busca.tokenizar("Senhor dos Anéis")
+        self.assertEqual(busca._consulta_postgres(termos), "'senhor' & 'dos' & 'aneis':*")
+
+
+@override_settings(BIBLIOTECA_BUSCA_BACKEND='python', DEBUG=True)
+class BuscaMemoriaTestCase(BuscaTestMixin, TestCase):
+
+    def tearDown(self):
+        busca.indice_memoria.limpar()
@@ -0,0 +1,206 @@
+from datetime import date
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management.sql import emit_post_migrate_signal
+from django.urls import reverse
+from ..models import Categoria, Emprestimo, Livro
+from .. import cache
+
+CACHE_LOCAL = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests-cache'}
+    for alias in ('default', 'template_fragments')
+}
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class CachePaginasCatalogoTestCase(TestCase):
+
+    def setUp(self):
+        from django.core.cache import caches
+        caches['default'].clear()
+        cache.zerar_metricas()
+        self.usuario = User.objects.create_user(username='leitor', password='senha_teste')
+        self.admin = User.objects.create_superuser(username='admin', password='senha_teste')
+        self.client.login(username='leitor', password='senha_teste')
+        self.categoria = Categoria.objects.create(nome="Romance")
+        self.livro = Livro.objects.create(
+            titulo="Dom Casmurro", autor="Machado de Assis", data_publicacao=date(1899, 1, 1),
+            isbn="1234567890", copias_disponiveis=2,
+        )
+        self.url = reverse('listar_livro')
+
+    def test_segunda_leitura_vem_do_cache(self):
+        """Testa se a segunda leitura da listagem é servida do cache, sem consultar livros."""
+        primeira = self.client.get(self.url)
+        self.assertEqual(primeira['X-Cache'], 'MISS')
+
+        # Restam apenas a sessão e o usuário da autenticação.
+        with self.assertNumQueries(2):
+            segunda = self.client.get(self.url)
+        self.assertEqual(segunda['X-Cache'], 'HIT')
+        self.assertEqual(segunda.content, primeira.content)
+        self.assertEqual(cache.metricas()['listar_livro'], {'acertos': 1, 'falhas': 1})
+
+    def test_chave_por_parametros_e_perfil(self):
+        """Testa se parâmetros e perfil de superusuário geram entradas separadas."""
+        self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url, {'cursor': 'x'})['X-Cache'], 'MISS')
+
+        self.client.login(username='admin', password='senha_teste')
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, reverse('excluir_livro', args=[self.livro.pk]))
+
+    def test_alteracoes_invalidam_a_listagem(self):
+        """Testa a invalidação por save, por empréstimo (UPDATE com F()) e pela relação de categorias."""
+        self.client.get(self.url)
+
+        self.livro.titulo = "Dom Casmurro (Edição Crítica)"
+        self.livro.save()
+        self.assertContains(self.client.get(self.url), "Edição Crítica")
+
+        self.livro.emprestar(self.usuario)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, "1 de 2")
+
+        self.client.get(self.url)
+        self.livro.categorias.add(self.categoria)
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+
+    def test_categorias_invalidam_apenas_paginas_de_categorias(self):
+        """Testa se alterar uma categoria invalida as páginas de categorias e não a de livros."""
+        self.client.login(username='admin', password='senha_teste')
+        url_categorias = reverse('listar_categoria')
+        url_detalhes = reverse('detalhes_categoria', args=[self.categoria.pk])
+        for url in (self.url, url_categorias, url_detalhes):
+            self.client.get(url)
+
+        self.categoria.descricao = "Clássicos brasileiros"
+        self.categoria.save()
+
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+        self.assertContains(self.client.get(url_categorias), "Clássicos brasileiros")
+        self.assertContains(self.client.get(url_detalhes), "Clássicos brasileiros")
+
+    def test_etag_responde_304_sem_consultar_livros(self):
+        """Testa o 304 do If-None-Match sem executar a view, e a nova ETag após um empréstimo."""
+        etag = self.client.get(self.url)['ETag']
+
+        # Restam apenas a sessão e o usuário da autenticação; nenhum template é renderizado.
+        with self.assertNumQueries(2), self.assertTemplateNotUsed('listar_livro.html'):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        self.livro.emprestar(self.usuario)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "1 de 2")
+
+    def test_etag_por_perfil_e_escopo(self):
+        """Testa se superusuários têm outra ETag e se categorias não mudam a ETag de livros."""
+        url_categorias = reverse('listar_categoria')
+        etag_livros = self.client.get(self.url)['ETag']
+        etag_categorias = self.client.get(url_categorias)['ETag']
+
+        self.categoria.descricao = "Clássicos brasileiros"
+        self.categoria.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag_livros).status_code, 304)
+        self.assertEqual(self.client.get(url_categorias, HTTP_IF_NONE_MATCH=etag_categorias).status_code, 200)
+
+        self.client.login(username='admin', password='senha_teste')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag_livros).status_code, 200)
+
+    def test_versao_descartada_nao_reaproveita_paginas_antigas(self):
+        """Testa se uma versão descartada pelo backend é recriada sem colidir com a anterior."""
+        from django.core.cache import caches
+        anterior = cache.versoes([cache.LIVROS])[cache.LIVROS]
+        caches['default'].delete('biblioteca:versao:livros')
+        cache.invalidar(cache.LIVROS)
+        self.assertNotEqual(cache.versoes([cache.LIVROS])[cache.LIVROS], anterior)
+
+
+@override_settings(CACHES=CACHE_LOCAL)
+class CacheFragmentosLinhasTestCase(TestCase):
+
+    def setUp(self):
+        from django.core.cache import caches
+        caches['default'].clear()
+        self.usuario = User.objects.create_user(username='leitor', password='senha_teste')
+        User.objects.create_superuser(username='admin', password='senha_teste')
+        self.client.login(username='admin', password='senha_teste')
+        self.livros = [
+            Livro.objects.create(
+                titulo=f"Livro {i}", autor="Autor", data_publicacao=date(2000, 1, 1),
+                isbn=f"978000000{i:04d}", copias_disponiveis=2,
+            )
+            for i in range(2)
+        ]
+
+    def _fragmento(self, livro):
+        from django.core.cache import caches
+        chave = make_template_fragment_key('linha_livro', [cache.geracao_fragmentos(), livro.pk, livro.versao, True])
+        return caches['template_fragments'].get(chave)
+
+    def test_versao_incrementada_a_cada_alteracao(self):
+        """Testa se save, empréstimo e devolução incrementam a versão, mesmo com a instância desatualizada."""
+        livro = self.livros[0]
+        self.assertEqual(livro.versao, 0)
+        livro.save()
+        self.assertEqual(livro.versao, 1)
+
+        desatualizado = Livro.objects.get(pk=livro.pk)
+        emprestimo = livro.emprestar(self.usuario)
+        emprestimo.registrar_devolucao()
+        desatualizado.save()
+        self.assertEqual(desatualizado.versao, 4)
+
+    def test_linha_alterada_renderiza_novo_fragmento(self):
+        """Testa se um empréstimo gera um novo fragmento só para a linha do livro emprestado."""
+        alterado, intacto = self.livros
+        response = self.client.get(reverse('listar_livro'))
+        for nome in ('atualizar_livro', 'excluir_livro'):
+            self.assertContains(response, f'href="{reverse(nome, args=[alterado.pk])}"')
+        fragmento_intacto = self._fragmento(intacto)
+        self.assertIsNotNone(fragmento_intacto)
+
+        alterado.emprestar(self.usuario)
+        alterado.refresh_from_db()
+        self.assertIsNone(self._fragmento(alterado))
+        response = self.client.get(reverse('listar_livro'))
+        self.assertContains(response, "1 de 2")
+        self.assertContains(response, "2 de 2")
+        self.assertIsNotNone(self._fragmento(alterado))
+        self.assertEqual(self._fragmento(intacto), fragmento_intacto)
+
+    def test_banco_recriado_descarta_fragmentos(self):
+        """Testa se, após um flush, um livro com o mesmo id e a mesma versão não reaproveita a linha antiga."""
+        livro = self.livros[0]
+        self.client.get(reverse('listar_livro'))
+        self.assertIsNotNone(self._fragmento(livro))
+
+        # O que o flush faz depois de esvaziar as tabelas.
+        Livro.objects.all().delete()
+        emit_post_migrate_signal(verbosity=0, interactive=False, db='default')
+        self.assertIsNone(self._fragmento(livro))
+        Livro.objects.create(
+            pk=livro.pk, titulo="Livro Novo", autor="Autor", data_publicacao=date(2000, 1, 1),
+            isbn="9780000009999", copias_disponiveis=1,
+        )
+        response = self.client.get(reverse('listar_livro'))
+        self.assertContains(response, "Livro Novo")
+        self.assertNotContains(response, livro.titulo)
+
+    def test_devolucao_atualiza_linha_do_emprestimo(self):
+        """Testa se a linha de um empréstimo em cache muda ao registrar a devolução."""
+        emprestimo = self.livros[0].emprestar(self.usuario)
+        url = reverse('listar_emprestimos')
+        self.assertContains(self.client.get(url), "Não Devolvido")
+
+        Emprestimo.objects.get(pk=emprestimo.pk).registrar_devolucao()
+        response = self.client.get(url)
+        self.assertNotContains(response, "Não Devolvido")
+        self.assertContains(response, "Devolvido em")
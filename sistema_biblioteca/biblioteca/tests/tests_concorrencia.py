@@ -0,0 +1,153 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from django.test import TransactionTestCase
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection, OperationalError
+from .. import services
+from ..models import Emprestimo, Livro, PerfilLeitor
+
+
+def _com_nova_tentativa(operacao, tentativas=200):
+    """
+    Executa a operação, repetindo quando o banco sinaliza bloqueio.
+    O SQLite serializa escritores: "database is locked" (ou "table is locked" no
+    banco de testes em memória compartilhada) indica apenas que outro escritor
+    está com a vez, e a transação inteira já foi desfeita.
+    """
+    for _ in range(tentativas):
+        try:
+            return operacao()
+        except OperationalError as erro:
+            if 'locked' not in str(erro):
+                raise
+            time.sleep(0.001)
+    raise AssertionError("Operação não concluída após várias tentativas.")
+
+
+class ConcorrenciaTestCase(TransactionTestCase):
+
+    THREADS = 8
+
+    def setUp(self):
+        self.livro = Livro.objects.create(
+            titulo="Livro Disputado", autor="Autor", data_publicacao=date.today(),
+            isbn="1234567890", copias_disponiveis=5,
+        )
+        self.usuarios = [User(username=f"leitor{i}") for i in range(40)]
+        User.objects.bulk_create(self.usuarios)
+        self.usuarios = list(User.objects.order_by('id'))
+
+    def _executar_em_paralelo(self, operacoes):
+        """Dispara as operações ao mesmo tempo e retorna os resultados (ou exceções)."""
+        largada = threading.Barrier(min(self.THREADS, len(operacoes)))
+
+        def executar(operacao):
+            try:
+                largada.wait(timeout=5)
+            except threading.BrokenBarrierError:
+                pass
+            try:
+                return _com_nova_tentativa(operacao)
+            except ValidationError as erro:
+                return erro
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.THREADS) as executor:
+            return list(executor.map(executar, operacoes))
+
+    def test_estoque_nunca_fica_negativo(self):
+        """Testa se 40 empréstimos simultâneos de um livro com 5 cópias criam exatamente 5 empréstimos."""
+        livro_id = self.livro.pk
+        resultados = self._executar_em_paralelo([
+            (lambda u=usuario: Livro(pk=livro_id).emprestar(u)) for usuario in self.usuarios
+        ])
+
+        sucessos = [r for r in resultados if isinstance(r, Emprestimo)]
+        recusas = [r for r in resultados if isinstance(r, ValidationError)]
+        self.livro.refresh_from_db()
+        self.assertEqual(len(sucessos), 5)
+        self.assertEqual(len(recusas), 35)
+        self.assertEqual(self.livro.copias_disponiveis, 0)
+        self.assertEqual(Emprestimo.objects.filter(livro=self.livro, devolvido=False).count(), 5)
+
+    def test_sem_emprestimo_duplicado(self):
+        """Testa se pedidos simultâneos do mesmo usuário para o mesmo livro geram um único empréstimo."""
+        usuario = self.usuarios[0]
+        livro_id = self.livro.pk
+        resultados = self._executar_em_paralelo([
+            (lambda: Livro(pk=livro_id).emprestar(usuario)) for _ in range(self.THREADS)
+        ])
+
+        duplicados = [r for r in resultados if isinstance(r, ValidationError)]
+        self.livro.refresh_from_db()
+        self.assertEqual(Emprestimo.objects.filter(usuario=usuario, livro=self.livro).count(), 1)
+        self.assertTrue(all(erro.code == 'emprestimo_duplicado' for erro in duplicados))
+        self.assertEqual(self.livro.copias_disponiveis, 4)
+
+    def test_emprestimos_e_devolucoes_misturados(self):
+        """
+        Testa os invariantes do estoque após empréstimos e devoluções concorrentes,
+        incluindo devoluções repetidas do mesmo empréstimo por dois balcões.
+        """
+        livro_id = self.livro.pk
+        sorteio = random.Random(42)
+
+        def ciclo(usuario):
+            def operacao():
+                devolvidos = 0
+                for _ in range(5):
+                    try:
+                        emprestimo = _com_nova_tentativa(lambda: Livro(pk=livro_id).emprestar(usuario))
+                    except ValidationError:
+                        continue
+                    # Dois envios da mesma devolução, cada um a partir de um objeto próprio.
+                    for _ in range(2):
+                        devolvidos += _com_nova_tentativa(
+                            lambda: Emprestimo.objects.get(pk=emprestimo.pk).registrar_devolucao()
+                        )
+                return devolvidos
+            return operacao
+
+        usuarios = self.usuarios[:]
+        sorteio.shuffle(usuarios)
+        resultados = self._executar_em_paralelo([ciclo(usuario) for usuario in usuarios[:16]])
+        self.assertTrue(all(isinstance(r, int) for r in resultados), resultados)
+
+        self.livro.refresh_from_db()
+        ativos = Emprestimo.objects.filter(livro=self.livro, devolvido=False).count()
+        devolvidos = Emprestimo.objects.filter(livro=self.livro, devolvido=True).count()
+        self.assertEqual(ativos, 0)
+        self.assertEqual(sum(resultados), devolvidos)
+        self.assertEqual(self.livro.copias_disponiveis, 5)
+        self.assertFalse(Emprestimo.objects.filter(devolvido=True, data_devolucao__isnull=True).exists())
+
+    def test_devolucoes_em_lote_simultaneas(self):
+        """Testa se o mesmo lote devolvido por vários balcões ao mesmo tempo é registrado uma única vez."""
+        usuario = self.usuarios[0]
+        livros = [self.livro] + [
+            Livro.objects.create(
+                titulo=f"Livro {i}", autor="Autor", data_publicacao=date.today(),
+                isbn=f"98765432{i:02d}", copias_disponiveis=2,
+            )
+            for i in range(4)
+        ]
+        identificadores = [str(livro.pk) for livro in livros]
+        services.emprestar_em_lote(usuario, identificadores)
+
+        resultados = self._executar_em_paralelo([
+            (lambda: services.devolver_em_lote(usuario, identificadores)) for _ in range(self.THREADS)
+        ])
+
+        situacoes = [item.situacao for resultado in resultados for item in resultado]
+        self.assertEqual(situacoes.count('devolvido'), len(livros))
+        self.assertEqual(situacoes.count('sem_emprestimo'), len(livros) * (self.THREADS - 1))
+        self.assertEqual(
+            list(Livro.objects.order_by('id').values_list('copias_disponiveis', 'emprestimos_ativos')),
+            [(5, 0)] + [(2, 0)] * 4,
+        )
+        self.assertEqual(PerfilLeitor.objects.get(usuario=usuario).emprestimos_ativos, 0)
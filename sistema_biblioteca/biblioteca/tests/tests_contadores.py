@@ -0,0 +1,127 @@
+from datetime import date
+from io import StringIO
+from unittest import mock
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+from ..models import Categoria, Emprestimo, Livro, PerfilLeitor, Reserva
+
+
+class ContadoresCirculacaoTestCase(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(username='leitor', password='senha_teste')
+        self.livro = Livro.objects.create(
+            titulo="Livro Teste", autor="Autor", data_publicacao=date.today(),
+            isbn="1234567890", copias_disponiveis=3,
+        )
+
+    def _estado(self):
+        self.livro.refresh_from_db()
+        perfil = PerfilLeitor.objects.filter(usuario=self.usuario).first()
+        return (
+            self.livro.copias_disponiveis, self.livro.emprestimos_ativos, self.livro.copias_total,
+            perfil.emprestimos_ativos if perfil else None,
+        )
+
+    def test_total_calculado_ao_salvar(self):
+        """Testa se copias_total acompanha ajustes de estoque feitos por save()."""
+        self.assertEqual(self.livro.copias_total, 3)
+        self.livro.emprestar(self.usuario)
+        self.livro.refresh_from_db()
+        self.livro.copias_disponiveis = 5
+        self.livro.save()
+        self.assertEqual(self._estado()[:3], (5, 1, 6))
+
+    def test_edicao_de_instancia_lida_antes_de_um_emprestimo(self):
+        """Testa se editar o livro com uma instância desatualizada preserva os contadores do empréstimo."""
+        self.usuario.is_superuser = True
+        self.usuario.save()
+        self.client.login(username='leitor', password='senha_teste')
+        categoria = Categoria.objects.create(nome="Romance")
+        lido = Livro.objects.get(pk=self.livro.pk)
+        self.livro.emprestar(self.usuario)
+
+        # A view recebe a instância lida antes do empréstimo, como numa edição concorrente.
+        with mock.patch('biblioteca.views.get_object_or_404', return_value=lido):
+            response = self.client.post(reverse('atualizar_livro', args=[self.livro.pk]), {
+                'titulo': "Livro Editado", 'autor': "Autor", 'data_publicacao': '2020-01-01',
+                'isbn': '1234567890', 'categorias': [categoria.pk], 'copias_disponiveis': 4,
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self._estado()[:3], (4, 1, 5))
+        self.assertEqual(self.livro.titulo, "Livro Editado")
+        self.assertEqual(list(self.livro.categorias.all()), [categoria])
+
+        lido.copias_disponiveis = 2
+        lido.save(update_fields=['copias_disponiveis'])
+        self.assertEqual(self._estado()[:3], (2, 1, 3))
+
+    def test_save_comum_de_instancia_desatualizada(self):
+        """Testa se um save() sem update_fields não sobrescreve os contadores e já traz a versão gravada."""
+        lido = Livro.objects.get(pk=self.livro.pk)
+        self.livro.emprestar(self.usuario)
+        versao = Livro.objects.get(pk=self.livro.pk).versao
+
+        lido.titulo = "Livro Editado"
+        lido.copias_disponiveis = 2
+        lido.save()
+        self.assertEqual(self._estado()[:3], (2, 1, 3))
+        with self.assertNumQueries(0):
+            self.assertEqual(lido.versao, versao + 1)
+            self.assertEqual((lido.emprestimos_ativos, lido.copias_total), (1, 3))
+
+    def test_contadores_em_emprestimo_e_devolucao(self):
+        """Testa se empréstimo e devolução atualizam os contadores na mesma transação."""
+        emprestimo = self.livro.emprestar(self.usuario)
+        self.assertEqual(self._estado(), (2, 1, 3, 1))
+
+        emprestimo.registrar_devolucao()
+        emprestimo.registrar_devolucao()
+        self.assertEqual(self._estado(), (3, 0, 3, 0))
+
+    def test_devolucao_de_emprestimo_sem_contador_nao_fica_negativa(self):
+        """Testa se devolver um empréstimo criado fora de emprestar() não deixa contadores negativos."""
+        emprestimo = Emprestimo.objects.create(usuario=self.usuario, livro=self.livro)
+        emprestimo.registrar_devolucao()
+        self.assertEqual(self._estado(), (4, 0, 3, 0))
+
+    def test_recalcular_contadores_corrige_divergencias(self):
+        """Testa se o comando relata e corrige contadores divergentes com UPDATEs por subconsulta."""
+        self.livro.emprestar(self.usuario)
+        outro = User.objects.create_user(username='outro', password='senha_teste')
+        Emprestimo.objects.create(usuario=outro, livro=self.livro)
+        # Usuário sem perfil, como os criados antes da migração dos contadores.
+        PerfilLeitor.objects.filter(usuario=outro).delete()
+        Livro.objects.filter(pk=self.livro.pk).update(emprestimos_ativos=7)
+        PerfilLeitor.objects.filter(usuario=self.usuario).update(emprestimos_ativos=4)
+
+        saida = StringIO()
+        call_command('recalcular_contadores', verificar=True, stdout=saida)
+        self.assertIn("Livros: 1 verificados, 1 com divergência", saida.getvalue())
+        self.assertIn("Leitores: 2 verificados, 2 com divergência", saida.getvalue())
+        self.assertEqual(self._estado(), (2, 7, 3, 4))
+
+        saida = StringIO()
+        with self.assertNumQueries(10):
+            call_command('recalcular_contadores', stdout=saida, verbosity=2)
+        self.assertIn("emprestimos_ativos 7 -> 2", saida.getvalue())
+        self.assertEqual(self._estado(), (1, 2, 3, 1))
+        self.assertEqual(PerfilLeitor.objects.get(usuario=outro).emprestimos_ativos, 1)
+
+        saida = StringIO()
+        call_command('recalcular_contadores', stdout=saida)
+        self.assertIn("Livros: 1 verificados, 0 corrigidos. Leitores: 2 verificados, 0 corrigidos.", saida.getvalue())
+
+    def test_recalcular_contadores_considera_copias_separadas(self):
+        """Testa se o comando desconta das cópias disponíveis as cópias separadas para reservas."""
+        Livro.objects.filter(pk=self.livro.pk).update(copias_disponiveis=0, emprestimos_ativos=3, copias_total=3)
+        Reserva.objects.create(livro=self.livro, usuario=self.usuario, situacao=Reserva.DISPONIVEL)
+
+        call_command('recalcular_contadores', stdout=StringIO())
+        self.livro.refresh_from_db()
+        self.assertEqual(
+            (self.livro.copias_disponiveis, self.livro.emprestimos_ativos, self.livro.copias_reservadas),
+            (2, 0, 1),
+        )
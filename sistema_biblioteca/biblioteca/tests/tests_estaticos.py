@@ -0,0 +1,86 @@
+import gzip
+import shutil
+import tempfile
+from django.test import TestCase, RequestFactory, override_settings
+from django.contrib.auth.models import User
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.http import Http404
+from django.urls import reverse
+from ..estaticos import servir_estatico
+
+ARMAZENAMENTO = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'biblioteca.estaticos.ArmazenamentoEstatico'},
+}
+
+
+class ArquivosEstaticosTestCase(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.diretorio = tempfile.mkdtemp()
+        cls.configuracao = override_settings(STATIC_ROOT=cls.diretorio, STORAGES=ARMAZENAMENTO)
+        cls.configuracao.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.configuracao.disable()
+        shutil.rmtree(cls.diretorio)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.fabrica = RequestFactory()
+        self.nome_com_hash = staticfiles_storage.stored_name('css/base.css')
+
+    def test_collectstatic_grava_nomes_com_hash_e_gzip(self):
+        """Testa se o collectstatic grava o nome com hash e uma variante .gz equivalente."""
+        self.assertRegex(self.nome_com_hash, r'^css/base\.[0-9a-f]{12}\.css$')
+        with staticfiles_storage.open(self.nome_com_hash) as original, \
+                staticfiles_storage.open(self.nome_com_hash + '.gz') as comprimido:
+            self.assertEqual(gzip.decompress(comprimido.read()), original.read())
+
+    def test_templates_usam_nomes_com_hash_sem_estilos_embutidos(self):
+        """Testa se as páginas apontam para os arquivos com hash e não carregam CSS nem fontes de CDNs."""
+        User.objects.create_user(username='leitor', password='senha_teste')
+        self.client.login(username='leitor', password='senha_teste')
+        response = self.client.get(reverse('listar_livro'))
+        self.assertContains(response, f'/static/{self.nome_com_hash}')
+        self.assertContains(response, f"/static/{staticfiles_storage.stored_name('css/listar_livro.css')}")
+        self.assertNotContains(response, '<style>')
+        self.assertContains(response, f"/static/{staticfiles_storage.stored_name('css/icones.css')}")
+        for cdn in ('cdn.jsdelivr.net', 'cdnjs.cloudflare.com', 'fonts.googleapis.com'):
+            self.assertNotContains(response, cdn)
+
+    def test_fonte_de_icones_local_com_hash(self):
+        """Testa se icones.css aponta para a fonte local com hash e se o Bootstrap segue como distribuído."""
+        with staticfiles_storage.open(staticfiles_storage.stored_name('css/icones.css')) as arquivo:
+            css = arquivo.read().decode()
+        self.assertIn(f"../{staticfiles_storage.stored_name('fonts/icones.woff2')}", css)
+        with staticfiles_storage.open(staticfiles_storage.stored_name('css/bootstrap.min.css')) as arquivo:
+            self.assertIn(b'sourceMappingURL=bootstrap.min.css.map', arquivo.read())
+
+    def test_servir_variante_comprimida_com_cache_longo(self):
+        """Testa a escolha da variante gzip e o cache de um ano para nomes com hash."""
+        request = self.fabrica.get('/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        response = servir_estatico(request, self.nome_com_hash)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
+
+    def test_servir_sem_compressao_e_sem_hash(self):
+        """Testa o arquivo original para clientes sem gzip e o cache curto para nomes sem hash."""
+        response = servir_estatico(self.fabrica.get('/'), 'css/base.css')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('max-age=3600', response['Cache-Control'])
+        self.assertNotIn('immutable', response['Cache-Control'])
+
+    def test_servir_recusa_caminhos_fora_do_diretorio(self):
+        """Testa se caminhos inexistentes ou fora de STATIC_ROOT resultam em 404."""
+        for caminho in ('../settings.py', 'css/inexistente.css', self.nome_com_hash + '.gz'):
+            with self.assertRaises(Http404):
+                servir_estatico(self.fabrica.get('/'), caminho)
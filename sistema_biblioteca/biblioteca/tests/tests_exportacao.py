@@ -0,0 +1,84 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import date, datetime
+from django.test import TestCase
+from django.core.management import call_command
+from django.contrib.auth.models import User
+from django.urls import reverse
+from ..models import Emprestimo, Livro
+
+
+class ExportacaoTestCase(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(
+            username='auditor', password='senha_teste', is_superuser=True
+        )
+        self.client.login(username='auditor', password='senha_teste')
+        self.livro = Livro.objects.create(
+            titulo="Livro, com vírgula", autor="Autor", data_publicacao=date(2000, 1, 1), isbn="1234567890"
+        )
+        self.antigo = Emprestimo.objects.create(
+            usuario=self.usuario, livro=self.livro, data_emprestimo=datetime(2023, 5, 10, 14, 0),
+            devolvido=True, data_devolucao=datetime(2023, 5, 20, 9, 0),
+        )
+        self.recente = Emprestimo.objects.create(
+            usuario=self.usuario, livro=self.livro, data_emprestimo=datetime(2024, 2, 1, 10, 30),
+        )
+
+    def _conteudo(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content)
+
+    def test_exportar_emprestimos_csv(self):
+        """Testa se todos os empréstimos são exportados em CSV com cabeçalho."""
+        response = self.client.get(reverse('exportar_emprestimos'))
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('emprestimos.csv', response['Content-Disposition'])
+
+        linhas = list(csv.DictReader(io.StringIO(self._conteudo(response).decode())))
+        self.assertEqual([int(l['id']) for l in linhas], [self.antigo.pk, self.recente.pk])
+        self.assertEqual(linhas[0]['livro_titulo'], "Livro, com vírgula")
+        self.assertEqual(linhas[0]['usuario'], "auditor")
+
+    def test_exportar_emprestimos_filtro_de_datas(self):
+        """Testa o filtro inclusivo por data de empréstimo."""
+        response = self.client.get(
+            reverse('exportar_emprestimos'), {'formato': 'jsonl', 'inicio': '2024-01-01', 'fim': '2024-02-01'}
+        )
+        registros = [json.loads(l) for l in self._conteudo(response).decode().splitlines()]
+        self.assertEqual([r['id'] for r in registros], [self.recente.pk])
+        self.assertFalse(registros[0]['devolvido'])
+
+        response = self.client.get(reverse('exportar_emprestimos'), {'inicio': '2024-13-01'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_exportar_livros_gzip(self):
+        """Testa a exportação do inventário comprimida com gzip."""
+        response = self.client.get(reverse('exportar_livros'), {'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('livros.csv.gz', response['Content-Disposition'])
+
+        texto = gzip.decompress(self._conteudo(response)).decode()
+        self.assertIn('1234567890', texto)
+
+    def test_exportar_requer_permissao(self):
+        """Testa se usuários sem permissão não exportam dados."""
+        User.objects.create_user(username='leitor', password='senha_teste')
+        self.client.login(username='leitor', password='senha_teste')
+        response = self.client.get(reverse('exportar_emprestimos'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_comando_exportar_dados(self):
+        """Testa o comando exportar_dados gravando em arquivo."""
+        with tempfile.TemporaryDirectory() as diretorio:
+            caminho = os.path.join(diretorio, 'emprestimos.jsonl.gz')
+            call_command('exportar_dados', 'emprestimos', formato='jsonl', gzip=True,
+                         inicio=date(2023, 1, 1), fim=date(2023, 12, 31), saida=caminho)
+            with gzip.open(caminho, 'rt', encoding='utf-8') as arquivo:
+                registros = [json.loads(linha) for linha in arquivo]
+        self.assertEqual([r['id'] for r in registros], [self.antigo.pk])
@@ -0,0 +1,66 @@
+from io import StringIO
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from ..busca import buscar_ids
+from ..models import Categoria, Emprestimo, Livro, PerfilLeitor
+
+TAMANHOS = {'livros': 200, 'categorias': 10, 'usuarios': 50, 'emprestimos': 1000}
+
+
+class GerarDadosTestCase(TestCase):
+
+    def _gerar(self, **opcoes):
+        call_command('gerar_dados', **{**TAMANHOS, **opcoes}, stdout=StringIO())
+
+    def _limpar(self):
+        for modelo in (Emprestimo, PerfilLeitor, Livro, Categoria):
+            modelo.objects.all().delete()
+        User.objects.filter(username__startswith='leitor').delete()
+
+    def _retrato(self):
+        return (
+            list(Livro.objects.order_by('id').values_list('titulo', 'autor', 'isbn', 'copias_total')),
+            list(Categoria.objects.order_by('id').values_list('nome', flat=True)),
+            list(Emprestimo.objects.order_by('id').values_list(
+                'usuario__username', 'livro_id', 'data_emprestimo', 'devolvido',
+            )),
+        )
+
+    def test_tamanhos_e_contadores_consistentes(self):
+        """Testa os tamanhos gerados e se os contadores de circulação saem corretos."""
+        self._gerar()
+        self.assertEqual(Livro.objects.count(), 200)
+        self.assertEqual(Categoria.objects.count(), 10)
+        self.assertEqual(User.objects.filter(username__startswith='leitor').count(), 50)
+        self.assertEqual(PerfilLeitor.objects.count(), 50)
+        self.assertEqual(Emprestimo.objects.count(), 1000)
+        self.assertEqual(Emprestimo.objects.filter(devolvido=False).count(), 50)
+
+        saida = StringIO()
+        call_command('recalcular_contadores', verificar=True, stdout=saida)
+        self.assertIn("200 verificados, 0 com divergência", saida.getvalue())
+        self.assertIn("50 verificados, 0 com divergência", saida.getvalue())
+
+        livro = Livro.objects.get(pk=1)
+        self.assertIn(livro.pk, buscar_ids(livro.isbn))
+
+    def test_mesma_semente_mesmos_dados(self):
+        """Testa se a geração é determinística para a mesma semente e muda com outra."""
+        self._gerar(semente=7)
+        primeira = self._retrato()
+
+        self._limpar()
+        self._gerar(semente=7)
+        self.assertEqual(self._retrato(), primeira)
+
+        self._limpar()
+        self._gerar(semente=8)
+        self.assertNotEqual(self._retrato()[0], primeira[0])
+
+    def test_recusa_banco_com_dados(self):
+        """Testa se o comando se recusa a gerar dados sobre um catálogo existente."""
+        Categoria.objects.create(nome="Romance")
+        with self.assertRaisesMessage(CommandError, "banco vazio"):
+            self._gerar()
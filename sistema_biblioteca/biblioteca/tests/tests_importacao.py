@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.test import TestCase
+from django.core.management import call_command
+from ..models import Categoria, Livro
+from .. import busca
+
+
+class ImportarLivrosTestCase(TestCase):
+
+    def setUp(self):
+        self.diretorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.diretorio.cleanup)
+
+    def _arquivo(self, nome, conteudo):
+        caminho = os.path.join(self.diretorio.name, nome)
+        with open(caminho, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(conteudo)
+        return caminho
+
+    def _importar(self, caminho, **opcoes):
+        saida = StringIO()
+        call_command('importar_livros', caminho, stdout=saida, **opcoes)
+        return saida.getvalue()
+
+    def test_importar_csv(self):
+        """Testa a importação de CSV com categorias novas e existentes."""
+        Categoria.objects.create(nome="Romance")
+        caminho = self._arquivo('catalogo.csv', (
+            "titulo,autor,data_publicacao,isbn,categorias,copias_disponiveis\n"
+            "Dom Casmurro,Machado de Assis,1899-01-01,9788535910667,Romance;Clássico,3\n"
+            "O Cortiço,Aluísio Azevedo,01/01/1890,978-85-08-13316-7,Clássico,\n"
+        ))
+        saida = self._importar(caminho)
+
+        self.assertIn("2 importados", saida)
+        dom = Livro.objects.get(isbn="9788535910667")
+        self.assertEqual(dom.copias_disponiveis, 3)
+        self.assertEqual(set(dom.categorias.values_list('nome', flat=True)), {"Romance", "Clássico"})
+        self.assertEqual(Livro.objects.get(isbn="9788508133167").copias_disponiveis, 1)
+        self.assertEqual(Categoria.objects.count(), 2)
+        self.assertEqual(busca.buscar_ids("cortico"), [Livro.objects.get(isbn="9788508133167").pk])
+
+    def test_importar_jsonl_marc(self):
+        """Testa a importação de registros JSONL com tags MARC."""
+        registros = [
+            {"020": {"a": "9788595084742"}, "100": {"a": "J. R. R. Tolkien"},
+             "245": {"a": "O Hobbit"}, "264": "1937", "650": [{"a": "Fantasia"}]},
+            {"isbn": "9788533613379", "autor": "J. R. R. Tolkien",
+             "titulo": "O Senhor dos Anéis", "data_publicacao": "1954-07-29"},
+        ]
+        caminho = self._arquivo('catalogo.jsonl', '\n'.join(json.dumps(r) for r in registros) + '\n')
+        self._importar(caminho)
+
+        hobbit = Livro.objects.get(isbn="9788595084742")
+        self.assertEqual(hobbit.titulo, "O Hobbit")
+        self.assertEqual(hobbit.data_publicacao.year, 1937)
+        self.assertEqual(list(hobbit.categorias.values_list('nome', flat=True)), ["Fantasia"])
+        self.assertTrue(Livro.objects.filter(isbn="9788533613379").exists())
+
+    def test_registros_invalidos_e_duplicados_sao_ignorados(self):
+        """Testa se ISBN inválido, campos vazios e ISBN repetido não interrompem a carga."""
+        Livro.objects.create(titulo="Existente", autor="Autor", data_publicacao="2000-01-01", isbn="1111111111")
+        caminho = self._arquivo('catalogo.csv', (
+            "titulo,autor,data_publicacao,isbn,categorias\n"
+            "ISBN Ruim,Autor,2000-01-01,123abc,\n"
+            ",Autor,2000-01-01,2222222222,\n"
+            "Repetido,Autor,2000-01-01,1111111111,\n"
+            "Válido,Autor,2000-01-01,3333333333,\n"
+            "Válido de novo,Autor,2000-01-01,3333333333,\n"
+        ))
+        saida = self._importar(caminho)
+
+        self.assertIn("1 importados, 2 ISBNs repetidos, 2 inválidos", saida)
+        self.assertEqual(Livro.objects.get(isbn="3333333333").titulo, "Válido")
+
+    def test_retomar_a_partir_do_checkpoint(self):
+        """Testa se --retomar pula os registros já gravados em lotes anteriores."""
+        linhas = ["titulo,autor,data_publicacao,isbn"]
+        linhas += [f"Livro {i},Autor,2000-01-01,{i:010d}" for i in range(1, 8)]
+        caminho = self._arquivo('catalogo.csv', '\n'.join(linhas) + '\n')
+        checkpoint = caminho + '.checkpoint'
+        with open(checkpoint, 'w') as arquivo:
+            json.dump({'processados': 5}, arquivo)
+
+        saida = self._importar(caminho, retomar=True, lote=2)
+
+        self.assertIn("Retomando após o registro 5", saida)
+        self.assertEqual(
+            sorted(Livro.objects.values_list('titulo', flat=True)), ["Livro 6", "Livro 7"]
+        )
+        with open(checkpoint) as arquivo:
+            self.assertEqual(json.load(arquivo), {'processados': 7})
@@ -0,0 +1,91 @@
+import re
+from datetime import date
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.db import connection
+from django.urls import reverse
+from ..models import Emprestimo, Livro
+from .. import metricas
+
+
+@override_settings(BIBLIOTECA_METRICAS=True, BIBLIOTECA_METRICAS_TOKEN='token-coletor')
+class MetricasMiddlewareTestCase(TestCase):
+
+    def setUp(self):
+        metricas.zerar_metricas()
+        self.addCleanup(metricas.zerar_metricas)
+        self.usuario = User.objects.create_user(username='leitor', password='senha_teste')
+        self.admin = User.objects.create_superuser(username='admin', password='senha_teste')
+        self.client.login(username='leitor', password='senha_teste')
+        livro = Livro.objects.create(
+            titulo="Dom Casmurro", autor="Machado de Assis", data_publicacao=date(1899, 1, 1),
+            isbn="1234567890", copias_disponiveis=2,
+        )
+        Emprestimo.objects.create(usuario=self.usuario, livro=livro)
+
+    def _exportar(self):
+        response = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer token-coletor')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_server_timing_conta_as_consultas_da_requisicao(self):
+        """Testa se o Server-Timing traz sql, template e total, com o número real de consultas."""
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('listar_emprestimos'))
+        cabecalho = response['Server-Timing']
+        self.assertIn(f'desc="{len(consultas)} consultas"', cabecalho)
+        tempos = dict(re.findall(r'(\w+);dur=([\d.]+)', cabecalho))
+        self.assertEqual(set(tempos), {'sql', 'template', 'total'})
+        self.assertGreater(float(tempos['template']), 0)
+        self.assertLessEqual(float(tempos['template']), float(tempos['total']))
+
+    def test_histogramas_por_view_no_formato_prometheus(self):
+        """Testa as séries por nome da URL e método e a exportação das métricas do cache."""
+        self.client.get(reverse('listar_emprestimos'))
+        self.client.get(reverse('listar_emprestimos'))
+        self.client.post(reverse('registrar_emprestimo'), {})
+        self.client.get('/biblioteca/inexistente/')
+
+        texto = self._exportar()
+        self.assertIn('# TYPE biblioteca_requisicao_segundos histogram', texto)
+        self.assertIn('biblioteca_requisicao_segundos_count{view="listar_emprestimos",metodo="GET"} 2', texto)
+        self.assertIn('biblioteca_requisicao_segundos_bucket{view="listar_emprestimos",metodo="GET",le="+Inf"} 2', texto)
+        self.assertIn('biblioteca_sql_consultas_count{view="registrar_emprestimo",metodo="POST"} 1', texto)
+        self.assertIn('biblioteca_template_segundos_count{view="nao_resolvida",metodo="GET"} 1', texto)
+        self.assertIn('# TYPE biblioteca_cache_paginas_total counter', texto)
+
+    def test_acesso_ao_endpoint(self):
+        """Testa se o endpoint exige superusuário ou o token do coletor."""
+        url = reverse('metricas')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer errado').status_code, 403)
+        self.client.login(username='admin', password='senha_teste')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+    @override_settings(BIBLIOTECA_METRICAS=False)
+    def test_desativado_por_padrao(self):
+        """Testa se, desativadas, as métricas não geram cabeçalho nem endpoint."""
+        response = self.client.get(reverse('listar_emprestimos'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 404)
+
+
+class HistogramaTestCase(SimpleTestCase):
+
+    def test_buckets_cumulativos_e_rotulos_escapados(self):
+        """Testa os buckets cumulativos, soma, contagem e o escape de aspas nos rótulos."""
+        histograma = metricas.Histograma('teste_segundos', "Teste.", ('view',), (0.1, 1))
+        for valor in (0.05, 0.5, 5):
+            histograma.observar(('a"b',), valor)
+        self.assertEqual(histograma.linhas(), [
+            '# HELP teste_segundos Teste.',
+            '# TYPE teste_segundos histogram',
+            'teste_segundos_bucket{view="a\\"b",le="0.1"} 1',
+            'teste_segundos_bucket{view="a\\"b",le="1"} 2',
+            'teste_segundos_bucket{view="a\\"b",le="+Inf"} 3',
+            'teste_segundos_sum{view="a\\"b"} 5.55',
+            'teste_segundos_count{view="a\\"b"} 3',
+        ])
@@ -0,0 +1,54 @@
+from datetime import date
+from django.test import TransactionTestCase
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.recorder import MigrationRecorder
+
+
+class EmprestimosDuplicadosMigracaoTestCase(TransactionTestCase):
+    antes = [('biblioteca', '0002_livro_titulo_id_idx')]
+    depois = [('biblioteca', '0003_encerrar_emprestimos_duplicados')]
+
+    def _migrar(self, alvo):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(alvo)
+        return executor.loader.project_state(alvo).apps
+
+    def tearDown(self):
+        self._migrar(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_restricao_encerra_emprestimos_repetidos(self):
+        """Testa se a nova migração 0003 encerra os empréstimos em aberto repetidos antes de criar a restrição."""
+        apps = self._migrar(self.antes)
+        User = apps.get_model('auth', 'User')
+        Livro = apps.get_model('biblioteca', 'Livro')
+        Emprestimo = apps.get_model('biblioteca', 'Emprestimo')
+        usuario = User.objects.create(username='leitor')
+        livro = Livro.objects.create(
+            titulo="Livro", autor="Autor", data_publicacao=date(2000, 1, 1), isbn="1234567890", copias_disponiveis=0,
+        )
+        mantido, *repetidos = [Emprestimo.objects.create(usuario=usuario, livro=livro) for _ in range(3)]
+        devolvido = Emprestimo.objects.create(usuario=usuario, livro=livro, devolvido=True)
+
+        with self.assertLogs('biblioteca.migrations', 'WARNING') as logs:
+            apps = self._migrar(self.depois)
+        self.assertIn(f"{repetidos[0].pk}, {repetidos[1].pk} (mantido: {mantido.pk})", logs.output[0])
+
+        Emprestimo = apps.get_model('biblioteca', 'Emprestimo')
+        self.assertEqual(
+            list(Emprestimo.objects.filter(devolvido=False).values_list('id', flat=True)), [mantido.pk]
+        )
+        self.assertTrue(Emprestimo.objects.get(pk=devolvido.pk).devolvido)
+        self.assertEqual(apps.get_model('biblioteca', 'Livro').objects.get(pk=livro.pk).copias_disponiveis, 2)
+
+    def test_banco_com_a_0003_original_aplicada(self):
+        """Testa se um banco que já aplicou a 0003 original recebe a nova como aplicada, sem reexecutá-la."""
+        registros = MigrationRecorder.Migration.objects.filter(app='biblioteca')
+        registros.filter(name='0003_encerrar_emprestimos_duplicados').delete()
+        self.assertTrue(registros.filter(name='0003_emprestimo_ativo_indices').exists())
+
+        executor = MigrationExecutor(connection)
+        executor.loader.check_consistent_history(connection)
+        self.assertIn(self.depois[0], executor.loader.applied_migrations)
+        self.assertEqual(executor.migration_plan(executor.loader.graph.leaf_nodes()), [])
@@ -1,6 +1,6 @@
 from django.test import TestCase, override_settings
 from django.core.exceptions import ValidationError
-from ..models import Categoria, Livro, Emprestimo
+from ..models import Categoria, Livro, Emprestimo, PerfilLeitor, PoliticaEmprestimo
 from django.db import IntegrityError
 from django.utils import timezone
 from datetime import timedelta
@@ -318,3 +318,115 @@ class EmprestimoTestCase(TestCase):
             devolvido=False
         )
         self.assertEqual(str(emprestimo), f"{self.usuario.username} - {self.livro.titulo}")  
+
+class EmprestimoAtivoUnicoTestCase(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(username="usuario_teste", password="senha_teste")
+        self.livro = Livro.objects.create(
+            titulo="Livro Teste",
+            autor="Autor Teste",
+            data_publicacao=timezone.now().date(),
+            isbn="1234567890123",
+            copias_disponiveis=5
+        )
+
+    def test_banco_bloqueia_segundo_emprestimo_ativo(self):
+        """Testa se o banco rejeita dois empréstimos ativos do mesmo livro para o mesmo usuário."""
+        Emprestimo.objects.create(usuario=self.usuario, livro=self.livro)
+        with self.assertRaises(IntegrityError):
+            Emprestimo.objects.create(usuario=self.usuario, livro=self.livro)
+
+    def test_permite_novo_emprestimo_apos_devolucao(self):
+        """Testa se um empréstimo devolvido não impede um novo empréstimo do mesmo livro."""
+        Emprestimo.objects.create(usuario=self.usuario, livro=self.livro, devolvido=True, data_devolucao=timezone.now())
+        Emprestimo.objects.create(usuario=self.usuario, livro=self.livro)
+        self.assertEqual(Emprestimo.objects.filter(usuario=self.usuario, livro=self.livro).count(), 2)
+
+    def test_emprestar_duplicado_levanta_validation_error(self):
+        """Testa se emprestar() converte a violação da restrição em ValidationError."""
+        self.livro.emprestar(self.usuario)
+        with self.assertRaises(ValidationError) as cm:
+            self.livro.emprestar(self.usuario)
+        self.assertEqual(cm.exception.code, 'emprestimo_duplicado')
+        self.livro.refresh_from_db()
+        self.assertEqual(self.livro.copias_disponiveis, 4)
+
+    def test_devolucao_repetida_e_idempotente(self):
+        """Testa se registrar a mesma devolução duas vezes incrementa o estoque uma única vez."""
+        emprestimo = self.livro.emprestar(self.usuario)
+        copia_obsoleta = Emprestimo.objects.get(pk=emprestimo.pk)
+
+        self.assertTrue(emprestimo.registrar_devolucao())
+        self.assertFalse(copia_obsoleta.registrar_devolucao())
+
+        self.livro.refresh_from_db()
+        self.assertEqual(self.livro.copias_disponiveis, 5)
+        self.assertEqual(copia_obsoleta.data_devolucao, emprestimo.data_devolucao)
+
+    def test_busca_emprestimo_ativo_usa_indice(self):
+        """Testa se a busca do empréstimo ativo usa o índice parcial (SQLite)."""
+        from django.db import connection
+        if connection.vendor != 'sqlite':
+            self.skipTest("Plano de execução verificado apenas no SQLite.")
+        plano = Emprestimo.objects.filter(usuario=self.usuario, livro=self.livro, devolvido=False).explain()
+        self.assertIn('emprestimo_ativo_unico', plano)
+
+class PoliticaEmprestimoTestCase(TestCase):
+
+    def setUp(self):
+        from django.contrib.auth.models import Group
+        self.alunos = Group.objects.create(name="Alunos")
+        self.funcionarios = Group.objects.create(name="Funcionários")
+        PoliticaEmprestimo.objects.create(grupo=self.alunos, limite_emprestimos=2)
+        PoliticaEmprestimo.objects.create(grupo=self.funcionarios, limite_emprestimos=20)
+        self.usuario = User.objects.create_user(username="aluno", password="senha_teste")
+        self.usuario.groups.add(self.alunos)
+        self.livros = [
+            Livro.objects.create(
+                titulo=f"Livro {i}", autor="Autor", data_publicacao=timezone.now().date(),
+                isbn=f"{i:013d}", copias_disponiveis=1,
+            )
+            for i in range(4)
+        ]
+
+    def test_limite_do_grupo(self):
+        """Testa se o aluno não passa de 2 empréstimos simultâneos e se a recusa não altera o estoque."""
+        self.livros[0].emprestar(self.usuario)
+        self.livros[1].emprestar(self.usuario)
+        with self.assertRaises(ValidationError) as cm:
+            self.livros[2].emprestar(self.usuario)
+        self.assertEqual(cm.exception.code, 'limite_emprestimos')
+        self.livros[2].refresh_from_db()
+        self.assertEqual(self.livros[2].copias_disponiveis, 1)
+        self.assertEqual(PerfilLeitor.objects.get(usuario=self.usuario).emprestimos_ativos, 2)
+
+    def test_devolucao_libera_limite(self):
+        """Testa se a devolução libera espaço para um novo empréstimo."""
+        emprestimo = self.livros[0].emprestar(self.usuario)
+        self.livros[1].emprestar(self.usuario)
+        emprestimo.registrar_devolucao()
+        self.livros[2].emprestar(self.usuario)
+        self.assertEqual(Emprestimo.objects.filter(usuario=self.usuario, devolvido=False).count(), 2)
+
+    def test_maior_limite_entre_grupos_e_padrao(self):
+        """Testa o maior limite entre os grupos do usuário e o limite padrão do setting."""
+        self.usuario.groups.add(self.funcionarios)
+        self.assertEqual(PoliticaEmprestimo.limite_para(self.usuario.pk), 20)
+
+        sem_grupo = User.objects.create_user(username="visitante", password="senha_teste")
+        self.assertIsNone(PoliticaEmprestimo.limite_para(sem_grupo.pk))
+        with self.settings(BIBLIOTECA_LIMITE_EMPRESTIMOS_PADRAO=1):
+            self.livros[0].emprestar(sem_grupo)
+            with self.assertRaises(ValidationError):
+                self.livros[1].emprestar(sem_grupo)
+
+    def test_lote_respeita_limite(self):
+        """Testa se o empréstimo em lote deixa de fora os livros além do limite."""
+        from ..services import emprestar_em_lote
+        self.livros[0].emprestar(self.usuario)
+        resultados = emprestar_em_lote(self.usuario, [str(livro.pk) for livro in self.livros[1:]])
+        self.assertEqual(
+            [r.situacao for r in resultados], ['emprestado', 'limite_emprestimos', 'limite_emprestimos']
+        )
+        self.assertEqual(PerfilLeitor.objects.get(usuario=self.usuario).emprestimos_ativos, 2)
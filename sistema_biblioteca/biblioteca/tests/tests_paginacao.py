@@ -0,0 +1,113 @@
+from datetime import date
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
+from ..models import Livro, Categoria
+from ..paginacao import paginar_por_cursor, codificar_cursor, decodificar_cursor, CursorInvalido
+
+
+class PaginacaoCursorTestCase(TestCase):
+
+    def setUp(self):
+        # Títulos repetidos para exercitar o desempate pelo id
+        Livro.objects.bulk_create([
+            Livro(
+                titulo=f"Livro {i // 2:02d}",
+                autor="Autor",
+                data_publicacao=date.today(),
+                isbn=f"{i:013d}",
+            )
+            for i in range(23)
+        ])
+
+    def _percorrer(self, ordenacao, tamanho):
+        """Percorre todas as páginas seguindo o cursor 'proximo'."""
+        vistos, cursor = [], None
+        while True:
+            pagina = paginar_por_cursor(Livro.objects.all(), cursor=cursor, ordenacao=ordenacao, tamanho=tamanho)
+            vistos.extend(livro.pk for livro in pagina)
+            if not pagina.proximo:
+                return vistos
+            cursor = pagina.proximo
+
+    def test_percorre_todos_os_registros_sem_repetir(self):
+        """Testa se as páginas cobrem todos os livros exatamente uma vez e na ordem."""
+        esperado = list(Livro.objects.order_by('titulo', 'id').values_list('pk', flat=True))
+        self.assertEqual(self._percorrer(('titulo', 'id'), 5), esperado)
+
+    def test_ordenacao_decrescente(self):
+        """Testa a paginação com ordem decrescente de id."""
+        esperado = list(Livro.objects.order_by('-id').values_list('pk', flat=True))
+        self.assertEqual(self._percorrer(('-id',), 4), esperado)
+
+    def test_pagina_anterior(self):
+        """Testa se o cursor 'anterior' retorna exatamente a página já exibida."""
+        primeira = paginar_por_cursor(Livro.objects.all(), ordenacao=('titulo', 'id'), tamanho=5)
+        segunda = paginar_por_cursor(Livro.objects.all(), cursor=primeira.proximo, ordenacao=('titulo', 'id'), tamanho=5)
+        volta = paginar_por_cursor(Livro.objects.all(), cursor=segunda.anterior, ordenacao=('titulo', 'id'), tamanho=5)
+
+        self.assertIsNone(primeira.anterior)
+        self.assertEqual([l.pk for l in volta], [l.pk for l in primeira])
+        self.assertIsNone(volta.anterior)
+
+    def test_cursor_invalido_retorna_primeira_pagina(self):
+        """Testa se um cursor corrompido é tratado como a primeira página."""
+        pagina = paginar_por_cursor(Livro.objects.all(), cursor='lixo!!', tamanho=5)
+        self.assertEqual(pagina.itens[0], Livro.objects.order_by('id').first())
+
+        with self.assertRaises(CursorInvalido):
+            decodificar_cursor('lixo!!')
+
+    def test_cursor_com_valores_de_tipo_ou_quantidade_errados(self):
+        """Testa se cursores forjados viram a primeira página nas views e CursorInvalido no modo estrito."""
+        primeira = list(Livro.objects.order_by('titulo', 'id')[:5])
+        forjados = [
+            codificar_cursor('p', ['Livro 01', 'abc']),
+            codificar_cursor('p', ['Livro 01']),
+            codificar_cursor('a', ['Livro 01', 3, 4]),
+            codificar_cursor('p', [None, 3]),
+            codificar_cursor('p', [['Livro 01'], {'id': 3}]),
+        ]
+        for cursor in forjados:
+            with self.subTest(cursor=decodificar_cursor(cursor)):
+                pagina = paginar_por_cursor(Livro.objects.all(), cursor=cursor, ordenacao=('titulo', 'id'), tamanho=5)
+                self.assertEqual(pagina.itens, primeira)
+                with self.assertRaises(CursorInvalido):
+                    paginar_por_cursor(
+                        Livro.objects.all(), cursor=cursor, ordenacao=('titulo', 'id'), tamanho=5, estrito=True,
+                    )
+
+        # Valores convertíveis (id em texto) continuam válidos.
+        cursor = codificar_cursor('p', [primeira[-1].titulo, str(primeira[-1].pk)])
+        pagina = paginar_por_cursor(Livro.objects.all(), cursor=cursor, ordenacao=('titulo', 'id'), tamanho=5, estrito=True)
+        self.assertNotIn(primeira[-1], pagina.itens)
+
+        User.objects.create_user(username='leitor', password='senha_teste')
+        self.client.login(username='leitor', password='senha_teste')
+        for nome in ('listar_livro', 'listar_categoria', 'listar_emprestimos'):
+            with self.subTest(nome=nome):
+                response = self.client.get(reverse(nome), {'cursor': forjados[0]})
+                self.assertEqual(response.status_code, 200)
+
+    def test_cursor_ida_e_volta(self):
+        """Testa se o token codificado é decodificado sem perdas."""
+        token = codificar_cursor('p', ['Título', 10])
+        self.assertEqual(decodificar_cursor(token), ('p', ['Título', 10]))
+
+    def test_listar_livro_paginado(self):
+        """Testa se a view de livros exibe apenas uma página e o link para a próxima."""
+        User.objects.create_user(username='leitor', password='senha_teste')
+        self.client.login(username='leitor', password='senha_teste')
+
+        response = self.client.get(reverse('listar_livro'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['livros']), 23)
+
+        Categoria.objects.bulk_create([Categoria(nome=f"Categoria {i:03d}") for i in range(30)])
+        response = self.client.get(reverse('listar_categoria'))
+        pagina = response.context['pagina']
+        self.assertEqual(len(pagina.itens), 25)
+        self.assertContains(response, f"cursor={pagina.proximo}")
+
+        response = self.client.get(reverse('listar_categoria'), {'cursor': pagina.proximo})
+        self.assertEqual(len(response.context['categorias']), 5)
@@ -0,0 +1,164 @@
+from datetime import date
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from ..models import Emprestimo, Livro, Reserva
+from .. import services
+
+
+class FilaReservasTestCase(TestCase):
+
+    def setUp(self):
+        self.leitor, self.primeiro, self.segundo = [
+            User.objects.create_user(username=nome, password='senha_teste')
+            for nome in ('leitor', 'primeiro', 'segundo')
+        ]
+        self.livro = Livro.objects.create(
+            titulo="Livro Disputado", autor="Autor", data_publicacao=date.today(),
+            isbn="1234567890", copias_disponiveis=1,
+        )
+        self.emprestimo = self.livro.emprestar(self.leitor)
+
+    def _contadores(self):
+        self.livro.refresh_from_db()
+        return (self.livro.copias_disponiveis, self.livro.emprestimos_ativos, self.livro.copias_reservadas)
+
+    def test_devolucao_separa_copia_para_o_primeiro_da_fila(self):
+        """Testa se a cópia devolvida fica separada para o primeiro da fila (FIFO)."""
+        reserva_primeiro = self.livro.reservar(self.primeiro)
+        reserva_segundo = self.livro.reservar(self.segundo)
+        self.assertEqual((reserva_primeiro.posicao(), reserva_segundo.posicao()), (1, 2))
+
+        self.emprestimo.registrar_devolucao()
+
+        reserva_primeiro.refresh_from_db()
+        self.assertEqual(reserva_primeiro.situacao, Reserva.DISPONIVEL)
+        self.assertIsNotNone(reserva_primeiro.disponivel_em)
+        self.assertEqual(Reserva.objects.get(pk=reserva_segundo.pk).posicao(), 1)
+        self.assertEqual(self._contadores(), (0, 0, 1))
+        self.assertEqual(self.livro.copias_total, 1)
+
+        # A cópia separada não pode ser emprestada a outro usuário.
+        with self.assertRaises(ValidationError) as erro:
+            self.livro.emprestar(self.segundo)
+        self.assertEqual(erro.exception.code, 'sem_copias')
+
+        self.livro.emprestar(self.primeiro)
+        self.assertEqual(Reserva.objects.get(pk=reserva_primeiro.pk).situacao, Reserva.ATENDIDA)
+        self.assertEqual(self._contadores(), (0, 1, 0))
+
+    def test_reservar_validacoes(self):
+        """Testa as recusas de reserva: livro com cópias, empréstimo ativo e reserva repetida."""
+        with self.assertRaises(ValidationError) as erro:
+            self.livro.reservar(self.leitor)
+        self.assertEqual(erro.exception.code, 'emprestimo_duplicado')
+
+        self.livro.reservar(self.primeiro)
+        with self.assertRaises(ValidationError) as erro:
+            self.livro.reservar(self.primeiro)
+        self.assertEqual(erro.exception.code, 'reserva_duplicada')
+
+        Livro.objects.filter(pk=self.livro.pk).update(copias_disponiveis=1)
+        with self.assertRaises(ValidationError) as erro:
+            self.livro.reservar(self.segundo)
+        self.assertEqual(erro.exception.code, 'com_copias')
+
+    def test_cancelar_repassa_copia_separada(self):
+        """Testa se cancelar uma reserva com cópia separada a repassa ao próximo da fila ou ao estoque."""
+        reserva_primeiro = self.livro.reservar(self.primeiro)
+        reserva_segundo = self.livro.reservar(self.segundo)
+        self.emprestimo.registrar_devolucao()
+
+        self.assertTrue(Reserva.objects.get(pk=reserva_primeiro.pk).cancelar())
+        self.assertEqual(Reserva.objects.get(pk=reserva_segundo.pk).situacao, Reserva.DISPONIVEL)
+        self.assertEqual(self._contadores(), (0, 0, 1))
+
+        self.assertTrue(reserva_segundo.cancelar())
+        self.assertFalse(reserva_segundo.cancelar())
+        self.assertEqual(self._contadores(), (1, 0, 0))
+
+    def test_emprestimo_sem_reserva_nao_atualiza_reservas(self):
+        """Testa se o empréstimo de quem não tem reserva do livro não grava na tabela de reservas."""
+        self.livro.reservar(self.primeiro)
+        Livro.objects.filter(pk=self.livro.pk).update(copias_disponiveis=2)
+        outro = Livro.objects.create(
+            titulo="Outro", autor="Autor", data_publicacao=date.today(), isbn="0987654321", copias_disponiveis=1,
+        )
+        tabela = Reserva._meta.db_table
+        with CaptureQueriesContext(connection) as consultas:
+            self.livro.emprestar(self.segundo)
+            services.emprestar_em_lote(self.leitor, [str(outro.pk)])
+        self.assertFalse([c['sql'] for c in consultas if c['sql'].startswith(f'UPDATE "{tabela}"')])
+
+    def test_emprestimo_do_estoque_encerra_reserva_na_fila(self):
+        """Testa se quem está na fila e pega uma cópia do estoque sai da fila antes da próxima devolução."""
+        reserva_primeiro = self.livro.reservar(self.primeiro)
+        reserva_segundo = self.livro.reservar(self.segundo)
+        Livro.objects.filter(pk=self.livro.pk).update(copias_disponiveis=1)
+
+        self.livro.emprestar(self.primeiro)
+        self.assertEqual(Reserva.objects.get(pk=reserva_primeiro.pk).situacao, Reserva.ATENDIDA)
+
+        self.emprestimo.registrar_devolucao()
+        self.assertEqual(Reserva.objects.get(pk=reserva_segundo.pk).situacao, Reserva.DISPONIVEL)
+        self.assertEqual(self._contadores(), (0, 1, 1))
+
+        # Em lote: a devolução do primeiro volta ao estoque, sem separar outra cópia para o leitor.
+        reserva_leitor = self.livro.reservar(self.leitor)
+        Livro.objects.filter(pk=self.livro.pk).update(copias_disponiveis=1)
+        resultados = services.emprestar_em_lote(self.leitor, [str(self.livro.pk)])
+        self.assertEqual(resultados[0].situacao, 'emprestado')
+        self.assertEqual(Reserva.objects.get(pk=reserva_leitor.pk).situacao, Reserva.ATENDIDA)
+        services.devolver_em_lote(self.primeiro, [str(self.livro.pk)])
+        self.assertEqual(self._contadores(), (1, 1, 1))
+
+    def test_devolucao_em_lote_respeita_a_fila(self):
+        """Testa a devolução e o empréstimo em lote com fila de reservas."""
+        outro = Livro.objects.create(
+            titulo="Outro Livro", autor="Autor", data_publicacao=date.today(),
+            isbn="1234567891", copias_disponiveis=1,
+        )
+        services.emprestar_em_lote(self.primeiro, [str(outro.pk)])
+        self.livro.reservar(self.primeiro)
+
+        resultados = services.devolver_em_lote(self.leitor, [str(self.livro.pk)])
+        self.assertEqual(resultados[0].situacao, 'devolvido')
+        self.assertEqual(self._contadores(), (0, 0, 1))
+
+        resultados = services.emprestar_em_lote(self.primeiro, [str(self.livro.pk)])
+        self.assertEqual(resultados[0].situacao, 'emprestado')
+        self.assertEqual(self._contadores(), (0, 1, 0))
+        self.assertFalse(Reserva.objects.filter(situacao=Reserva.DISPONIVEL).exists())
+
+    def test_primeiro_da_fila_usa_indice(self):
+        """Testa se a busca do primeiro da fila é atendida pelo índice parcial da fila."""
+        if connection.vendor != 'sqlite':
+            self.skipTest("Plano de execução específico do SQLite.")
+        plano = (
+            Reserva.objects.filter(livro_id=self.livro.pk, situacao=Reserva.AGUARDANDO)
+            .order_by('criada_em', 'id').values('id')[:1].explain()
+        )
+        self.assertIn('reserva_fila_idx', plano)
+        self.assertNotIn('TEMP B-TREE', plano)
+
+    def test_view_reservar_livro(self):
+        """Testa a oferta de reserva na página de livro indisponível e o registro da reserva."""
+        self.client.login(username='primeiro', password='senha_teste')
+        response = self.client.post(reverse('registrar_emprestimo'), {
+            'livro_id': self.livro.pk, 'usuario_id': self.primeiro.pk,
+        })
+        self.assertTemplateUsed(response, 'emprestimo_indisponivel.html')
+        self.assertContains(response, reverse('reservar_livro'))
+
+        response = self.client.post(reverse('reservar_livro'), {
+            'livro_id': self.livro.pk, 'usuario_id': self.primeiro.pk,
+        })
+        self.assertContains(response, "posição 1")
+        self.assertTrue(Reserva.objects.filter(usuario=self.primeiro, situacao=Reserva.AGUARDANDO).exists())
+
+        for dados in ({'livro_id': '', 'usuario_id': self.segundo.pk}, {'livro_id': self.livro.pk, 'usuario_id': 'x'}):
+            self.assertEqual(self.client.post(reverse('reservar_livro'), dados).status_code, 400)
+        self.assertFalse(Reserva.objects.filter(usuario=self.segundo).exists())
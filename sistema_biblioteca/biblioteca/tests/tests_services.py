@@ -0,0 +1,96 @@
+from datetime import date
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.urls import reverse
+from ..models import Emprestimo, Livro, PerfilLeitor
+from .. import services
+
+
+class CirculacaoEmLoteTestCase(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(username='leitor', password='senha_teste')
+        # O perfil é criado no primeiro empréstimo; aqui já existe, como no uso normal.
+        PerfilLeitor.garantir(self.usuario.pk)
+        self.livros = [
+            Livro(titulo=f"Livro {i}", autor="Autor", data_publicacao=date(2000, 1, 1),
+                  isbn=f"978000000{i:04d}", copias_disponiveis=2)
+            for i in range(30)
+        ]
+        Livro.objects.bulk_create(self.livros)
+        self.livros = list(Livro.objects.order_by('id'))
+
+    def test_emprestar_em_lote_com_consultas_fixas(self):
+        """Testa se 30 livros são emprestados com um número fixo de consultas."""
+        identificadores = [livro.isbn for livro in self.livros]
+        with self.assertNumQueries(10):
+            resultados = services.emprestar_em_lote(self.usuario, identificadores)
+
+        self.assertTrue(all(r.situacao == 'emprestado' for r in resultados))
+        self.assertEqual(Emprestimo.objects.filter(usuario=self.usuario, devolvido=False).count(), 30)
+        self.assertEqual(set(Livro.objects.values_list('copias_disponiveis', 'emprestimos_ativos')), {(1, 1)})
+        self.assertEqual(PerfilLeitor.objects.get(usuario=self.usuario).emprestimos_ativos, 30)
+
+    def test_emprestar_em_lote_resultados_por_item(self):
+        """Testa os resultados individuais: não encontrado, repetido, sem cópias e duplicado."""
+        esgotado, emprestado, livre = self.livros[:3]
+        Livro.objects.filter(pk=esgotado.pk).update(copias_disponiveis=0)
+        emprestado.emprestar(self.usuario)
+
+        resultados = services.emprestar_em_lote(
+            self.usuario,
+            [str(esgotado.pk), emprestado.isbn, '978-000000-0002', str(livre.pk), '9999999999', 'abc'],
+        )
+
+        self.assertEqual(
+            [r.situacao for r in resultados],
+            ['sem_copias', 'emprestimo_duplicado', 'emprestado', 'repetido', 'nao_encontrado', 'nao_encontrado'],
+        )
+        self.assertEqual(resultados[2].livro, livre)
+        livre.refresh_from_db()
+        self.assertEqual(livre.copias_disponiveis, 1)
+
+    def test_devolver_em_lote(self):
+        """Testa a devolução em lote e a idempotência de um segundo envio."""
+        identificadores = [str(livro.pk) for livro in self.livros[:10]]
+        services.emprestar_em_lote(self.usuario, identificadores)
+
+        with self.assertNumQueries(8):
+            resultados = services.devolver_em_lote(self.usuario, identificadores + [str(self.livros[20].pk)])
+
+        self.assertEqual([r.situacao for r in resultados], ['devolvido'] * 10 + ['sem_emprestimo'])
+        self.assertFalse(Emprestimo.objects.filter(devolvido=False).exists())
+        self.assertEqual(set(Livro.objects.values_list('copias_disponiveis', 'emprestimos_ativos')), {(2, 0)})
+        self.assertEqual(PerfilLeitor.objects.get(usuario=self.usuario).emprestimos_ativos, 0)
+
+        resultados = services.devolver_em_lote(self.usuario, identificadores)
+        self.assertTrue(all(r.situacao == 'sem_emprestimo' for r in resultados))
+        self.assertEqual(set(Livro.objects.values_list('copias_disponiveis', flat=True)), {2})
+
+    def test_separar_identificadores(self):
+        """Testa a leitura dos códigos digitados ou lidos pelo scanner."""
+        self.assertEqual(services.separar_identificadores("12\n978-85 ; 3,4"), ['12', '978-85', '3', '4'])
+        with self.assertRaises(ValidationError):
+            services.separar_identificadores("  \n ")
+
+    def test_view_emprestimo_em_lote(self):
+        """Testa o formulário de empréstimo em lote."""
+        self.client.login(username='leitor', password='senha_teste')
+        response = self.client.post(reverse('registrar_emprestimo_lote'), {
+            'usuario_id': self.usuario.pk,
+            'livros': '\n'.join(livro.isbn for livro in self.livros[:3]) + '\n0000',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'circulacao_lote.html')
+        self.assertContains(response, "Empréstimo registrado.", count=3)
+        self.assertContains(response, "Livro não encontrado.")
+
+        response = self.client.post(reverse('registrar_devolucao_lote'), {
+            'usuario_id': self.usuario.pk, 'livros': self.livros[0].isbn,
+        })
+        self.assertContains(response, "Devolução registrada.")
+
+        response = self.client.post(reverse('registrar_emprestimo_lote'), {'usuario_id': '', 'livros': '0000'})
+        self.assertContains(response, "Selecione um usuário válido.", status_code=400)
+        self.assertContains(response, '0000', status_code=400)
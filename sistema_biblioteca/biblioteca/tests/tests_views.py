@@ -1,10 +1,11 @@
-from datetime import date
-from django.test import TestCase, Client
+from datetime import date, timedelta
+from django.test import TestCase, Client, override_settings
 from ..models import *
 from ..forms import *
 from django.contrib.auth.models import User
 from django.utils.timezone import now
 from django.urls import reverse
+from .consultas import OrcamentoConsultasMixin
 
 # Tests Views Emprestimo
 
@@ -233,3 +234,320 @@ class LivroViewsTestCase(TestCase):
         self.assertFalse(Livro.objects.filter(titulo="Novo Livro").exists())
 
         # ----------------!---------------- #
+
+# Tests Views Listagem de Empréstimos
+
+class ListarEmprestimosConsultasTestCase(OrcamentoConsultasMixin, TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(username='usuario_teste', password='senha_teste')
+        self.client.login(username='usuario_teste', password='senha_teste')
+        self.url = reverse('listar_emprestimos')
+
+    def _criar_emprestimos(self, quantidade):
+        """Cria 'quantidade' empréstimos, cada um para um livro diferente."""
+        inicio = Livro.objects.count()
+        livros = Livro.objects.bulk_create([
+            Livro(
+                titulo=f"Livro {i}",
+                autor="Autor",
+                data_publicacao=date.today(),
+                isbn=f"{i:013d}",
+            )
+            for i in range(inicio, inicio + quantidade)
+        ])
+        Emprestimo.objects.bulk_create([
+            Emprestimo(usuario=self.usuario, livro=livro) for livro in livros
+        ])
+
+    def _contar_consultas(self):
+        response, consultas = self._requisitar('listar_emprestimos')
+        self.assertEqual(response.status_code, 200)
+        self._verificar_orcamento('listar_emprestimos', consultas)
+        return len(consultas)
+
+    def test_listar_emprestimos_numero_constante_de_consultas(self):
+        """Testa se a listagem executa o mesmo número de consultas para 10 e 10.000 empréstimos."""
+        self._criar_emprestimos(10)
+        consultas_poucos = self._contar_consultas()
+
+        self._criar_emprestimos(10_000 - 10)
+        consultas_muitos = self._contar_consultas()
+
+        self.assertEqual(consultas_poucos, consultas_muitos)
+
+    def test_listar_emprestimos_exibe_livro_e_usuario(self):
+        """Testa se título do livro e nome do usuário aparecem na listagem."""
+        self._criar_emprestimos(1)
+        response = self.client.get(self.url)
+        self.assertContains(response, "Livro 0")
+        self.assertContains(response, "usuario_teste")
+
+    def test_listar_emprestimos_atrasados(self):
+        """Testa o filtro de atrasados: apenas empréstimos em aberto com prazo vencido."""
+        self._criar_emprestimos(3)
+        atrasado, devolvido, _ = Emprestimo.objects.order_by('id')
+        vencido = now() - timedelta(days=1)
+        Emprestimo.objects.filter(pk__in=[atrasado.pk, devolvido.pk]).update(data_prevista_devolucao=vencido)
+        Emprestimo.objects.filter(pk=devolvido.pk).update(devolvido=True, data_devolucao=now())
+
+        response = self.client.get(self.url, {'filtro': 'atrasados'})
+        self.assertEqual([e.pk for e in response.context['emprestimos']], [atrasado.pk])
+        self.assertContains(response, "Atrasado")
+
+        # ----------------!---------------- #
+
+# Tests Views Autocompletar
+
+class AutocompletarTestCase(OrcamentoConsultasMixin, TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(
+            username='balcao', password='senha_teste', first_name='Ana', last_name='Souza'
+        )
+        # bulk_create não dispara o sinal que grava os nomes normalizados.
+        PerfilLeitor.sincronizar_nomes(
+            User.objects.bulk_create([User(username=f"leitor{i:03d}", first_name="Bruno") for i in range(50)])
+        )
+        self.client.login(username='balcao', password='senha_teste')
+        self.livro = Livro.objects.create(
+            titulo="Memórias Póstumas", autor="Machado de Assis",
+            data_publicacao=date(1881, 1, 1), isbn="9788535910660", copias_disponiveis=2,
+        )
+
+    def _resultados(self, nome, termo):
+        response = self.assertOrcamentoConsultas(nome, dados={'q': termo})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['resultados']
+
+    def test_autocompletar_usuarios_por_prefixo(self):
+        """Testa a busca por prefixo no username e no nome, com limite de resultados."""
+        self.assertEqual([r['id'] for r in self._resultados('autocompletar_usuarios', 'BAL')], [self.usuario.pk])
+        self.assertEqual(self._resultados('autocompletar_usuarios', 'an')[0]['texto'], "Ana Souza (balcao)")
+        self.assertEqual(len(self._resultados('autocompletar_usuarios', 'leitor')), 20)
+        self.assertEqual(self._resultados('autocompletar_usuarios', 'l'), [])
+
+    def test_autocompletar_usuarios_sem_diferenciar_acentos(self):
+        """Testa se nomes acentuados são encontrados com ou sem acento, em maiúsculas ou minúsculas."""
+        erica = User.objects.create_user(username='Érica.Lima', first_name='Érica')
+        for termo in ('érica', 'ÉRI', 'eri', 'Erica.l'):
+            with self.subTest(termo=termo):
+                self.assertEqual([r['id'] for r in self._resultados('autocompletar_usuarios', termo)], [erica.pk])
+
+        erica.first_name = 'Ângela'
+        erica.username = 'angela'
+        erica.save()
+        self.assertEqual(self._resultados('autocompletar_usuarios', 'eri'), [])
+        self.assertEqual([r['id'] for r in self._resultados('autocompletar_usuarios', 'âng')], [erica.pk])
+
+    def test_autocompletar_usuarios_usa_indice(self):
+        """Testa se a busca por prefixo usa os índices dos nomes normalizados (SQLite)."""
+        from django.db import connection
+        if connection.vendor != 'sqlite':
+            self.skipTest("Plano de execução verificado apenas no SQLite.")
+        plano = PerfilLeitor.objects.filter(
+            username_normalizado__gte='ab', username_normalizado__lt='ab\U0010ffff'
+        ).explain()
+        self.assertIn('perfil_username_norm_idx', plano)
+
+    def test_autocompletar_livros(self):
+        """Testa a busca de livros por prefixo de título e de ISBN."""
+        resultados = self._resultados('autocompletar_livros', 'memo')
+        self.assertEqual(resultados, [{
+            'id': self.livro.pk, 'texto': "Memórias Póstumas (9788535910660)", 'copias_disponiveis': 2,
+        }])
+        self.assertEqual([r['id'] for r in self._resultados('autocompletar_livros', '978853591')], [self.livro.pk])
+
+    def test_formulario_nao_lista_todos_os_registros(self):
+        """Testa se o GET dos formulários não depende do número de usuários e livros."""
+        for nome in ('registrar_emprestimo', 'registrar_devolucao'):
+            response = self.client.get(reverse(nome))
+            self.assertEqual(response.status_code, 200)
+            self.assertNotContains(response, 'leitor000')
+            self.assertNotContains(response, 'Memórias Póstumas')
+            self.assertContains(response, reverse('autocompletar_usuarios'))
+
+        # ----------------!---------------- #
+
+# Tests Views Devolução
+
+class RegistrarDevolucaoViewTestCase(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user(username='leitor', password='senha_teste')
+        self.outro = User.objects.create_user(username='outro_leitor', password='senha_teste')
+        self.client.login(username='leitor', password='senha_teste')
+        self.url = reverse('registrar_devolucao')
+        livros = Livro.objects.bulk_create([
+            Livro(titulo=f"Livro {i}", autor="Autor", data_publicacao=date.today(), isbn=f"{i:013d}")
+            for i in range(4)
+        ])
+        self.emprestimo = livros[0].emprestar(self.usuario)
+        livros[1].emprestar(self.usuario)
+        livros[2].emprestar(self.outro)
+
+    def test_lista_apenas_emprestimos_ativos_do_usuario(self):
+        """Testa se a página mostra somente os empréstimos em aberto do usuário escolhido."""
+        response = self.client.get(self.url, {'usuario_id': self.usuario.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [e.livro.titulo for e in response.context['emprestimos']], ["Livro 0", "Livro 1"]
+        )
+        self.assertNotContains(response, "Livro 2")
+        self.assertNotContains(response, "Livro 3")
+
+    def test_emprestimos_ativos_em_uma_consulta(self):
+        """Testa se os empréstimos ativos e os títulos vêm de uma única consulta indexada."""
+        with self.assertNumQueries(1):
+            titulos = [e.livro.titulo for e in Emprestimo.objects.ativos_do_usuario(self.usuario.pk)]
+        self.assertEqual(titulos, ["Livro 0", "Livro 1"])
+
+        from django.db import connection
+        if connection.vendor == 'sqlite':
+            plano = Emprestimo.objects.ativos_do_usuario(self.usuario.pk).explain()
+            self.assertIn('SEARCH biblioteca_emprestimo USING INDEX', plano)
+
+    def test_devolucao_por_id_do_emprestimo(self):
+        """Testa a devolução pelo id do empréstimo e a repetição do envio."""
+        for _ in range(2):
+            response = self.client.post(self.url, {'emprestimo_id': self.emprestimo.pk})
+            self.assertRedirects(response, reverse('listar_emprestimos'))
+
+        self.emprestimo.refresh_from_db()
+        self.assertTrue(self.emprestimo.devolvido)
+        self.assertEqual(Livro.objects.get(pk=self.emprestimo.livro_id).copias_disponiveis, 1)
+
+    def test_devolucao_de_emprestimo_inexistente(self):
+        """Testa se um id de empréstimo inexistente retorna 404."""
+        response = self.client.post(self.url, {'emprestimo_id': 999999})
+        self.assertEqual(response.status_code, 404)
+
+    def test_ids_vazios_ou_nao_numericos(self):
+        """Testa se ids vazios ou não numéricos no empréstimo e na devolução respondem 400, sem erro 500."""
+        url_emprestimo = reverse('registrar_emprestimo')
+        for valor in ('', 'abc', '1.5'):
+            with self.subTest(valor=valor):
+                self.assertEqual(self.client.post(self.url, {'emprestimo_id': valor}).status_code, 400)
+                self.assertEqual(self.client.get(self.url, {'usuario_id': valor}).status_code, 400 if valor else 200)
+                response = self.client.post(url_emprestimo, {'livro_id': valor, 'usuario_id': self.usuario.pk})
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post(self.url).status_code, 400)
+        self.assertFalse(Emprestimo.objects.filter(pk=self.emprestimo.pk, devolvido=True).exists())
+
+        # ----------------!---------------- #
+
+# Tests Orçamento de Consultas
+
+@override_settings(BIBLIOTECA_METRICAS=True)
+class OrcamentoConsultasViewsTestCase(OrcamentoConsultasMixin, TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='senha_teste')
+        self.leitor = User.objects.create_user(username='leitor', password='senha_teste')
+        self.client.login(username='admin', password='senha_teste')
+        self.livros = []
+        self._criar_acervo(1)
+
+    def _criar_acervo(self, quantidade):
+        """
+        Cria 'quantidade' livros, cada um com uma categoria própria, um empréstimo
+        atrasado do leitor e um empréstimo devolvido de um novo usuário.
+        """
+        vencido = now() - timedelta(days=30)
+        for _ in range(quantidade):
+            i = len(self.livros)
+            categoria = Categoria.objects.create(nome=f"Categoria {i}")
+            livro = Livro.objects.create(
+                titulo=f"Livro Teste {i}", autor="Autor Teste", data_publicacao=date(2000, 1, 1),
+                isbn=f"{i:013d}", copias_disponiveis=3,
+            )
+            livro.categorias.add(categoria)
+            usuario = User.objects.create_user(username=f"usuario{i:03d}")
+            devolvido = livro.emprestar(usuario)
+            devolvido.registrar_devolucao()
+            livro.emprestar(self.leitor)
+            self.livros.append(livro)
+        Emprestimo.objects.filter(devolvido=False).update(data_emprestimo=vencido, data_prevista_devolucao=vencido)
+
+    def _limpar_acervo(self):
+        Emprestimo.objects.all().delete()
+        Livro.objects.all().delete()
+        Categoria.objects.all().delete()
+        PerfilLeitor.objects.all().delete()
+        User.objects.filter(username__startswith='usuario').delete()
+        self.livros = []
+
+    def test_todas_as_urls_tem_orcamento(self):
+        """Testa se cada URL de biblioteca/urls.py tem orçamento declarado, e só elas."""
+        from .. import urls
+        self.assertEqual({padrao.name for padrao in urls.urlpatterns}, set(self.orcamento))
+
+    def test_views_dentro_do_orcamento(self):
+        """Testa cada URL (GET e os POSTs de circulação) contra o orçamento de consultas."""
+        livro = self.livros[0]
+        categoria = livro.categorias.get()
+        emprestimo = Emprestimo.objects.filter(usuario=self.leitor).first()
+        Livro.objects.filter(pk=livro.pk).update(copias_disponiveis=10)
+        balcao = User.objects.create_user(username='balcao')
+        a_devolver = livro.emprestar(User.objects.create_user(username='quiosque'))
+        casos = [
+            ('pagina_inicial',), ('login',), ('registro',), ('perfil_usuario',),
+            ('listar_categoria',), ('adicionar_categoria',),
+            ('atualizar_categoria', 'get', [categoria.pk]),
+            ('excluir_categoria', 'get', [categoria.pk]),
+            ('detalhes_categoria', 'get', [categoria.pk]),
+            ('listar_livro',), ('buscar_livro', 'get', (), {'q': 'livro'}),
+            ('atualizar_livro', 'get', [livro.pk]), ('excluir_livro', 'get', [livro.pk]), ('adicionar_livro',),
+            ('listar_emprestimos',), ('listar_emprestimos', 'get', (), {'filtro': 'atrasados'}),
+            ('registrar_emprestimo',),
+            ('registrar_emprestimo', 'post', (), {'livro_id': livro.pk, 'usuario_id': self.admin.pk}),
+            ('registrar_devolucao', 'get', (), {'usuario_id': self.leitor.pk}),
+            ('registrar_devolucao', 'post', (), {'emprestimo_id': emprestimo.pk}),
+            ('registrar_emprestimo_lote', 'post', (), {'usuario_id': self.admin.pk, 'livros': str(livro.pk)}),
+            ('registrar_devolucao_lote', 'post', (), {'usuario_id': self.admin.pk, 'livros': str(livro.pk)}),
+            ('reservar_livro', 'post', (), {'livro_id': livro.pk, 'usuario_id': self.admin.pk}),
+            ('autocompletar_usuarios', 'get', (), {'q': 'usu'}), ('autocompletar_livros', 'get', (), {'q': 'livro'}),
+            ('exportar_emprestimos',), ('exportar_livros',), ('metricas',),
+            ('api_livros',), ('api_livro', 'get', [livro.pk]),
+            ('api_categorias',), ('api_categoria', 'get', [categoria.pk]),
+            ('api_emprestimos',), ('api_emprestimo', 'get', [emprestimo.pk]),
+            ('api_emprestimos', 'post', (), {'livro_id': livro.pk, 'usuario_id': balcao.pk}),
+            ('api_devolucao', 'post', [a_devolver.pk]),
+            ('logout',),
+        ]
+        for caso in casos:
+            with self.subTest(caso=caso):
+                response = self.assertOrcamentoConsultas(*caso)
+                self.assertLess(response.status_code, 400)
+
+    def test_listagens_com_numero_constante_de_consultas(self):
+        """Testa se as listagens e buscas executam as mesmas consultas com 2 e 20 livros."""
+        casos = [
+            ('listar_livro',), ('listar_categoria',), ('buscar_livro', 'get', (), {'q': 'livro'}),
+            ('listar_emprestimos',), ('listar_emprestimos', 'get', (), {'filtro': 'devolvidos'}),
+            ('listar_emprestimos', 'get', (), {'filtro': 'atrasados'}),
+            ('registrar_devolucao', 'get', (), {'usuario_id': self.leitor.pk}),
+            ('autocompletar_usuarios', 'get', (), {'q': 'usu'}), ('autocompletar_livros', 'get', (), {'q': 'livro'}),
+            ('exportar_emprestimos',), ('exportar_livros',),
+            ('api_livros',), ('api_categorias',), ('api_emprestimos',),
+            ('api_emprestimos', 'get', (), {'filtro': 'atrasados'}),
+        ]
+        for nome_url, metodo, args, dados in (caso + ('get', (), {})[len(caso) - 1:] for caso in casos):
+            with self.subTest(nome_url=nome_url, dados=dados):
+                self._limpar_acervo()
+                self.assertConsultasConstantes(nome_url, self._criar_acervo, metodo=metodo, args=args, dados=dados)
+
+    def test_circulacao_em_lote_com_numero_constante_de_consultas(self):
+        """Testa se o empréstimo em lote executa as mesmas consultas com 2 e 10 livros."""
+        self._limpar_acervo()
+        dados = {'usuario_id': self.admin.pk, 'livros': ''}
+
+        def criar_livros(quantidade):
+            inicio = len(self.livros)
+            self._criar_acervo(quantidade)
+            novos = ' '.join(str(livro.pk) for livro in self.livros[inicio:])
+            dados['livros'] = f"{dados['livros']} {novos}".strip()
+
+        self.assertConsultasConstantes(
+            'registrar_emprestimo_lote', criar_livros, tamanhos=(2, 10), metodo='post', dados=dados,
+        )
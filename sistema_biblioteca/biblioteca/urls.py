@@ -1,5 +1,7 @@
 from django.urls import path
 from .views import *
+from .metricas import exportar_metricas
+from . import api
 urlpatterns = [
     # Paths Base
     path('pagina_inicial/', pagina_inicial, name='pagina_inicial'),
@@ -13,9 +15,11 @@ urlpatterns = [
     path('adicionar_categoria/', adicionar_categoria, name='adicionar_categoria'),
     path('atualizar_categoria/<int:categoria_id>/', atualizar_categoria, name='atualizar_categoria'),
     path('excluir_categoria/<int:pk>/', excluir_categoria, name='excluir_categoria'),
+    path('detalhes_categoria/<int:pk>/', detalhes_categoria, name='detalhes_categoria'),
     
     # Paths Livro
     path('listar_livro/', listar_livro, name='listar_livro'),
+    path('buscar_livro/', buscar_livro, name='buscar_livro'),
     path('atualizar_livro/<int:livro_id>/',atualizar_livro, name='atualizar_livro'),
     path('excluir_livro/<int:livro_id>/', excluir_livro, name='excluir_livro'),
     path('adicionar_livro/', adicionar_livro, name='adicionar_livro'),
@@ -24,4 +28,27 @@ urlpatterns = [
     path('listar_emprestimos/', listar_emprestimos, name='listar_emprestimos'),
     path('registrar_emprestimo/', registrar_emprestimo, name='registrar_emprestimo'),
     path('registrar_devolucao/', registrar_devolucao, name='registrar_devolucao'), 
+    path('registrar_emprestimo_lote/', registrar_emprestimo_lote, name='registrar_emprestimo_lote'),
+    path('registrar_devolucao_lote/', registrar_devolucao_lote, name='registrar_devolucao_lote'),
+    path('reservar_livro/', reservar_livro, name='reservar_livro'),
+
+    # Paths Autocompletar
+    path('autocompletar/usuarios/', autocompletar_usuarios, name='autocompletar_usuarios'),
+    path('autocompletar/livros/', autocompletar_livros, name='autocompletar_livros'),
+
+    # Paths Exportação
+    path('exportar_emprestimos/', exportar_emprestimos, name='exportar_emprestimos'),
+    path('exportar_livros/', exportar_livros, name='exportar_livros'),
+
+    # Paths Métricas
+    path('metricas/', exportar_metricas, name='metricas'),
+
+    # Paths API (v1)
+    path('api/v1/livros/', api.listar_livros, name='api_livros'),
+    path('api/v1/livros/<int:livro_id>/', api.detalhar_livro, name='api_livro'),
+    path('api/v1/categorias/', api.listar_categorias, name='api_categorias'),
+    path('api/v1/categorias/<int:categoria_id>/', api.detalhar_categoria, name='api_categoria'),
+    path('api/v1/emprestimos/', api.emprestimos, name='api_emprestimos'),
+    path('api/v1/emprestimos/<int:emprestimo_id>/', api.detalhar_emprestimo, name='api_emprestimo'),
+    path('api/v1/emprestimos/<int:emprestimo_id>/devolucao/', api.devolver_emprestimo, name='api_devolucao'),
 ]
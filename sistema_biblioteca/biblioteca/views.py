@@ -4,17 +4,23 @@ Arquivo responsável pelas views da aplicação 'biblioteca'.
 Contém lógica para gerenciamento de categorias, livros, empréstimos e autenticação.
 """
 
-from django.http import HttpResponseForbidden, HttpResponseRedirect
+from django.http import HttpResponseBadRequest, HttpResponseForbidden, HttpResponseRedirect, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.models import User
 from django.urls import reverse  
-from .models import Categoria, Livro, Emprestimo
+from .models import Categoria, Livro, Emprestimo, PerfilLeitor
 from .forms import CategoriaForm, LivroForm, UserRegisterForm, LivroFormCommonUser, CategoriaFormCommonUser
+from .paginacao import paginar_por_cursor
+from .busca import buscar_ids, buscar_livros, normalizar
+from . import cache, exportacao, services
 from django.contrib import messages
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required, permission_required
 from django.core.exceptions import ValidationError, PermissionDenied
 from django.views.decorators.csrf import csrf_protect
+from django.views.decorators.http import require_GET
+from django.utils.dateparse import parse_date
+from django.db.models import Q
 
 # View Base
 def pagina_inicial(request): 
@@ -89,13 +95,20 @@ def perfil_usuario(request):
 # Views de Categoria
 @login_required
 @csrf_protect
+@cache.pagina_condicional(cache.CATEGORIAS)
+@cache.pagina_em_cache(cache.CATEGORIAS)
 def listar_categoria(request):
     """
-    View para listar todas as categorias.
-    Requer autenticação.
+    View para listar categorias, paginadas por cursor em ordem alfabética.
+    Requer autenticação. A página renderizada fica em cache até a próxima
+    alteração de categorias; até lá, navegadores com a ETag recebem 304.
     """
-    categorias = Categoria.objects.all()    
-    return render(request, 'listar_categoria.html', {'categorias': categorias})
+    pagina = paginar_por_cursor(
+        Categoria.objects.all(),
+        cursor=request.GET.get('cursor'),
+        ordenacao=('nome', 'id'),
+    )
+    return render(request, 'listar_categoria.html', {'categorias': pagina.itens, 'pagina': pagina})
 
 @login_required
 @permission_required('app.add_categoria', raise_exception=True)
@@ -144,10 +157,14 @@ def atualizar_categoria(request, categoria_id):
 @login_required
 @permission_required('app.view_categoria', raise_exception=True)  
 @csrf_protect
+@cache.pagina_condicional(cache.CATEGORIAS)
+@cache.pagina_em_cache(cache.CATEGORIAS)
 def detalhes_categoria(request, pk):
     """
     View para exibir detalhes de categoria.
     Requer permissão 'app.view_categoria', autenticação e proteção CSRF.
+    A página renderizada fica em cache até a próxima alteração de categorias;
+    até lá, navegadores com a ETag recebem 304.
     """
     categoria = get_object_or_404(Categoria, pk=pk)
     if not (request.user.has_perm('app.view_categoria') or request.user.is_superuser):
@@ -175,22 +192,61 @@ def excluir_categoria(request, pk):
 # ----------------!---------------- #
 
 # Views de Livro
+def _prefixo_url(nome):
+    """
+    Retorna o prefixo de uma URL cujo único argumento é o id no final
+    (ex.: '/atualizar_livro/' para '/atualizar_livro/<id>/'). As listagens montam
+    as URLs das linhas com '{{ prefixo }}{{ id }}/', sem um reverse() por linha.
+    """
+    url = reverse(nome, args=[0])
+    if not url.endswith('/0/'):
+        raise ValueError(f"A URL '{nome}' não termina com o id.")
+    return url[:-2]
+
+def _contexto_linhas_livro():
+    return {
+        'geracao_fragmentos': cache.geracao_fragmentos(),
+        'url_atualizar_livro': _prefixo_url('atualizar_livro'),
+        'url_excluir_livro': _prefixo_url('excluir_livro'),
+    }
+
 @login_required
 @csrf_protect
+@cache.pagina_condicional(cache.LIVROS)
+@cache.pagina_em_cache(cache.LIVROS)
 def listar_livro(request):
     """
-    View para listar todos os livros.
+    View para listar livros, paginados por cursor em ordem de título.
+    Requer autenticação. A página renderizada fica em cache até a próxima
+    alteração de livros (inclusive empréstimos e devoluções, que mudam as cópias);
+    até lá, navegadores com a ETag recebem 304.
+    """
+    pagina = paginar_por_cursor(
+        Livro.objects.all(),
+        cursor=request.GET.get('cursor'),
+        ordenacao=('titulo', 'id'),
+    )
+    return render(request, 'listar_livro.html', {'livros': pagina.itens, 'pagina': pagina, **_contexto_linhas_livro()})
+
+@login_required
+@csrf_protect
+def buscar_livro(request):
+    """
+    View para buscar livros por título, autor, ISBN ou nome de categoria.
+    Resultados ordenados por relevância a partir do índice de busca.
     Requer autenticação.
     """
-    livros = Livro.objects.all()    
-    return render(request, 'listar_livro.html', {'livros': livros})
+    termo = request.GET.get('q', '').strip()
+    livros = buscar_livros(termo) if termo else []
+    return render(request, 'listar_livro.html', {'livros': livros, 'termo_busca': termo, **_contexto_linhas_livro()})
 
 @login_required
 @csrf_protect
 def atualizar_livro(request, livro_id):
     """
     View para atualizar livro existente.
-    Requer autenticação.
+    Requer autenticação. Grava apenas os campos do formulário, preservando os
+    contadores de empréstimos e reservas mantidos no banco.
     """
     livro = get_object_or_404(Livro, pk=livro_id)
     
@@ -201,7 +257,12 @@ def atualizar_livro(request, livro_id):
             form = LivroFormCommonUser(request.POST, instance=livro)
         
         if form.is_valid():
-            form.save()
+            livro = form.save(commit=False)
+            # Só os campos do formulário: os contadores lidos acima podem estar
+            # desatualizados por um empréstimo feito enquanto isso.
+            colunas = {campo.name for campo in Livro._meta.concrete_fields}
+            livro.save(update_fields=[campo for campo in form.cleaned_data if campo in colunas])
+            form.save_m2m()
             return redirect('listar_livro')
     else:
         if request.user.is_superuser:
@@ -250,6 +311,15 @@ def adicionar_livro(request):
 # ----------------!---------------- #
 
 # Views de Empréstimo
+def _inteiro(valor):
+    """
+    Converte um id recebido em GET ou POST; None se vazio ou não numérico.
+    """
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
 @login_required
 @csrf_protect
 def registrar_emprestimo(request):
@@ -258,73 +328,272 @@ def registrar_emprestimo(request):
     Realiza verificações de disponibilidade e autenticação.
     """
     if request.method == 'POST':
-        livro_id = request.POST.get('livro_id')
-        usuario_id = request.POST.get('usuario_id')
+        livro_id = _inteiro(request.POST.get('livro_id'))
+        usuario_id = _inteiro(request.POST.get('usuario_id'))
+        if livro_id is None or usuario_id is None:
+            return HttpResponseBadRequest("Selecione um livro e um usuário válidos.")
         livro = get_object_or_404(Livro, id=livro_id)
         usuario = get_object_or_404(User, id=usuario_id)
 
-        emprestimo_existente = Emprestimo.objects.filter(
-            usuario=usuario,
-            livro=livro,
-            devolvido=False
-        ).exists()
-        if emprestimo_existente:
-            return render(request, 'emprestimo_indisponivel2.html', {'livro': livro})
-
         try:
             livro.emprestar(usuario)
             return redirect('listar_emprestimos')
-        except ValidationError:
-            return render(request, 'emprestimo_indisponivel.html', {'livro': livro})
+        except ValidationError as erro:
+            if erro.code == 'emprestimo_duplicado':
+                return render(request, 'emprestimo_indisponivel2.html', {'livro': livro})
+            if erro.code == 'limite_emprestimos':
+                return render(request, 'emprestimo_limite.html', {'livro': livro, 'mensagem': erro.messages[0]})
+            return render(request, 'emprestimo_indisponivel.html', {'livro': livro, 'usuario': usuario})
 
-    livros = Livro.objects.all()
-    usuarios = User.objects.all()
-    return render(request, 'registrar_emprestimo.html', {'livros': livros, 'usuarios': usuarios})
+    return render(request, 'registrar_emprestimo.html')
+
+@login_required
+@csrf_protect
+def reservar_livro(request):
+    """
+    View para colocar um usuário na fila de reservas de um livro sem cópias
+    disponíveis (oferecida na página de livro indisponível). Na devolução, a
+    cópia é separada para o primeiro da fila, que a retira pelo empréstimo
+    normal, sem precisar tentar de novo até encontrar uma cópia livre.
+    """
+    if request.method != 'POST':
+        return redirect('registrar_emprestimo')
+    livro_id = _inteiro(request.POST.get('livro_id'))
+    usuario_id = _inteiro(request.POST.get('usuario_id'))
+    if livro_id is None or usuario_id is None:
+        return HttpResponseBadRequest("Selecione um livro e um usuário válidos.")
+    livro = get_object_or_404(Livro.objects.only('id', 'titulo'), id=livro_id)
+    usuario = get_object_or_404(User.objects.only('id', 'username'), id=usuario_id)
+    try:
+        reserva = livro.reservar(usuario)
+    except ValidationError as erro:
+        return render(request, 'reserva_registrada.html', {'livro': livro, 'mensagem': erro.messages[0]})
+    return render(request, 'reserva_registrada.html', {
+        'livro': livro, 'reserva': reserva, 'posicao': reserva.posicao(),
+    })
 
 @login_required
 @csrf_protect
 def registrar_devolucao(request):
     """
     View para registrar devolução de livro.
-    Verifica existência de empréstimo ativo e autenticação.
+    GET com usuario_id lista apenas os empréstimos ativos desse usuário (uma
+    consulta, com o título do livro no JOIN); o POST devolve pelo id do
+    empréstimo, sem consultar Livro ou User. Um segundo envio da mesma
+    devolução não altera o estoque.
     """
     if request.method == 'POST':
-        livro_id = request.POST.get('livro_id')
-        usuario_id = request.POST.get('usuario_id')
-        livro = get_object_or_404(Livro, id=livro_id)
+        emprestimo_id = _inteiro(request.POST.get('emprestimo_id'))
+        if emprestimo_id is None:
+            return HttpResponseBadRequest("Selecione um empréstimo válido.")
+        emprestimo = get_object_or_404(Emprestimo.objects.only('id', 'livro_id', 'usuario_id'), id=emprestimo_id)
+        emprestimo.registrar_devolucao()
+        return redirect('listar_emprestimos')
+
+    contexto = {}
+    usuario_id = request.GET.get('usuario_id')
+    if usuario_id:
+        usuario_id = _inteiro(usuario_id)
+        if usuario_id is None:
+            return HttpResponseBadRequest("Selecione um usuário válido.")
+        usuario = get_object_or_404(User.objects.only('id', 'username', 'first_name', 'last_name'), id=usuario_id)
+        contexto = {
+            'usuario_selecionado': usuario,
+            'emprestimos': Emprestimo.objects.ativos_do_usuario(usuario.pk),
+        }
+    return render(request, 'registrar_devolucao.html', contexto)
+
+def _circulacao_em_lote(request, operacao, titulo):
+    """
+    Trata o formulário de empréstimo/devolução em lote: um usuário e os ids ou
+    ISBNs lidos no balcão. Exibe o resultado de cada livro na mesma página; sem
+    um usuário válido, a página volta com o erro e os livros lidos (400).
+    """
+    contexto = {'titulo': titulo}
+    if request.method == 'POST':
+        usuario_id = _inteiro(request.POST.get('usuario_id'))
+        if usuario_id is None:
+            contexto.update({'erro': "Selecione um usuário válido.", 'livros_lidos': request.POST.get('livros', '')})
+            return render(request, 'circulacao_lote.html', contexto, status=400)
         usuario = get_object_or_404(User, id=usuario_id)
-
-        emprestimo = Emprestimo.objects.filter(
-            usuario=usuario,
-            livro=livro,
-            devolvido=False,
-        ).first()
-
-        if not emprestimo:
-            return render(request, 'devolucao_indisponivel.html', {'livro': livro, 'usuario': usuario})
-
+        contexto.update({'usuario_selecionado': usuario, 'livros_lidos': request.POST.get('livros', '')})
         try:
-            emprestimo.registrar_devolucao()
-        except ValidationError:
-            return render(request, 'devolucao_indisponivel.html', {'livro': livro, 'usuario': usuario})
+            identificadores = services.separar_identificadores(contexto['livros_lidos'])
+            contexto['resultados'] = operacao(usuario, identificadores)
+        except ValidationError as erro:
+            contexto['erro'] = erro.messages[0]
+    return render(request, 'circulacao_lote.html', contexto)
 
-        return redirect('listar_emprestimos')  
-    else:
-        livros = Livro.objects.all()
-        usuarios = User.objects.all()
-        return render(request, 'registrar_devolucao.html', {'livros': livros, 'usuarios': usuarios})
+@login_required
+@csrf_protect
+def registrar_emprestimo_lote(request):
+    """
+    View para registrar o empréstimo de vários livros para um usuário de uma vez.
+    Todos os empréstimos são gravados em uma única transação.
+    """
+    return _circulacao_em_lote(request, services.emprestar_em_lote, "Empréstimo em Lote")
+
+@login_required
+@csrf_protect
+def registrar_devolucao_lote(request):
+    """
+    View para registrar a devolução de vários livros de um usuário de uma vez.
+    Todas as devoluções são gravadas em uma única transação.
+    """
+    return _circulacao_em_lote(request, services.devolver_em_lote, "Devolução em Lote")
 
 @login_required
 @csrf_protect
 def listar_emprestimos(request):
     """
     View para listar empréstimos com filtro opcional.
-    Aplica filtros 'ativos' ou 'devolvidos' conforme parâmetro GET.
+    Aplica filtros 'ativos', 'devolvidos' ou 'atrasados' conforme parâmetro GET.
+    Os empréstimos mais recentes aparecem primeiro, paginados por cursor; os
+    atrasados aparecem do prazo mais antigo para o mais recente.
     """
-    emprestimos = Emprestimo.objects.all()
+    emprestimos = Emprestimo.objects.para_listagem()
+    ordenacao = ('-id',)
     filtro = request.GET.get('filtro')
     if filtro == 'ativos':
         emprestimos = emprestimos.filter(devolvido=False)
     elif filtro == 'devolvidos':
         emprestimos = emprestimos.filter(devolvido=True)
-    return render(request, 'listar_emprestimos.html', {'emprestimos': emprestimos})
\ No newline at end of file
+    elif filtro == 'atrasados':
+        emprestimos = emprestimos.atrasados()
+        ordenacao = ('data_prevista_devolucao', 'id')
+    pagina = paginar_por_cursor(
+        emprestimos,
+        cursor=request.GET.get('cursor'),
+        ordenacao=ordenacao,
+    )
+    return render(request, 'listar_emprestimos.html', {
+        'emprestimos': pagina.itens, 'pagina': pagina, 'geracao_fragmentos': cache.geracao_fragmentos(),
+    })
+
+# ----------------!---------------- #
+
+# Views de Autocompletar
+LIMITE_AUTOCOMPLETAR = 20
+TAMANHO_MINIMO_AUTOCOMPLETAR = 2
+
+def _intervalo_prefixo(prefixo):
+    """
+    Converte a busca por prefixo em um intervalo [prefixo, prefixo + U+10FFFF),
+    que usa índices B-tree em qualquer banco (ao contrário de LIKE/ILIKE).
+    """
+    return {'gte': prefixo, 'lt': prefixo + '\U0010ffff'}
+
+@login_required
+@require_GET
+def autocompletar_usuarios(request):
+    """
+    View JSON para o seletor de usuários dos formulários de circulação.
+    Busca por prefixo (sem diferenciar maiúsculas nem acentos) no username ou
+    no primeiro nome. O termo e os nomes gravados em PerfilLeitor passam pela
+    mesma normalização em Python, pois o LOWER() do SQLite só converte letras
+    ASCII; a ordem dos resultados segue a collation do banco para o username.
+    Retorna no máximo LIMITE_AUTOCOMPLETAR usuários ativos.
+    """
+    prefixo = normalizar(request.GET.get('q', '').strip())
+    if len(prefixo) < TAMANHO_MINIMO_AUTOCOMPLETAR:
+        return JsonResponse({'resultados': []})
+    intervalo = _intervalo_prefixo(prefixo)
+    usuarios = (
+        PerfilLeitor.objects.filter(
+            Q(username_normalizado__gte=intervalo['gte'], username_normalizado__lt=intervalo['lt'])
+            | Q(nome_normalizado__gte=intervalo['gte'], nome_normalizado__lt=intervalo['lt']),
+            usuario__is_active=True,
+        )
+        .order_by('usuario__username')
+        .values('usuario_id', 'usuario__username', 'usuario__first_name', 'usuario__last_name')
+        [:LIMITE_AUTOCOMPLETAR]
+    )
+    return JsonResponse({'resultados': [
+        {
+            'id': usuario['usuario_id'],
+            'texto': (
+                f"{usuario['usuario__first_name']} {usuario['usuario__last_name']} "
+                f"({usuario['usuario__username']})"
+            ).strip(),
+        }
+        for usuario in usuarios
+    ]})
+
+@login_required
+@require_GET
+def autocompletar_livros(request):
+    """
+    View JSON para o seletor de livros dos formulários de circulação.
+    Usa o índice de busca do catálogo (prefixo no título, autor ou ISBN) e
+    retorna no máximo LIMITE_AUTOCOMPLETAR livros, com as cópias disponíveis.
+    """
+    termo = request.GET.get('q', '').strip()
+    if len(termo) < TAMANHO_MINIMO_AUTOCOMPLETAR:
+        return JsonResponse({'resultados': []})
+    ids = buscar_ids(termo, LIMITE_AUTOCOMPLETAR)
+    livros = Livro.objects.only('id', 'titulo', 'isbn', 'copias_disponiveis').in_bulk(ids)
+    return JsonResponse({'resultados': [
+        {
+            'id': livro.pk,
+            'texto': f"{livro.titulo} ({livro.isbn})",
+            'copias_disponiveis': livro.copias_disponiveis,
+        }
+        for livro in (livros[livro_id] for livro_id in ids if livro_id in livros)
+    ]})
+
+# ----------------!---------------- #
+
+# Views de Exportação
+def _resposta_exportacao(request, nome, colunas, linhas):
+    """
+    Monta a StreamingHttpResponse de uma exportação conforme ?formato= e ?gzip=.
+    """
+    formato = request.GET.get('formato', 'csv')
+    if formato not in exportacao.FORMATOS:
+        return HttpResponseBadRequest("Formato de exportação inválido.")
+    gzip = request.GET.get('gzip') in ('1', 'true', 'sim')
+
+    tipos = {'csv': 'text/csv; charset=utf-8', 'jsonl': 'application/x-ndjson; charset=utf-8'}
+    arquivo = f"{nome}.{formato}"
+    if gzip:
+        arquivo += '.gz'
+    response = StreamingHttpResponse(
+        exportacao.exportar(colunas, linhas, formato=formato, gzip=gzip),
+        content_type='application/gzip' if gzip else tipos[formato],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{arquivo}"'
+    return response
+
+@login_required
+@permission_required('biblioteca.view_emprestimo', raise_exception=True)
+@require_GET
+def exportar_emprestimos(request):
+    """
+    View para exportar o histórico completo de empréstimos em fluxo.
+    Parâmetros GET: formato (csv|jsonl), gzip (1), inicio e fim (AAAA-MM-DD)
+    filtrando data_emprestimo. Requer permissão 'biblioteca.view_emprestimo'.
+    """
+    datas = {}
+    for parametro in ('inicio', 'fim'):
+        valor = request.GET.get(parametro)
+        if valor:
+            try:
+                datas[parametro] = parse_date(valor)
+            except ValueError:
+                datas[parametro] = None
+            if datas[parametro] is None:
+                return HttpResponseBadRequest(f"Data inválida em '{parametro}'.")
+    linhas = exportacao.linhas_emprestimos(**datas)
+    return _resposta_exportacao(request, 'emprestimos', exportacao.COLUNAS_EMPRESTIMOS, linhas)
+
+@login_required
+@permission_required('biblioteca.view_livro', raise_exception=True)
+@require_GET
+def exportar_livros(request):
+    """
+    View para exportar o inventário de livros em fluxo.
+    Parâmetros GET: formato (csv|jsonl) e gzip (1).
+    Requer permissão 'biblioteca.view_livro'.
+    """
+    linhas = exportacao.linhas_livros()
+    return _resposta_exportacao(request, 'livros', exportacao.COLUNAS_LIVROS, linhas)
\ No newline at end of file
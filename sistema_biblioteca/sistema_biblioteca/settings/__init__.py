@@ -0,0 +1,23 @@
+"""
+Configurações do projeto, divididas por ambiente:
+    - base.py: comum a todos os ambientes, lida de variáveis de ambiente;
+    - dev.py: desenvolvimento (DEBUG ligado, SQLite);
+    - prod.py: produção (DEBUG desligado, PostgreSQL; chave e hosts obrigatórios).
+Com DJANGO_SETTINGS_MODULE=sistema_biblioteca.settings (padrão de manage.py,
+wsgi.py e asgi.py) o ambiente vem de BIBLIOTECA_AMBIENTE ('dev' ou 'prod');
+os módulos também podem ser indicados diretamente, como em
+DJANGO_SETTINGS_MODULE=sistema_biblioteca.settings.prod.
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+_AMBIENTE = os.environ.get('BIBLIOTECA_AMBIENTE', 'dev')
+
+if _AMBIENTE == 'dev':
+    from .dev import *  # noqa: F401,F403
+elif _AMBIENTE == 'prod':
+    from .prod import *  # noqa: F401,F403
+else:
+    raise ImproperlyConfigured(f"BIBLIOTECA_AMBIENTE={_AMBIENTE!r} inválido; use 'dev' ou 'prod'.")
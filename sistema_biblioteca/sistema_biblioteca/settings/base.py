@@ -0,0 +1,290 @@
+"""
+Django settings for sistema_biblioteca project: configurações comuns a todos os
+ambientes (dev.py e prod.py importam este módulo). Valores que mudam entre
+instalações vêm de variáveis de ambiente com o prefixo BIBLIOTECA_.
+
+Generated by 'django-admin startproject' using Django 5.1.4.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/5.1/topics/settings/
+
+For the full list of settings and their values, see
+https://docs.djangoproject.com/en/5.1/ref/settings/
+"""
+
+import os
+from pathlib import Path
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+def variavel_booleana(nome, padrao=False):
+    """
+    Lê uma variável de ambiente booleana ('1', 'true', 'sim', 'on' = verdadeiro).
+    """
+    valor = os.environ.get(nome)
+    if valor is None:
+        return padrao
+    return valor.strip().lower() in ('1', 'true', 'sim', 'on')
+
+
+def variavel_lista(nome, padrao=()):
+    """
+    Lê uma variável de ambiente com valores separados por vírgula.
+    """
+    valor = os.environ.get(nome)
+    if valor is None:
+        return list(padrao)
+    return [item.strip() for item in valor.split(',') if item.strip()]
+
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent.parent
+
+
+# See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = os.environ.get('BIBLIOTECA_SECRET_KEY', '')
+
+# Com DEBUG ligado o Django guarda todas as consultas SQL de cada requisição em memória.
+DEBUG = variavel_booleana('BIBLIOTECA_DEBUG')
+
+ALLOWED_HOSTS = variavel_lista('BIBLIOTECA_HOSTS')
+
+
+# Application definition
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    "biblioteca",
+]
+
+MIDDLEWARE = [
+    # Primeiro da lista, para medir também os demais (ativado por BIBLIOTECA_METRICAS).
+    'biblioteca.metricas.MetricasMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'sistema_biblioteca.urls'
+
+TEMPLATES = [
+    {
+        # DjangoTemplates que mede o tempo de renderização (biblioteca/metricas.py).
+        'BACKEND': 'biblioteca.metricas.TemplatesMedidos',
+        'DIRS': [BASE_DIR / "biblioteca/templates"],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'sistema_biblioteca.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+
+# BIBLIOTECA_BANCO escolhe o perfil (padrão definido em dev.py e prod.py):
+# 'sqlite', 'postgres' ou 'sqlite_producao', para vários processos/threads
+# gravando no mesmo arquivo:
+# - WAL: leitores não bloqueiam o gravador nem são bloqueados por ele;
+#   synchronous=NORMAL é seguro em WAL (uma queda de energia perde no máximo as
+#   últimas transações, sem corromper o arquivo).
+# - mmap_size e cache_size (negativo = KiB por conexão) reduzem leituras do disco.
+# - transaction_mode IMMEDIATE: transaction.atomic() começa com BEGIN IMMEDIATE
+#   e espera a trava de escrita (timeout = busy_timeout, em segundos). Com BEGIN
+#   (DEFERRED), uma transação que lê antes de gravar falha na hora com
+#   "database is locked" se outra já estiver gravando.
+# - CONN_MAX_AGE: a conexão (e os PRAGMAs) é reaproveitada entre requisições.
+PRAGMAS_SQLITE_PRODUCAO = [
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-20000',
+    'PRAGMA temp_store=MEMORY',
+]
+BANCOS = {
+    'sqlite': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'sqlite_producao': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('BIBLIOTECA_SQLITE_ARQUIVO', BASE_DIR / 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(PRAGMAS_SQLITE_PRODUCAO),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 10,
+        },
+    },
+    # Vários escritores simultâneos. Usa o pool de conexões nativo do Django 5.1
+    # (requer os pacotes psycopg e psycopg-pool; incompatível com CONN_MAX_AGE).
+    # Para rodar os testes: BIBLIOTECA_BANCO=postgres python manage.py test biblioteca
+    # (o usuário precisa poder criar o banco test_<nome>).
+    'postgres': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.environ.get('BIBLIOTECA_PG_BANCO', 'biblioteca'),
+        'USER': os.environ.get('BIBLIOTECA_PG_USUARIO', 'biblioteca'),
+        'PASSWORD': os.environ.get('BIBLIOTECA_PG_SENHA', ''),
+        'HOST': os.environ.get('BIBLIOTECA_PG_HOST', 'localhost'),
+        'PORT': os.environ.get('BIBLIOTECA_PG_PORTA', '5432'),
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.environ.get('BIBLIOTECA_PG_POOL_MIN', 2)),
+                'max_size': int(os.environ.get('BIBLIOTECA_PG_POOL_MAX', 10)),
+                'timeout': 10,
+            },
+        },
+    },
+}
+
+
+def banco(padrao):
+    """
+    Retorna a configuração do perfil de banco escolhido em BIBLIOTECA_BANCO.
+    Args:
+        padrao: Perfil usado quando a variável não está definida.
+    Raises:
+        ImproperlyConfigured: Se o perfil não existir em BANCOS.
+    """
+    perfil = os.environ.get('BIBLIOTECA_BANCO', padrao)
+    if perfil not in BANCOS:
+        raise ImproperlyConfigured(
+            f"BIBLIOTECA_BANCO={perfil!r} inválido; use um de: {', '.join(BANCOS)}."
+        )
+    return BANCOS[perfil]
+
+
+# Password validation
+# https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/5.1/topics/i18n/
+
+LANGUAGE_CODE = 'pt-br'
+
+
+USE_I18N = True
+
+USE_TZ = False
+TIME_ZONE = 'America/Sao_Paulo'  
+
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/5.1/howto/static-files/
+
+STATIC_URL = '/static/'
+# Destino do collectstatic: nomes com hash do conteúdo e variantes .gz/.br
+# (biblioteca/estaticos.py). Com DEBUG = False os templates exigem o manifesto
+# gerado pelo collectstatic.
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'biblioteca.estaticos.ArmazenamentoEstatico'},
+}
+# Entrega STATIC_ROOT pela própria aplicação (cache de um ano, .br/.gz), quando
+# não há um servidor web na frente dela.
+BIBLIOTECA_SERVIR_ESTATICOS = variavel_booleana('BIBLIOTECA_SERVIR_ESTATICOS')
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Usado pelas páginas do catálogo (biblioteca/cache.py). A variável de ambiente
+# BIBLIOTECA_CACHE escolhe o backend: 'locmem' (padrão; um cache por processo,
+# adequado a um único processo), 'arquivo' (compartilhado pelos processos da
+# máquina) ou 'redis' (qualquer servidor compatível com Redis, como Valkey ou
+# KeyDB, em BIBLIOTECA_REDIS_URL; requer o pacote redis). As versões que
+# invalidam as páginas e as ETags ficam no cache, então com vários processos
+# o backend precisa ser compartilhado; prod.py usa 'redis' e recusa 'locmem'.
+
+BACKENDS_CACHE = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'biblioteca',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'arquivo': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('BIBLIOTECA_REDIS_URL', 'redis://127.0.0.1:6379/1'),
+    },
+}
+
+
+def backend_cache(padrao):
+    """
+    Retorna a configuração do backend de cache escolhido em BIBLIOTECA_CACHE.
+    Args:
+        padrao: Backend usado quando a variável não está definida.
+    Raises:
+        ImproperlyConfigured: Se o backend não existir em BACKENDS_CACHE.
+    """
+    nome = os.environ.get('BIBLIOTECA_CACHE', padrao)
+    if nome not in BACKENDS_CACHE:
+        raise ImproperlyConfigured(
+            f"BIBLIOTECA_CACHE={nome!r} inválido; use um de: {', '.join(BACKENDS_CACHE)}."
+        )
+    return BACKENDS_CACHE[nome]
+
+
+CACHES = {'default': backend_cache('locmem')}
+# Fragmentos das linhas das listagens ({% cache %}), no mesmo backend. As chaves
+# incluem a versão da linha e a geração cache.FRAGMENTOS, que só muda quando o
+# banco é recriado (gerar_dados, flush). Declarar o alias evita que
+# a tag procure 'template_fragments' (e trate a exceção) a cada linha.
+CACHES['template_fragments'] = CACHES['default']
+BIBLIOTECA_CACHE_TIMEOUT = 300
+
+# Métricas
+# MetricasMiddleware (biblioteca/metricas.py): consultas SQL, tempo de SQL, de
+# templates e total por view, no cabeçalho Server-Timing e em histogramas
+# exportados em /biblioteca/metricas/ (formato Prometheus). O endpoint aceita
+# superusuários ou o cabeçalho "Authorization: Bearer <BIBLIOTECA_METRICAS_TOKEN>".
+BIBLIOTECA_METRICAS = variavel_booleana('BIBLIOTECA_METRICAS')
+BIBLIOTECA_METRICAS_TOKEN = os.environ.get('BIBLIOTECA_METRICAS_TOKEN', '')
+
+# Os testes rodam com o cache desligado; os testes do cache o ativam com override_settings.
+TEST_RUNNER = 'biblioteca.tests.executor.ExecutorTestes'
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
+
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+LOGIN_URL = 'login'
\ No newline at end of file
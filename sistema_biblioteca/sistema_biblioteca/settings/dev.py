@@ -0,0 +1,14 @@
+"""
+Configurações de desenvolvimento: DEBUG ligado por padrão, chave secreta fixa
+e SQLite local (BIBLIOTECA_BANCO pode escolher outro perfil, como 'postgres').
+"""
+
+from .base import *  # noqa: F401,F403
+from .base import banco, variavel_booleana
+
+# SECURITY WARNING: chave conhecida, apenas para desenvolvimento.
+SECRET_KEY = SECRET_KEY or 'django-insecure-)vla+rdz**opoc9^j-aw+&f-=gs-*60d4t-1nlrhg6rs7p=jil'
+
+DEBUG = variavel_booleana('BIBLIOTECA_DEBUG', True)
+
+DATABASES = {'default': banco('sqlite')}
@@ -0,0 +1,37 @@
+"""
+Configurações de produção: DEBUG sempre desligado, PostgreSQL com pool de
+conexões por padrão (BIBLIOTECA_BANCO=sqlite_producao para um único servidor)
+e chave secreta e hosts obrigatórios (BIBLIOTECA_SECRET_KEY e BIBLIOTECA_HOSTS).
+O cache precisa ser compartilhado pelos processos (Redis por padrão, ou
+BIBLIOTECA_CACHE=arquivo para um único servidor): as versões dos escopos
+formam as chaves das páginas e as ETags, e com 'locmem' um processo que não
+viu a alteração continuaria respondendo 304 e páginas antigas.
+Os templates exigem o manifesto do collectstatic.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import BACKENDS_CACHE, backend_cache, banco, variavel_booleana
+
+DEBUG = False
+
+if not SECRET_KEY:
+    raise ImproperlyConfigured("Defina BIBLIOTECA_SECRET_KEY em produção.")
+if not ALLOWED_HOSTS:
+    raise ImproperlyConfigured("Defina BIBLIOTECA_HOSTS (ex.: biblioteca.exemplo.com) em produção.")
+
+DATABASES = {'default': banco('postgres')}
+
+CACHES = {'default': backend_cache('redis')}
+CACHES['template_fragments'] = CACHES['default']
+if CACHES['default'] is BACKENDS_CACHE['locmem']:
+    raise ImproperlyConfigured(
+        "BIBLIOTECA_CACHE='locmem' guarda um cache por processo; em produção use 'redis' "
+        "ou 'arquivo' (um único servidor), compartilhados por todos os processos."
+    )
+
+# Atrás de HTTPS (padrão), os cookies de sessão e de CSRF só trafegam por conexões seguras.
+if variavel_booleana('BIBLIOTECA_HTTPS', True):
+    SESSION_COOKIE_SECURE = True
+    CSRF_COOKIE_SECURE = True
@@ -14,10 +14,20 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
+
+from biblioteca.estaticos import servir_estatico
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('biblioteca/', include('biblioteca.urls')),
 ]
+
+if settings.BIBLIOTECA_SERVIR_ESTATICOS:
+    urlpatterns.append(
+        re_path(rf"^{re.escape(settings.STATIC_URL.lstrip('/'))}(?P<caminho>.+)$", servir_estatico)
+    )